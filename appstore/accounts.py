@@ -1,8 +1,30 @@
 """Provides the interface for an accounts controller."""
 import threading
 from collections import defaultdict
+from contextlib import ExitStack
+from contextvars import ContextVar, Token
 from types import TracebackType
-from typing import Callable, ContextManager, Dict, List, Optional, Tuple, Type
+from typing import (
+    Callable,
+    ContextManager,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+)
+
+from appstore.collections import chunks
+from appstore.wal import WriteAheadLog
+
+_Journal = List[Tuple[float, str]]
+
+DEPOSITS_CHUNK_SIZE = 1024
+LOCK_STRIPES = 1024
 
 
 class ForbiddenDebit(Exception):
@@ -20,14 +42,18 @@ class ForbiddenDebit(Exception):
 class _TransactionContextManager(ContextManager[None]):
     def __init__(
         self,
-        start_transaction: Callable[[], None],
-        revert_transaction: Callable[[], None],
+        journal: "ContextVar[Optional[_Journal]]",
+        commit_transaction: Callable[[_Journal], None],
+        revert_transaction: Callable[[_Journal], None],
     ) -> None:
-        self._start_transaction = start_transaction
+        self._journal = journal
+        self._commit_transaction = commit_transaction
         self._revert_transaction = revert_transaction
+        self._entries: _Journal = []
+        self._token: Optional[Token[Optional[_Journal]]] = None
 
     def __enter__(self) -> None:
-        self._start_transaction()
+        self._token = self._journal.set(self._entries)
 
     def __exit__(  # pylint: disable=useless-return
         self,
@@ -35,26 +61,205 @@ class _TransactionContextManager(ContextManager[None]):
         _exc_value: Optional[BaseException],
         _traceback: Optional[TracebackType],
     ) -> Optional[bool]:
+        if self._token is not None:
+            self._journal.reset(self._token)
         if _exc_type is not None:
-            self._revert_transaction()
+            self._revert_transaction(self._entries)
+        else:
+            parent_entries = self._journal.get()
+            if parent_entries is not None:
+                parent_entries.extend(self._entries)
+            elif self._entries:
+                self._commit_transaction(self._entries)
+        return None
+
+
+class _WriteSet:
+    """The changes a deferred transaction buffers until its commit."""
+
+    def __init__(self) -> None:
+        self.deltas: Dict[str, float] = defaultdict(float)
+        self.entries: _Journal = []
+
+    def add(self, amount: float, holder_id: str) -> None:
+        """Buffers a change.
+
+        Args:
+            amount: Amount to add to the account balance.
+            holder_id: Identifier of the account's holder.
+        """
+        self.deltas[holder_id] += amount
+        self.entries.append((amount, holder_id))
+
+    def rollback(self, savepoint: int) -> None:
+        """Discards the changes buffered after a savepoint.
+
+        Args:
+            savepoint: The number of changes to keep.
+        """
+        for amount, holder_id in self.entries[savepoint:]:
+            self.deltas[holder_id] -= amount
+        del self.entries[savepoint:]
+
+
+W = TypeVar("W", bound=_WriteSet)
+
+
+class _DeferredTransactionContextManager(ContextManager[None], Generic[W]):
+    _entered: W
+
+    def __init__(
+        self,
+        write_set: "ContextVar[Optional[W]]",
+        journal: "ContextVar[Optional[_Journal]]",
+        create_write_set: Callable[[], W],
+        commit_write_set: Callable[[W], None],
+    ) -> None:
+        self._write_set = write_set
+        self._journal = journal
+        self._create_write_set = create_write_set
+        self._commit_write_set = commit_write_set
+        self._savepoint = 0
+        self._tokens: Optional[Tuple[Token[Optional[W]], Token[Optional[_Journal]]]]
+        self._tokens = None
+
+    def __enter__(self) -> None:
+        write_set = self._write_set.get()
+        if write_set is None:
+            write_set = self._create_write_set()
+            self._tokens = (
+                self._write_set.set(write_set),
+                self._journal.set(write_set.entries),
+            )
+        self._entered = write_set
+        self._savepoint = len(write_set.entries)
+
+    def __exit__(  # pylint: disable=useless-return
+        self,
+        _exc_type: Optional[Type[BaseException]],
+        _exc_value: Optional[BaseException],
+        _traceback: Optional[TracebackType],
+    ) -> Optional[bool]:
+        if self._tokens is None:
+            if _exc_type is not None:
+                self._entered.rollback(self._savepoint)
+            return None
+        write_set_token, journal_token = self._tokens
+        self._write_set.reset(write_set_token)
+        self._journal.reset(journal_token)
+        if _exc_type is None:
+            self._commit_write_set(self._entered)
         return None
 
 
 class AccountsController:
     """A controller for executing transferences between accounts."""
 
-    def __init__(self) -> None:
-        """Initializes an in-memory and non-shared accounts controller."""
+    def __init__(
+        self, log: Optional[WriteAheadLog] = None, deferred: bool = False
+    ) -> None:
+        """Initializes an in-memory and non-shared accounts controller.
+
+        Args:
+            log: A log where to persist committed operations.
+                The operations already in the log are replayed.
+            deferred: Whether transactions defer their writes until commit.
+                Their operations are checked as they are made, against the
+                balances and the transaction's own changes, but no balance
+                changes until the commit applies each account's net change.
+                So, failed transactions have nothing to revert,
+                and balances never show a transaction's intermediate states,
+                not even to the transaction itself.
+        """
         self._balances: Dict[str, float] = defaultdict(lambda: 0.0)
-        self._lockers: Dict[str, threading.Lock] = {}
-        self._journal: List[Tuple[float, str]] = []
+        self._lockers = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._journal: ContextVar[Optional[_Journal]] = ContextVar(
+            f"journal-{id(self)}", default=None
+        )
+        self._write_set: Optional[ContextVar[Optional[_WriteSet]]] = None
+        if deferred:
+            self._write_set = ContextVar(f"write-set-{id(self)}", default=None)
+        self._log = log
+        if log is not None:
+            self.replay(log.read())
 
-    def _add(self, amount: float, holder_id: str) -> None:
+    def _lock(self, *holder_ids: str) -> ExitStack:
+        """Acquires the locks of the given holders' accounts.
+
+        Accounts share a fixed number of locks, striped by the holders'
+        identifiers hashes, so that locks don't take memory per account.
+        Locks are acquired in their stripes order,
+        so that concurrent operations can't deadlock.
+
+        Args:
+            holder_ids: Holders of the accounts to lock.
+
+        Returns:
+            A context that releases the locks on exit.
+        """
+        locks = ExitStack()
+        for stripe in sorted(
+            {hash(holder_id) % LOCK_STRIPES for holder_id in holder_ids}
+        ):
+            locks.enter_context(self._lockers[stripe])
+        return locks
+
+    def _apply(self, amount: float, holder_id: str) -> None:
         agent_balance = self._balances[holder_id]
         if agent_balance + amount < 0:
             raise ForbiddenDebit(holder_id, amount, agent_balance)
         self._balances[holder_id] += amount
-        self._journal.append((amount, holder_id))
+
+    def _force(self, amount: float, holder_id: str) -> None:
+        self._balances[holder_id] += amount
+
+    def _round(self, amount: float) -> float:
+        """Rounds an amount as the balances keep it, before buffering it.
+
+        So, the net changes that deferred transactions apply on commit
+        add up to the same balances as replaying their operations one by one.
+
+        Args:
+            amount: The amount to round.
+
+        Returns:
+            The amount, unchanged.
+        """
+        return amount
+
+    def _add(self, amount: float, holder_id: str) -> None:
+        write_set = None if self._write_set is None else self._write_set.get()
+        if write_set is not None:
+            amount = self._round(amount)
+            balance = self.get_balance(holder_id) + write_set.deltas[holder_id]
+            if balance + amount < 0:
+                raise ForbiddenDebit(holder_id, amount, balance)
+            write_set.add(amount, holder_id)
+            return
+        self._apply(amount, holder_id)
+        journal = self._journal.get()
+        if journal is not None:
+            journal.append((amount, holder_id))
+
+    def _write_log(self, entries: Sequence[Tuple[float, str]]) -> Optional[int]:
+        """Writes an operation outside transactions to the log.
+
+        It is called while holding the accounts' locks,
+        so that operations depending on each other are logged in order.
+
+        Args:
+            entries: The operation's `(amount, holder_id)` entries.
+
+        Returns:
+            The position to wait for, if the operation was written.
+        """
+        if self._log is None or self._journal.get() is not None:
+            return None
+        return self._log.write(entries)
+
+    def _sync_log(self, position: Optional[int]) -> None:
+        if self._log is not None and position is not None:
+            self._log.sync(position)
 
     def deposit(self, amount: float, holder_id: str) -> None:
         """Makes a deposit.
@@ -68,7 +273,34 @@ class AccountsController:
         """
         if amount <= 0:
             raise ValueError("Deposit amount must be greater than 0.")
-        self._add(amount, holder_id)
+        with self._lock(holder_id):
+            self._add(amount, holder_id)
+            position = self._write_log([(amount, holder_id)])
+        self._sync_log(position)
+
+    def deposit_many(self, deposits: Iterable[Tuple[float, str]]) -> None:
+        """Makes deposits in bulk.
+
+        Deposits are made a chunk at a time, each chunk under a single
+        acquisition of its accounts' locks and as a single log record,
+        so that the memory used doesn't grow with the number of deposits.
+
+        Args:
+            deposits: The amount and the holder identifier of each deposit.
+
+        Raises:
+            ValueError: if some amount isn't greater than 0. The chunks before
+                the one with such amount are already deposited.
+        """
+        position = None
+        for chunk in chunks(deposits, DEPOSITS_CHUNK_SIZE):
+            if any(amount <= 0 for amount, _ in chunk):
+                raise ValueError("Deposit amount must be greater than 0.")
+            with self._lock(*(holder_id for _, holder_id in chunk)):
+                for amount, holder_id in chunk:
+                    self._add(amount, holder_id)
+                position = self._write_log(chunk)
+        self._sync_log(position)
 
     def transfer(self, issuer_id: str, amount: float, recepient_id: str) -> None:
         """Transfers an amount from an account to another.
@@ -83,8 +315,13 @@ class AccountsController:
         """
         if amount <= 0:
             raise ValueError("Transference amount must be greater than 0.")
-        self._add(-1 * amount, issuer_id)
-        self._add(amount, recepient_id)
+        with self._lock(issuer_id, recepient_id):
+            self._add(-1 * amount, issuer_id)
+            self._add(amount, recepient_id)
+            position = self._write_log(
+                [(-1 * amount, issuer_id), (amount, recepient_id)]
+            )
+        self._sync_log(position)
 
     def get_balance(self, holder_id: str) -> float:
         """Get an account's balance.
@@ -97,23 +334,74 @@ class AccountsController:
         """
         return self._balances[holder_id]
 
-    def _start_transaction(self) -> None:
-        self._journal = []
+    def replay(self, records: Iterable[Iterable[Tuple[float, str]]]) -> None:
+        """Replays logged operations, without checking the balances.
+
+        Args:
+            records: The `(amount, holder_id)` entries of each logged operation.
+        """
+        for entries in records:
+            for amount, holder_id in entries:
+                with self._lock(holder_id):
+                    self._force(amount, holder_id)
+
+    def _commit_transaction(self, journal: _Journal) -> None:
+        if self._log is not None:
+            self._log.append(journal)
+
+    def _commit_write_set(self, write_set: _WriteSet) -> None:
+        """Applies a deferred transaction's net changes, atomically.
+
+        Debits are checked again, as other transactions may have changed
+        the balances since they were made.
+
+        Args:
+            write_set: The transaction's changes.
+
+        Raises:
+            ForbiddenDebit: if a net debit is bigger than the balance.
+        """
+        if not write_set.entries:
+            return
+        with self._lock(*write_set.deltas):
+            for holder_id, delta in write_set.deltas.items():
+                balance = self.get_balance(holder_id)
+                if delta < 0 and balance + delta < 0:
+                    raise ForbiddenDebit(holder_id, delta, balance)
+            for holder_id, delta in write_set.deltas.items():
+                self._force(delta, holder_id)
+            position = None if self._log is None else self._log.write(write_set.entries)
+        self._sync_log(position)
 
-    def _revert_transaction(self) -> None:
-        for amount, holder in self._journal:
-            self._balances[holder] -= amount
+    def _revert_transaction(self, journal: _Journal) -> None:
+        with self._lock(*{holder for _, holder in journal}):
+            for amount, holder in reversed(journal):
+                self._force(-1 * amount, holder)
 
     def transaction(self) -> ContextManager[None]:
         """Creates a transaction context.
 
         It rolls back all operations in such a context if any operation fails.
+        Each thread or asynchronous task keeps its own transactions,
+        which can be nested.
 
+        Unless transactions are deferred, their operations apply as they are
+        made, and are rolled back by compensating them, all at once. So,
+        if other operations spent a credit meanwhile, the rollback leaves
+        that account with a negative balance. Deferred transactions don't.
 
         Returns:
             Nothing.
         """
+        if self._write_set is not None:
+            return _DeferredTransactionContextManager(
+                write_set=self._write_set,
+                journal=self._journal,
+                create_write_set=_WriteSet,
+                commit_write_set=self._commit_write_set,
+            )
         return _TransactionContextManager(
-            start_transaction=self._start_transaction,
+            journal=self._journal,
+            commit_transaction=self._commit_transaction,
             revert_transaction=self._revert_transaction,
         )
@@ -0,0 +1,274 @@
+"""Provides the app store's asynchronous purchase controller."""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import (
+    AsyncContextManager,
+    AsyncIterator,
+    Mapping,
+    Optional,
+    Protocol,
+    Sequence,
+)
+
+from appstore.appstore import (
+    AccountsController,
+    AppsDB,
+    Sale,
+    SalesRecorder,
+    UsersDB,
+    _SalesController,
+)
+from appstore.ids import IdAllocator
+
+
+class AsyncAccountsController(Protocol):
+    """An asynchronous controller for executing transferences between accounts."""
+
+    async def get_balance(self, holder_id: str) -> float:
+        """Get an account balance.
+
+        Args:
+            holder_id: The account holder identifier.
+        """
+        ...  # pragma: no cover
+
+    async def transfer(self, issuer_id: str, amount: float, recepient_id: str) -> None:
+        """Transfers an amount from one account to another.
+
+        Args:
+            issuer_id: Holder of the account to debit.
+            amount: Amount to transfer.
+            recepient_id: Holder of the account to credit.
+        """
+        ...  # pragma: no cover
+
+    def transaction(self) -> AsyncContextManager[None]:
+        """Creates an asynchronous transaction context.
+
+        It rolls back all operations in such a context if any operation fails.
+        """
+        ...  # pragma: no cover
+
+
+class AsyncAppsDB(Protocol):
+    """An asynchronous database where to query for apps' developers and prices."""
+
+    async def get_developer_id(self, app_id: str) -> str:
+        """Get the developer of a given app.
+
+        Args:
+            app_id: The app identifier.
+        """
+        ...  # pragma: no cover
+
+    async def get_item_price(self, app_id: str, item: str) -> float:
+        """Get an app items' price.
+
+        Args:
+            app_id: The app identifier.
+            item: The app item.
+        """
+        ...  # pragma: no cover
+
+
+class AsyncUsersDB(Protocol):
+    """An asynchronous database where to query for users and their purchases."""
+
+    async def get_purchases(self, user_id: str) -> int:
+        """Get the number of purchases the given user made.
+
+        Args:
+            user_id: User identifier.
+        """
+        ...  # pragma: no cover
+
+    async def increment_purchases(self, user_id: str) -> int:
+        """Count a user's purchase.
+
+        Args:
+            user_id: User identifier.
+        """
+        ...  # pragma: no cover
+
+
+class AsyncAccountsAdapter:
+    """Adapts an accounts controller to the asynchronous interface."""
+
+    def __init__(self, accounts_controller: AccountsController) -> None:
+        """Wraps the accounts controller.
+
+        Args:
+            accounts_controller: The controller to adapt.
+        """
+        self._accounts = accounts_controller
+
+    async def get_balance(self, holder_id: str) -> float:
+        """Get an account balance.
+
+        Args:
+            holder_id: The account holder identifier.
+
+        Returns:
+            The account's balance.
+        """
+        return self._accounts.get_balance(holder_id)
+
+    async def transfer(self, issuer_id: str, amount: float, recepient_id: str) -> None:
+        """Transfers an amount from one account to another.
+
+        Args:
+            issuer_id: Holder of the account to debit.
+            amount: Amount to transfer.
+            recepient_id: Holder of the account to credit.
+        """
+        self._accounts.transfer(issuer_id, amount, recepient_id)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[None]:
+        """Creates an asynchronous transaction context.
+
+        It rolls back all operations in such a context if any operation fails.
+
+        Yields:
+            Nothing.
+        """
+        with self._accounts.transaction():
+            yield
+
+
+class AsyncAppsAdapter:
+    """Adapts an apps' database to the asynchronous interface."""
+
+    def __init__(self, appsdb: AppsDB) -> None:
+        """Wraps the apps' database.
+
+        Args:
+            appsdb: The database to adapt.
+        """
+        self._appsdb = appsdb
+
+    async def get_developer_id(self, app_id: str) -> str:
+        """Get the developer of a given app.
+
+        Args:
+            app_id: The app identifier.
+
+        Returns:
+            The identifier for the developer who published the app.
+        """
+        return self._appsdb.get_developer_id(app_id)
+
+    async def get_item_price(self, app_id: str, item: str) -> float:
+        """Get an app items' price.
+
+        Args:
+            app_id: The app identifier.
+            item: The app item.
+
+        Returns:
+            The price for the item of the app.
+        """
+        return self._appsdb.get_item_price(app_id, item)
+
+
+class AsyncUsersAdapter:
+    """Adapts a users' database to the asynchronous interface."""
+
+    def __init__(self, usersdb: UsersDB) -> None:
+        """Wraps the users' database.
+
+        Args:
+            usersdb: The database to adapt.
+        """
+        self._usersdb = usersdb
+
+    async def get_purchases(self, user_id: str) -> int:
+        """Get the number of purchases the given user made.
+
+        Args:
+            user_id: User identifier.
+
+        Returns:
+            The number of purchases made by the given user.
+        """
+        return self._usersdb.get_purchases(user_id)
+
+    async def increment_purchases(self, user_id: str) -> int:
+        """Count a user's purchase.
+
+        Args:
+            user_id: User identifier.
+
+        Returns:
+            The number of purchases made by the given user after the increment.
+        """
+        return self._usersdb.increment_purchases(user_id)
+
+
+class AsyncAppStore(_SalesController):
+    """The apps store's asynchronous purchases controller."""
+
+    def __init__(
+        self,
+        appstore_id: str,
+        commission: float,
+        bonus_after_purchases: Mapping[int, float],
+        accounts_controller: AsyncAccountsController,
+        appsdb: AsyncAppsDB,
+        usersdb: AsyncUsersDB,
+        recorders: Sequence[SalesRecorder] = (),
+        id_allocator: Optional[IdAllocator] = None,
+    ) -> None:
+        """Initializes the app store's asynchronous purshases controller.
+
+        Args:
+            appstore_id: Identifier for the app store in the accounts controller.
+            commission: Share that the app store gets in each sale.
+            bonus_after_purchases: Mapping from the number of purchases and
+                their corresponding bonus.
+            accounts_controller: A controller for executing transferences between user,
+                appstore, and developer accounts.
+            appsdb: The database where to query for apps' developers and item prices.
+            usersdb: The database where to query users and count their purchases.
+            recorders: Where to record each completed sale.
+            id_allocator: Where to allocate the sales' identifiers.
+                By default, sales are numbered from 1 within the process.
+        """
+        self._accounts = accounts_controller
+        self._usersdb = usersdb
+        self._appsdb = appsdb
+        super().__init__(
+            appstore_id, commission, bonus_after_purchases, recorders, id_allocator
+        )
+
+    async def sell(self, app_id: str, app_item: str, user_id: str) -> Sale:
+        """Sell a app's item to an user.
+
+        The item price, the app developer, and the user purchases are queried
+        concurrently.
+
+        Args:
+            app_id: The identifier of the app where the item belongs.
+            app_item: The app item to sell.
+            user_id: The user who to buys the item.
+
+        Returns:
+            The sale representation.
+        """
+        item_price, developer_id, purchases = await asyncio.gather(
+            self._appsdb.get_item_price(app_id, app_item),
+            self._appsdb.get_developer_id(app_id),
+            self._usersdb.get_purchases(user_id),
+        )
+        sale = self._quote(item_price, developer_id, self._get_bonus(purchases))
+
+        async with self._accounts.transaction():
+            await self._accounts.transfer(user_id, sale.user_debit, self.appstore_id)
+            await self._accounts.transfer(
+                self.appstore_id, sale.developer_credit, developer_id
+            )
+            if sale.reward:
+                await self._accounts.transfer(self.appstore_id, sale.reward, user_id)
+
+        await self._usersdb.increment_purchases(user_id)
+        return self._record(self._identify(sale), app_id, app_item, user_id)
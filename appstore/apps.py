@@ -1,5 +1,7 @@
 """Provides the interface for the apps' database."""
-from typing import Dict, Tuple
+from typing import Dict, Iterable, Mapping, Set, Tuple
+
+from appstore.appstore import Listing
 
 
 class InMemoryAppsDB:
@@ -8,7 +10,8 @@ class InMemoryAppsDB:
     def __init__(self) -> None:
         """Initializes the in-memory apps database."""
         self._app_developers: Dict[str, str] = {}
-        self._app_item_prices: Dict[Tuple[str, str], float] = {}
+        self._listings: Dict[Tuple[str, str], Listing] = {}
+        self._app_items: Dict[str, Set[str]] = {}
 
     def add_app(self, app_id: str, developer_id: str, items: Dict[str, float]) -> None:
         """Adds an application to the apps' database.
@@ -18,10 +21,34 @@ class InMemoryAppsDB:
             developer_id: Identifier for the app's developer.
             items: Mapping from the app items to their prices.
         """
-        self._app_developers[app_id] = developer_id
+        self.add_apps([(app_id, developer_id, items)])
+
+    def add_apps(self, apps: Iterable[Tuple[str, str, Mapping[str, float]]]) -> None:
+        """Adds applications to the apps' database in bulk.
 
-        for item, price in items.items():
-            self._app_item_prices[app_id, item] = price
+        Re-adding an app with another developer moves its listed items
+        to the new developer.
+
+        Args:
+            apps: Tuples with the app identifier, its developer identifier,
+                and the mapping from the app items to their prices.
+        """
+        app_developers = self._app_developers
+        listings = self._listings
+        app_items = self._app_items
+        for app_id, developer_id, items in apps:
+            previous = app_developers.get(app_id, developer_id)
+            app_developers[app_id] = developer_id
+            known_items = app_items.setdefault(app_id, set())
+            if previous != developer_id:
+                for item in known_items:
+                    price = listings[app_id, item].price
+                    listings[app_id, item] = Listing(price, developer_id)
+            known_items.update(items)
+            listings.update(
+                ((app_id, item), Listing(price, developer_id))
+                for item, price in items.items()
+            )
 
     def get_developer_id(self, app_id: str) -> str:
         """Get the developer of a given app.
@@ -45,4 +72,17 @@ class InMemoryAppsDB:
         Returns:
             The price for the item of the app that corresponds to `app_id`.
         """
-        return self._app_item_prices[app_id, item]
+        return self._listings[app_id, item].price
+
+    def get_listing(self, app_id: str, item: str) -> Listing:
+        """Get an app item's price and the app's developer.
+
+        Args:
+            app_id: The app identifier.
+            item: The apps item.
+
+        Returns:
+            The price for the item of the app that corresponds to `app_id`,
+            and the identifier for the developer who published the app.
+        """
+        return self._listings[app_id, item]
@@ -1,8 +1,28 @@
 """Provides the app store's purchase controller."""
+from collections import Counter
 from dataclasses import dataclass, field
-from typing import ContextManager, Mapping, Protocol
+from typing import (
+    Callable,
+    ContextManager,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Protocol,
+    Sequence,
+    Tuple,
+    Union,
+    cast,
+    runtime_checkable,
+)
 
 from appstore.collections import MaxKeyAccessor
+from appstore.ids import IdAllocator, SequentialIdAllocator
+from appstore.metrics import Instrumented, InstrumentedAccounts, Metrics, timed
+
+BONUS_TABLE_SIZE = 1 << 12
 
 
 class AccountsController(Protocol):
@@ -55,6 +75,51 @@ class AppsDB(Protocol):
         ...  # pragma: no cover
 
 
+class Listing(NamedTuple):
+    """An app item's price and the app's developer."""
+
+    price: float
+    developer_id: str
+
+
+@runtime_checkable
+class ListingsDB(AppsDB, Protocol):
+    """An apps' database that also gets items' listings in a single lookup."""
+
+    def get_listing(self, app_id: str, item: str) -> Listing:
+        """Get an app item's price and the app's developer.
+
+        Args:
+            app_id: The app identifier.
+            item: The app item.
+        """
+        ...  # pragma: no cover
+
+
+def listing_getter(appsdb: AppsDB) -> Callable[[str, str], Listing]:
+    """Get a function for getting listings from any apps' database.
+
+    The function makes a single lookup if the database supports it.
+
+    Args:
+        appsdb: The database where to query.
+
+    Returns:
+        A function that gets an app item's price and the app's developer,
+        given the app identifier and the item.
+    """
+    if isinstance(appsdb, ListingsDB):
+        return appsdb.get_listing
+
+    def get_listing(app_id: str, item: str) -> Listing:
+        return Listing(
+            price=appsdb.get_item_price(app_id, item),
+            developer_id=appsdb.get_developer_id(app_id),
+        )
+
+    return get_listing
+
+
 class UsersDB(Protocol):
     """A database where to query for users and count their purchases."""
 
@@ -75,6 +140,48 @@ class UsersDB(Protocol):
         ...  # pragma: no cover
 
 
+@runtime_checkable
+class PurchasesRecorder(UsersDB, Protocol):
+    """A users' database that counts purchases atomically."""
+
+    def record_purchase(self, user_id: str) -> int:
+        """Count a user's purchase, atomically.
+
+        Args:
+            user_id: User identifier.
+        """
+        ...  # pragma: no cover
+
+    def cancel_purchase(self, user_id: str) -> int:
+        """Discount a user's purchase, atomically.
+
+        Args:
+            user_id: User identifier.
+        """
+        ...  # pragma: no cover
+
+
+@runtime_checkable
+class BatchPurchasesRecorder(PurchasesRecorder, Protocol):
+    """A users' database that counts batches of purchases at once."""
+
+    def record_purchases(self, user_ids: Sequence[str]) -> List[Union[int, KeyError]]:
+        """Count a batch of purchases, atomically each.
+
+        Args:
+            user_ids: The user of each purchase.
+        """
+        ...  # pragma: no cover
+
+    def cancel_purchases(self, user_ids: Sequence[str]) -> None:
+        """Discount a batch of purchases, atomically each.
+
+        Args:
+            user_ids: The user of each purchase.
+        """
+        ...  # pragma: no cover
+
+
 @dataclass
 class Sale:
     """Represents a sale transaction."""
@@ -87,7 +194,67 @@ class Sale:
     reward: float = field(default=0)
 
 
-class AppStore:
+class SalesRecorder(Protocol):
+    """Records the sales that an app store completes."""
+
+    def record_sale(self, sale: Sale, app_id: str, app_item: str, user_id: str) -> None:
+        """Records a completed sale.
+
+        Args:
+            sale: The sale representation.
+            app_id: The identifier of the app where the item belongs.
+            app_item: The app item sold.
+            user_id: The user who bought the item.
+        """
+        ...  # pragma: no cover
+
+
+class _SalesController:
+    """Sales' bookkeeping shared by the synchronous and asynchronous app stores."""
+
+    def __init__(
+        self,
+        appstore_id: str,
+        commission: float,
+        bonus_after_purchases: Mapping[int, float],
+        recorders: Sequence[SalesRecorder],
+        id_allocator: Optional[IdAllocator],
+    ) -> None:
+        self.appstore_id = appstore_id
+        self.commission = commission
+        self._bonus_after_purchases = MaxKeyAccessor(
+            bonus_after_purchases, max_table_size=BONUS_TABLE_SIZE
+        )
+        self._id_allocator = (
+            SequentialIdAllocator() if id_allocator is None else id_allocator
+        )
+        self._recorders = recorders
+
+    def _get_bonus(self, purchases: int) -> float:
+        bonus: float = self._bonus_after_purchases.get_max(limit=purchases, default=0)
+        return bonus
+
+    def _quote(self, item_price: float, developer_id: str, bonus: float) -> Sale:
+        return Sale(
+            identifier=0,
+            user_debit=item_price,
+            develper_id=developer_id,
+            developer_credit=item_price * (1 - self.commission),
+            store_credit=item_price * self.commission,
+            reward=bonus * item_price,
+        )
+
+    def _identify(self, sale: Sale) -> Sale:
+        sale.identifier = self._id_allocator.allocate()
+        return sale
+
+    def _record(self, sale: Sale, app_id: str, app_item: str, user_id: str) -> Sale:
+        for recorder in self._recorders:
+            recorder.record_sale(sale, app_id, app_item, user_id)
+        return sale
+
+
+class AppStore(_SalesController):
     """The apps store's purchases controller."""
 
     def __init__(
@@ -98,6 +265,9 @@ class AppStore:
         accounts_controller: AccountsController,
         appsdb: AppsDB,
         usersdb: UsersDB,
+        recorders: Sequence[SalesRecorder] = (),
+        metrics: Optional[Metrics] = None,
+        id_allocator: Optional[IdAllocator] = None,
     ) -> None:
         """Initializes the app store's purshases controller.
 
@@ -110,14 +280,53 @@ class AppStore:
                 appstore, and developer accounts.
             appsdb: The database where to query for apps' developers and item prices.
             usersdb: The database where to query users and count their purchases.
+            recorders: Where to record each completed sale.
+            metrics: Hooks where to report the timings of each stage of the sales,
+                such as a `MetricsRegistry`. Without them, nothing is timed.
+            id_allocator: Where to allocate the sales' identifiers, such as a
+                `BlockIdAllocator` shared with other processes. By default,
+                sales are numbered from 1 within the process.
         """
-        self.appstore_id = appstore_id
-        self.commission = commission
-        self._bonus_after_purchases = MaxKeyAccessor(bonus_after_purchases)
+        super().__init__(
+            appstore_id, commission, bonus_after_purchases, recorders, id_allocator
+        )
         self._accounts = accounts_controller
         self._usersdb = usersdb
         self._appsdb = appsdb
-        self._transactions_id = 1
+        self._get_listing = listing_getter(appsdb)
+        if metrics is not None:
+            self._instrument(metrics)
+        # The protocols are checked on the database itself, not on its proxy,
+        # whose methods are only found by `isinstance` through `__getattr__`
+        # before Python 3.12. The proxy is used, to time the calls.
+        self._recorder = (
+            cast(PurchasesRecorder, self._usersdb)
+            if isinstance(usersdb, PurchasesRecorder)
+            else None
+        )
+        self._batch_recorder = (
+            cast(BatchPurchasesRecorder, self._usersdb)
+            if isinstance(usersdb, BatchPurchasesRecorder)
+            else None
+        )
+
+    def _instrument(self, metrics: Metrics) -> None:
+        """Wraps the dependencies, so that each stage of the sales is timed.
+
+        The stages are the listing lookup, `appstore.get_listing`,
+        the purchases' count read and increment, `users.*`,
+        and the accounts' transaction, `accounts.transaction`.
+        Instrumenting on initialization keeps the sales untouched without metrics.
+
+        Args:
+            metrics: The hooks where to report.
+        """
+        self._accounts = cast(
+            AccountsController,
+            InstrumentedAccounts(self._accounts, metrics, "accounts"),
+        )
+        self._usersdb = cast(UsersDB, Instrumented(self._usersdb, metrics, "users"))
+        self._get_listing = timed(self._get_listing, metrics, "appstore.get_listing")
 
     def sell(self, app_id: str, app_item: str, user_id: str) -> Sale:
         """Sell a app's item to an user.
@@ -130,29 +339,146 @@ class AppStore:
         Returns:
             The sale representation.
         """
-        item_price = self._appsdb.get_item_price(app_id, app_item)
-        developer_id = self._appsdb.get_developer_id(app_id)
-        developer_credit = item_price * (1 - self.commission)
-        appstore_credit = item_price * self.commission
-        bonus: float = self._bonus_after_purchases.get_max(
-            limit=self._usersdb.get_purchases(user_id), default=0
+        listing = self._get_listing(app_id, app_item)
+        return self._record(
+            self._sell_listing(user_id, listing), app_id, app_item, user_id
         )
-        reward = bonus * item_price
 
-        with self._accounts.transaction():
-            self._accounts.transfer(user_id, item_price, self.appstore_id)
-            self._accounts.transfer(self.appstore_id, developer_credit, developer_id)
-            if reward:
-                self._accounts.transfer(self.appstore_id, reward, user_id)
+    def sell_many(
+        self, purchases: Iterable[Tuple[str, str, str]]
+    ) -> List[Union[Sale, Exception]]:
+        """Sell a batch of apps' items.
 
-        self._usersdb.increment_purchases(user_id)
-        _id = self._transactions_id
-        self._transactions_id += 1
-        return Sale(
-            identifier=_id,
-            user_debit=item_price,
-            develper_id=developer_id,
-            developer_credit=developer_credit,
-            store_credit=appstore_credit,
-            reward=reward,
+        Each sale runs in its own transaction, so a failing sale doesn't abort
+        the batch. Items' listings are looked up once per batch.
+        If the users' database counts batches of purchases, such as
+        `RESPUsersDB`, the batch's purchases are counted at once, before the sales.
+
+        Args:
+            purchases: Tuples with the app identifier, the app item,
+                and the user who buys the item.
+
+        Returns:
+            For each purchase, in the same order, either the sale representation
+            or the exception that made the sale fail.
+        """
+        if self._batch_recorder is not None:
+            return self._sell_batch(self._batch_recorder, list(purchases))
+
+        listings: Dict[Tuple[str, str], Listing] = {}
+        results: List[Union[Sale, Exception]] = []
+
+        for app_id, app_item, user_id in purchases:
+            try:
+                item = (app_id, app_item)
+                if item not in listings:
+                    listings[item] = self._get_listing(app_id, app_item)
+                sale = self._sell_listing(user_id, listings[item])
+                results.append(self._record(sale, app_id, app_item, user_id))
+
+            except Exception as err:  # pylint: disable=broad-except
+                results.append(err)
+
+        return results
+
+    def _get_listings(
+        self, purchases: Sequence[Tuple[str, str, str]]
+    ) -> Dict[Tuple[str, str], Union[Listing, Exception]]:
+        listings: Dict[Tuple[str, str], Union[Listing, Exception]] = {}
+        for app_id, app_item, _ in purchases:
+            if (app_id, app_item) not in listings:
+                try:
+                    listings[app_id, app_item] = self._get_listing(app_id, app_item)
+                except Exception as err:  # pylint: disable=broad-except
+                    listings[app_id, app_item] = err
+        return listings
+
+    def _sell_batch(
+        self,
+        recorder: BatchPurchasesRecorder,
+        purchases: Sequence[Tuple[str, str, str]],
+    ) -> List[Union[Sale, Exception]]:
+        listings = self._get_listings(purchases)
+        counts = iter(
+            recorder.record_purchases(
+                [
+                    user_id
+                    for app_id, app_item, user_id in purchases
+                    if isinstance(listings[app_id, app_item], Listing)
+                ]
+            )
         )
+        results: List[Union[Sale, Exception]] = []
+        # The purchases counted in the batch for sales that then failed,
+        # which don't count for the bonuses of the users' later sales.
+        cancelled: Counter[str] = Counter()
+
+        for app_id, app_item, user_id in purchases:
+            listing = listings[app_id, app_item]
+            if isinstance(listing, Exception):
+                results.append(listing)
+                continue
+            count = next(counts)
+            if isinstance(count, Exception):
+                results.append(count)
+                continue
+            bonus = self._get_bonus(count - cancelled[user_id])
+            try:
+                sale = self._settle(user_id, listing.price, listing.developer_id, bonus)
+            except Exception as err:  # pylint: disable=broad-except
+                cancelled[user_id] += 1
+                results.append(err)
+                continue
+            try:
+                results.append(self._record(sale, app_id, app_item, user_id))
+            except Exception as err:  # pylint: disable=broad-except
+                results.append(err)
+
+        if cancelled:
+            recorder.cancel_purchases(list(cancelled.elements()))
+        return results
+
+    def _sell_listing(self, user_id: str, listing: Listing) -> Sale:
+        """Sell a listed item to a user.
+
+        If the users' database records purchases atomically, the purchase is
+        recorded before the transferences, and cancelled if they fail.
+        So, concurrent sales to the same user get different bonuses.
+
+        Args:
+            user_id: The user who buys the item.
+            listing: The item's price and the app's developer.
+
+        Returns:
+            The sale representation.
+        """
+        item_price, developer_id = listing
+        if self._recorder is not None:
+            purchases = self._recorder.record_purchase(user_id)
+            try:
+                return self._settle(
+                    user_id, item_price, developer_id, self._get_bonus(purchases)
+                )
+            except BaseException:
+                self._recorder.cancel_purchase(user_id)
+                raise
+
+        bonus = self._get_bonus(self._usersdb.get_purchases(user_id))
+        sale = self._settle(user_id, item_price, developer_id, bonus)
+        self._usersdb.increment_purchases(user_id)
+        return sale
+
+    def _settle(
+        self, user_id: str, item_price: float, developer_id: str, bonus: float
+    ) -> Sale:
+        sale = self._quote(item_price, developer_id, bonus)
+
+        with self._accounts.transaction():
+            self._accounts.transfer(user_id, sale.user_debit, self.appstore_id)
+            self._accounts.transfer(
+                self.appstore_id, sale.developer_credit, developer_id
+            )
+            if sale.reward:
+                self._accounts.transfer(self.appstore_id, sale.reward, user_id)
+
+        return self._identify(sale)
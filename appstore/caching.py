@@ -0,0 +1,189 @@
+"""Provides a read-through cache for apps' databases."""
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Mapping, Optional, Tuple, TypeVar, cast
+
+from appstore.appstore import AppsDB, Listing, listing_getter
+
+T = TypeVar("T")
+
+_Key = Tuple[str, ...]
+
+
+@dataclass
+class CacheStats:
+    """Counts a cache's hits and misses."""
+
+    hits: int = 0
+    misses: int = 0
+
+
+class CachedAppsDB:
+    """Caches the lookups of an apps' database.
+
+    The cache evicts the least recently used entries when it is full,
+    and the entries older than the time to live.
+    Unknown apps and items are cached too, as misses.
+    Lookups loaded while their app is invalidated aren't cached,
+    so that they can't bring back stale values.
+
+    >>> from appstore.apps import InMemoryAppsDB
+    >>> appsdb = CachedAppsDB(InMemoryAppsDB(), maxsize=2)
+    >>> appsdb.add_app("App", developer_id="Dev", items={"Item": 1.0})
+    >>> appsdb.get_item_price("App", "Item"), appsdb.get_item_price("App", "Item")
+    (1.0, 1.0)
+    >>> appsdb.stats
+    CacheStats(hits=1, misses=1)
+    """
+
+    def __init__(
+        self,
+        appsdb: AppsDB,
+        maxsize: int = 4096,
+        ttl: Optional[float] = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """Wraps the apps' database.
+
+        Args:
+            appsdb: The database to cache.
+            maxsize: The maximum number of cached lookups.
+            ttl: Seconds after which a cached lookup expires,
+                or `None` for never expiring lookups.
+            clock: Function returning the current time in seconds.
+        """
+        self._appsdb = appsdb
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[_Key, Tuple[float, object]]" = OrderedDict()
+        self._locker = threading.Lock()
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        """Counts the cached lookups.
+
+        Returns:
+            The number of cached lookups.
+        """
+        return len(self._entries)
+
+    def _get(self, key: _Key, load: Callable[[], T]) -> T:
+        now = self._clock()
+        with self._locker:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry[0]:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                value = entry[1]
+                if isinstance(value, KeyError):
+                    raise KeyError(*value.args)
+                return cast(T, value)
+            self.stats.misses += 1
+            # An expired placeholder, which invalidations discard like any entry,
+            # so that the loaded value is only cached if it is still there.
+            loading = (-math.inf, object())
+            self._entries[key] = loading
+
+        expires = now + self._ttl if self._ttl is not None else math.inf
+        try:
+            loaded = load()
+        except KeyError as error:
+            self._put(key, loading, (expires, error))
+            raise
+        self._put(key, loading, (expires, loaded))
+        return loaded
+
+    def _put(
+        self, key: _Key, loading: Tuple[float, object], entry: Tuple[float, object]
+    ) -> None:
+        with self._locker:
+            if self._entries.get(key) is not loading:
+                return
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+
+    def get_developer_id(self, app_id: str) -> str:
+        """Get the developer of a given app.
+
+        Args:
+            app_id: The app identifier.
+
+        Returns:
+            The identifier for the developer who published the app
+            that corresponds to `app_id`.
+        """
+        return self._get(
+            ("developer", app_id), lambda: self._appsdb.get_developer_id(app_id)
+        )
+
+    def get_item_price(self, app_id: str, item: str) -> float:
+        """Get an app items' price.
+
+        Args:
+            app_id: The app identifier.
+            item: The app item.
+
+        Returns:
+            The price for the item of the app that corresponds to `app_id`.
+        """
+        return self._get(
+            ("price", app_id, item), lambda: self._appsdb.get_item_price(app_id, item)
+        )
+
+    def get_listing(self, app_id: str, item: str) -> Listing:
+        """Get an app item's price and the app's developer.
+
+        Args:
+            app_id: The app identifier.
+            item: The app item.
+
+        Returns:
+            The price for the item of the app that corresponds to `app_id`,
+            and the identifier for the developer who published the app.
+        """
+        return self._get(
+            ("listing", app_id, item),
+            lambda: listing_getter(self._appsdb)(app_id, item),
+        )
+
+    def invalidate(self, app_id: Optional[str] = None) -> None:
+        """Discards cached lookups.
+
+        Args:
+            app_id: The app whose lookups to discard, or `None` for discarding all.
+        """
+        with self._locker:
+            if app_id is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[1] == app_id]:
+                del self._entries[key]
+
+    def add_app(self, app_id: str, developer_id: str, items: Dict[str, float]) -> None:
+        """Adds an application to the wrapped database and discards its lookups.
+
+        Args:
+            app_id: Identifier for the app.
+            developer_id: Identifier for the app's developer.
+            items: Mapping from the app items to their prices.
+        """
+        add_app = getattr(self._appsdb, "add_app")
+        add_app(app_id, developer_id, items)
+        self.invalidate(app_id)
+
+    def add_apps(self, apps: Iterable[Tuple[str, str, Mapping[str, float]]]) -> None:
+        """Adds applications to the wrapped database in bulk and discards all lookups.
+
+        Args:
+            apps: Tuples with the app identifier, its developer identifier,
+                and the mapping from the app items to their prices.
+        """
+        add_apps = getattr(self._appsdb, "add_apps")
+        add_apps(apps)
+        self.invalidate()
@@ -1,17 +1,26 @@
 """Provide the command line interface for the app store's purchases manager."""
+import argparse
+import asyncio
+import json
 import os
+import sys
 import textwrap
-from typing import Dict, List
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, TextIO
 
 import appstore.accounts
 from appstore.apps import InMemoryAppsDB
 from appstore.appstore import AccountsController, AppsDB, AppStore, UsersDB
+from appstore.loader import read_apps, read_balances, read_users
+from appstore.server import StoreServer
 from appstore.users import InMemoryUsersDB
 
 EXIT_CMDS = {"exit"}
 
 CUR = "€"
 
+BATCH_BUFFER_LINES = 4096
+
 APPSTORE_ID = "AptoideStore#1"
 INITIAL_BALANCE = 10.0
 APPS = ["TrivialDrive", "DiamondLegendDeveloper"]
@@ -20,34 +29,39 @@ ITEMS: List[Dict[str, float]] = [{"Oil": 1, "Antifreeze": 1.20}, {"5x_Diamonds":
 USERS = ["User#123"]
 
 
-def _create_accounts() -> AccountsController:
+def _create_accounts(balances: Optional[Path] = None) -> AccountsController:
     accounts = appstore.accounts.AccountsController()
-    for holder_id in DEVS + USERS + [APPSTORE_ID]:
-        accounts.deposit(INITIAL_BALANCE, holder_id)
+    if balances is None:
+        holders = DEVS + USERS + [APPSTORE_ID]
+        accounts.deposit_many((INITIAL_BALANCE, holder_id) for holder_id in holders)
+    else:
+        accounts.deposit_many(read_balances(balances))
     return accounts
 
 
-def _create_apps() -> AppsDB:
+def _create_apps(apps: Optional[Path] = None) -> AppsDB:
     appsdb = InMemoryAppsDB()
-    for app, dev, items in zip(APPS, DEVS, ITEMS):
-        appsdb.add_app(app_id=app, developer_id=dev, items=items)
+    appsdb.add_apps(zip(APPS, DEVS, ITEMS) if apps is None else read_apps(apps))
     return appsdb
 
 
-def _create_users() -> UsersDB:
+def _create_users(users: Optional[Path] = None) -> UsersDB:
     usersdb = InMemoryUsersDB()
-    for user in USERS:
-        usersdb.add_user(user)
+    usersdb.add_users(USERS if users is None else read_users(users))
     return usersdb
 
 
-def _create_appstore(accounts: AccountsController) -> AppStore:
+def _create_appstore(
+    accounts: AccountsController,
+    apps: Optional[Path] = None,
+    users: Optional[Path] = None,
+) -> AppStore:
     return AppStore(
         appstore_id=APPSTORE_ID,
         commission=0.25,
         accounts_controller=accounts,
-        appsdb=_create_apps(),
-        usersdb=_create_users(),
+        appsdb=_create_apps(apps),
+        usersdb=_create_users(users),
         bonus_after_purchases={1: 0.05, 10: 0.10},
     )
 
@@ -93,7 +107,50 @@ def _sell(
         )
 
 
-def _help() -> str:
+def _sell_record(
+    accounts: AccountsController, store: AppStore, app: str, item: str, user: str
+) -> Dict[str, Any]:
+    try:
+        sale = store.sell(app_id=app, app_item=item, user_id=user)
+    except KeyError as err:
+        _id = err.args[0]
+        if isinstance(_id, tuple):
+            _id = _id[-1]
+        return {"error": "not_found", "id": _id}
+    except appstore.accounts.ForbiddenDebit as err:
+        return {
+            "error": "forbidden_debit",
+            "holder": err.holder_id,
+            "amount": -1 * err.amount,
+            "balance": err.balance,
+        }
+    return {
+        "sale": sale.identifier,
+        "app": app,
+        "item": item,
+        "user": user,
+        "amount": sale.user_debit,
+        "developer": sale.develper_id,
+        "developer_credit": sale.developer_credit,
+        "store_credit": sale.store_credit,
+        "reward": sale.reward,
+        "balances": {
+            holder: accounts.get_balance(holder)
+            for holder in (user, sale.develper_id, APPSTORE_ID)
+        },
+    }
+
+
+def _help(catalog: bool = True) -> str:
+    text = """
+    Supported commands:
+
+        sell APP ITEM USER
+
+        exit"""
+    if not catalog:
+        return text
+
     items_lines = []
     ident = "    "
     for app, items in zip(APPS, ITEMS):
@@ -104,12 +161,7 @@ def _help() -> str:
     items_list = os.linesep.join(items_lines)
     users_list = os.linesep.join(f"- {user}" for user in USERS)
 
-    text = f"""
-    Supported commands:
-
-        sell APP ITEM USER
-
-        exit
+    text += f"""
 
 
     Available apps and included items:
@@ -144,3 +196,118 @@ def run() -> None:
 
         else:
             print(_help())
+
+
+def batch(
+    commands: Iterable[str],
+    output: TextIO,
+    as_json: bool = False,
+    accounts: Optional[AccountsController] = None,
+    store: Optional[AppStore] = None,
+    catalog: bool = True,
+) -> None:
+    """Run commands in bulk, until they end or an exit command.
+
+    Unlike the REPL, there are no prompts, blank lines are skipped and
+    the output is written in chunks, so that long scripts replay quickly.
+
+    Args:
+        commands: The commands, one per line.
+        output: Where to write the commands' output.
+        as_json: Whether to write a compact JSON object per command,
+            instead of the human readable text.
+        accounts: The accounts controller, by default with the initial balances.
+        store: The app store, by default with the available apps and users.
+        catalog: Whether the help lists the default apps, users and balances.
+            It doesn't when they are loaded from files instead.
+    """
+    if accounts is None:
+        accounts = _create_accounts()
+    if store is None:
+        store = _create_appstore(accounts=accounts)
+    help_text = _help(catalog)
+    buffer: List[str] = []
+
+    for command in commands:
+        args = command.split()
+        if not args:
+            continue
+        if command.strip() in EXIT_CMDS:
+            break
+
+        sell = len(args) == 4 and args[0] == "sell"
+        if not as_json:
+            buffer.append(_sell(accounts, store, *args[1:]) if sell else help_text)
+        else:
+            record = (
+                _sell_record(accounts, store, *args[1:])
+                if sell
+                else {"error": "unknown_command", "command": command.strip()}
+            )
+            buffer.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+
+        if len(buffer) >= BATCH_BUFFER_LINES:
+            output.write("\n".join(buffer) + "\n")
+            buffer.clear()
+
+    if buffer:
+        output.write("\n".join(buffer) + "\n")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """Run the command line interface, interactively, in batch mode or as a server.
+
+    Args:
+        argv: The command line arguments, or `None` for the process' arguments.
+    """
+    parser = argparse.ArgumentParser(prog="appstore")
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="run the commands in FILE, or in the standard input if FILE is -",
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="in batch mode, write a JSON object per command",
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="PORT",
+        type=int,
+        help="serve the store over TCP on PORT, instead of reading commands",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="where to serve")
+    for name, fields in [
+        ("apps", "app_id, developer_id, item and price"),
+        ("users", "user_id"),
+        ("balances", "holder_id and amount"),
+    ]:
+        parser.add_argument(
+            f"--{name}",
+            metavar="FILE",
+            type=Path,
+            help=f"in batch or server mode, load the {name} from a JSON lines "
+            f"or CSV file, with {fields}",
+        )
+    args = parser.parse_args(argv)
+
+    if args.serve is None and args.batch is None:
+        if args.json:
+            parser.error("--json requires --batch")
+        if args.apps or args.users or args.balances:
+            parser.error("--apps, --users and --balances require --batch or --serve")
+        run()
+        return
+
+    accounts = _create_accounts(args.balances)
+    store = _create_appstore(accounts, args.apps, args.users)
+    catalog = not (args.apps or args.users or args.balances)
+    if args.serve is not None:
+        server = StoreServer(store, accounts)
+        asyncio.run(server.serve_forever(args.host, args.serve))
+    elif args.batch == "-":
+        batch(sys.stdin, sys.stdout, args.json, accounts, store, catalog)
+    else:
+        with open(args.batch, encoding="utf-8") as commands:
+            batch(commands, sys.stdout, args.json, accounts, store, catalog)
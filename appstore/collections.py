@@ -1,5 +1,19 @@
 """Provides collection data structures."""
-from typing import Any, List, Mapping, Optional, Protocol, TypeVar
+from bisect import bisect_right
+from itertools import islice
+from typing import (
+    Any,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Protocol,
+    Sequence,
+    TypeVar,
+    cast,
+)
 
 
 class Comparable(Protocol):
@@ -11,9 +25,10 @@ class Comparable(Protocol):
 
 K = TypeVar("K", bound=Comparable)
 V = TypeVar("V")
+T = TypeVar("T")
 
 
-class MaxKeyAccessor:
+class MaxKeyAccessor(Generic[K, V]):
     """Mapping wrapper for accessing the value corresponding to the maximum key.
 
     >>> accessor = MaxKeyAccessor({1: 10, 2: 20, 4: 40})
@@ -23,22 +38,47 @@ class MaxKeyAccessor:
     20
     >>> accessor.get_max(limit=4)
     40
+    >>> accessor.get_max_many([3, 0, 5], default=0)
+    [20, 0, 40]
 
     The access' time complexity is optimal:
         O(log(n))
+
+    For integer keys, the values of all integer limits between the smallest and
+    the biggest key can be precomputed in a table, making the access O(1).
+
+    >>> accessor = MaxKeyAccessor({1: 10, 2: 20, 4: 40}, max_table_size=8)
+    >>> accessor.get_max(limit=3)
+    20
     """
 
-    def __init__(self, mapping: Mapping[K, V]) -> None:
+    def __init__(self, mapping: Mapping[K, V], max_table_size: int = 0) -> None:
         """Wraps the mapping.
 
         The time complexity is _O(n * log(n))_.
 
         Args:
             mapping: Mapping with the entries to create.
+            max_table_size: Maximum size of the table of precomputed values.
+                A table is only precomputed for integer keys, and if the difference
+                between the biggest and smallest keys doesn't exceed this size.
         """
         self._mapping: Mapping[K, V] = mapping
         self._keys: List[K] = list(mapping.keys())
         self._keys.sort()
+        self._values: List[V] = [mapping[key] for key in self._keys]
+        self._table: Optional[List[V]] = None
+
+        keys = cast(List[int], self._keys)
+        if (
+            keys
+            and all(isinstance(key, int) for key in keys)
+            and keys[-1] - keys[0] < max_table_size
+        ):
+            self._table = [
+                self._values[self._get_max_key_index(cast(K, limit))]
+                for limit in range(keys[0], keys[-1] + 1)
+            ]
 
     def _get_max_key_index(self, limit: K) -> int:
         """Find the maximum key's index using binary search.
@@ -47,32 +87,16 @@ class MaxKeyAccessor:
             limit: The limit for the keys to consider.
 
         Returns:
-            The index maximum key in self._keys.
+            The index maximum key in self._keys,
+            or -1 if all keys are bigger than the limit.
         """
-        i = 0
-        j = len(self._keys)
-        k = ((j - i) // 2) + i
-
-        while i < j:
-            if self._keys[k] == limit or (
-                k + 1 < len(self._keys) and self._keys[k] < limit < self._keys[k + 1]
-            ):
-                break
-
-            if self._keys[k] < limit:
-                i = k + 1
-
-            if self._keys[k] > limit:
-                j = k - 1
-
-            k = ((j - i) // 2) + i
-
-        return k
+        return bisect_right(self._keys, limit) - 1
 
     def get_max(self, limit: Optional[K] = None, default: Optional[V] = None) -> V:
         """Get value for maximum key.
 
-        The time complexity is _O(log(n))_.
+        The time complexity is _O(log(n))_, or _O(1)_ for integer limits
+        with a precomputed table.
 
         Args:
             limit: The limit for the keys to consider.
@@ -94,10 +118,67 @@ class MaxKeyAccessor:
             raise KeyError()
 
         if limit is None:
-            max_key = self._keys[-1]
+            return self._values[-1]
+
+        if self._table is not None and isinstance(limit, int):
+            offset = limit - cast(int, self._keys[0])
+            if offset < len(self._table):
+                return self._table[offset]
+            return self._values[-1]
 
-        else:
-            max_key_index = self._get_max_key_index(limit)
-            max_key = self._keys[max_key_index]
+        return self._values[self._get_max_key_index(limit)]
 
-        return self._mapping[max_key]
+    def get_max_many(self, limits: Sequence[K], default: Optional[V] = None) -> List[V]:
+        """Get values for the maximum keys of many limits, in a single pass.
+
+        The limits are sorted and then merged with the keys, so the time complexity
+        is _O(m * log(m) + n)_, for _m_ limits.
+
+        Args:
+            limits: The limits for the keys to consider.
+            default: The value for the limits smaller than all keys.
+
+        Raises:
+            KeyError: if `default` is `None` and some limit is smaller than all keys.
+
+        Returns:
+            The value for the maximum key smaller or equal than each limit,
+            in the same order as the limits.
+        """
+        if self._table is not None:
+            return [self.get_max(limit, default) for limit in limits]
+
+        results = [cast(V, default)] * len(limits)
+        key_index = -1
+        for position in sorted(range(len(limits)), key=limits.__getitem__):
+            limit = limits[position]
+            while key_index + 1 < len(self._keys) and not (
+                limit < self._keys[key_index + 1]
+            ):
+                key_index += 1
+            if key_index >= 0:
+                results[position] = self._values[key_index]
+            elif default is None:
+                raise KeyError(limit)
+        return results
+
+
+def chunks(items: Iterable[T], chunk_size: int) -> Iterator[List[T]]:
+    """Splits items in chunks, consuming them lazily.
+
+    >>> list(chunks(range(5), 2))
+    [[0, 1], [2, 3], [4]]
+
+    Args:
+        items: The items to split.
+        chunk_size: The maximum number of items in a chunk.
+
+    Yields:
+        The chunks, in the items' order.
+    """
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
@@ -0,0 +1,128 @@
+"""Provides streaming exports of sales, in CSV and binary formats."""
+import csv
+import struct
+from dataclasses import astuple, fields
+from typing import BinaryIO, Iterable, Iterator, TextIO
+
+from appstore.appstore import Sale
+from appstore.collections import chunks
+
+CHUNK_SIZE = 1024
+DEVELOPER_ID_SIZE = 64
+
+_MAGIC = b"APPSALE1"
+_RECORD = struct.Struct(f"<q{DEVELOPER_ID_SIZE}sdddd")
+FIELDS = [sale_field.name for sale_field in fields(Sale)]
+
+
+def write_csv(sales: Iterable[Sale], file: TextIO, chunk_size: int = CHUNK_SIZE) -> int:
+    """Writes sales as CSV, a chunk at a time.
+
+    Only a chunk of sales is held in memory, whatever the number of sales.
+
+    Args:
+        sales: The sales to write, such as `(entry.sale for entry in journal)`.
+        file: The text file where to write, opened with `newline=""`.
+        chunk_size: The number of sales to write at a time.
+
+    Returns:
+        The number of sales written.
+    """
+    writer = csv.writer(file)
+    writer.writerow(FIELDS)
+    count = 0
+    for chunk in chunks(sales, chunk_size):
+        rows = [astuple(sale) for sale in chunk]
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+
+def _pack(sale: Sale) -> bytes:
+    developer_id = sale.develper_id.encode()
+    if len(developer_id) > DEVELOPER_ID_SIZE or developer_id.endswith(b"\0"):
+        raise ValueError(f"Can't export developer identifier: {sale.develper_id}")
+    return _RECORD.pack(
+        sale.identifier,
+        developer_id,
+        sale.user_debit,
+        sale.developer_credit,
+        sale.store_credit,
+        sale.reward,
+    )
+
+
+def write_binary(
+    sales: Iterable[Sale], file: BinaryIO, chunk_size: int = CHUNK_SIZE
+) -> int:
+    """Writes sales as fixed-width binary records, a chunk at a time.
+
+    The file has a magic header followed by a record per sale,
+    with its identifier, as an 8-byte integer, its developer identifier,
+    as a NUL-padded UTF-8 string, and its amounts, as 8-byte floats.
+
+    Args:
+        sales: The sales to write, such as `(entry.sale for entry in journal)`.
+        file: The binary file where to write.
+        chunk_size: The number of sales to write at a time.
+
+    Raises:
+        ValueError: if a developer identifier doesn't fit in a record.
+
+    Returns:
+        The number of sales written.
+    """
+    file.write(_MAGIC)
+    count = 0
+    for chunk in chunks(sales, chunk_size):
+        records = b"".join(_pack(sale) for sale in chunk)
+        file.write(records)
+        count += len(records) // _RECORD.size
+    return count
+
+
+def read_binary(file: BinaryIO, chunk_size: int = CHUNK_SIZE) -> Iterator[Sale]:
+    """Reads sales written by `write_binary`, a chunk at a time.
+
+    >>> from io import BytesIO
+    >>> file = BytesIO()
+    >>> write_binary([Sale(1, 2.0, "Dev", 1.5, 0.5)], file)
+    1
+    >>> [sale.develper_id for sale in read_binary(BytesIO(file.getvalue()))]
+    ['Dev']
+
+    Args:
+        file: The binary file where to read.
+        chunk_size: The number of sales to read at a time.
+
+    Raises:
+        ValueError: if the file isn't a sales export, or it is truncated.
+
+    Yields:
+        The sales, in the order they were written.
+    """
+    if file.read(len(_MAGIC)) != _MAGIC:
+        raise ValueError("Not a sales export.")
+    while True:
+        records = file.read(chunk_size * _RECORD.size)
+        if not records:
+            return
+        if len(records) % _RECORD.size:
+            raise ValueError("Truncated sales export.")
+        for record in _RECORD.iter_unpack(records):
+            (
+                identifier,
+                developer_id,
+                debit,
+                developer_credit,
+                store_credit,
+                reward,
+            ) = record
+            yield Sale(
+                identifier=identifier,
+                user_debit=debit,
+                develper_id=developer_id.rstrip(b"\0").decode(),
+                developer_credit=developer_credit,
+                store_credit=store_credit,
+                reward=reward,
+            )
@@ -0,0 +1,203 @@
+"""Provides allocators of sales' identifiers, unique across threads and processes.
+
+The default allocator counts from 1 within a process. To share identifiers among
+worker processes, a `BlockIdAllocator` leases blocks of consecutive identifiers
+from a shared source, the "hi" part, and hands them out one by one, the "lo" part.
+Only leasing a block synchronizes with the other allocators, so identifiers are
+unique but, across threads and processes, not in order.
+
+>>> source = SharedIdSource()
+>>> first, second = BlockIdAllocator(source, 10), BlockIdAllocator(source, 10)
+>>> first.allocate(), first.allocate(), second.allocate(), first.allocate()
+(1, 2, 11, 3)
+"""
+import itertools
+import multiprocessing
+import os
+import threading
+from multiprocessing.context import BaseContext
+from pathlib import Path
+from typing import Iterator, Optional, Protocol, Union
+
+
+class IdAllocator(Protocol):
+    """An allocator of unique identifiers."""
+
+    def allocate(self) -> int:
+        """Allocates an identifier.
+
+        Returns:
+            An identifier not allocated before.
+        """
+        ...  # pragma: no cover
+
+
+class IdSource(Protocol):
+    """A shared source of blocks of identifiers."""
+
+    def lease(self, size: int) -> int:
+        """Leases a block of consecutive identifiers.
+
+        Args:
+            size: The number of identifiers in the block.
+
+        Returns:
+            The first identifier of the block, not leased before.
+        """
+        ...  # pragma: no cover
+
+
+class SequentialIdAllocator:
+    """Allocates consecutive identifiers within a process, without locks.
+
+    Advancing the counter is a single atomic step under the interpreter lock.
+    """
+
+    def __init__(self, start: int = 1) -> None:
+        """Initializes the allocator.
+
+        Args:
+            start: The first identifier.
+        """
+        self._counter = itertools.count(start)
+
+    def allocate(self) -> int:
+        """Allocates the next identifier.
+
+        Returns:
+            The identifier.
+        """
+        return next(self._counter)
+
+
+class SharedIdSource:
+    """A source of identifiers in shared memory.
+
+    It's shared with the worker processes it's passed to when they are created.
+    """
+
+    def __init__(self, start: int = 1, context: Optional[BaseContext] = None) -> None:
+        """Initializes the source.
+
+        Args:
+            start: The first identifier.
+            context: The multiprocessing context of the worker processes,
+                such as `multiprocessing.get_context("spawn")`.
+                By default, the default context.
+        """
+        context = multiprocessing.get_context() if context is None else context
+        self._next = context.Value("q", start)
+
+    def lease(self, size: int) -> int:
+        """Leases a block of consecutive identifiers.
+
+        Args:
+            size: The number of identifiers in the block.
+
+        Returns:
+            The first identifier of the block.
+        """
+        with self._next.get_lock():
+            start: int = self._next.value
+            self._next.value = start + size
+        return start
+
+
+class FileIdSource:
+    """A source of identifiers in a file, shared by any process that opens it.
+
+    Leases are serialized with an exclusive lock on a `.lock` file next to it,
+    so it must be on a local file system supporting POSIX locks, unlike Windows.
+    The file keeps the next identifier, so identifiers are not reused
+    after restarts. It's replaced atomically, so that a crash never leaves it
+    empty, nor lets a lease start again from the first identifier.
+    """
+
+    def __init__(self, path: Union[str, Path], start: int = 1) -> None:
+        """Initializes the source.
+
+        Args:
+            path: The file path. It's created if it doesn't exist.
+            start: The first identifier, if the file doesn't exist.
+        """
+        self._path = Path(path)
+        self._start = start
+
+    def lease(self, size: int) -> int:
+        """Leases a block of consecutive identifiers.
+
+        Args:
+            size: The number of identifiers in the block.
+
+        Returns:
+            The first identifier of the block.
+        """
+        # Imported here, so that the other sources work where it's missing.
+        import fcntl  # pylint: disable=import-outside-toplevel
+
+        path = self._path
+        with path.with_name(path.name + ".lock").open("ab") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                start = int(path.read_bytes())
+            except FileNotFoundError:
+                start = self._start
+            partial_path = path.with_name(path.name + ".partial")
+            with partial_path.open("wb") as file:
+                file.write(b"%d\n" % (start + size))
+                file.flush()
+                os.fsync(file.fileno())
+            partial_path.replace(path)
+            # The rename must be durable too, or the next lease would start
+            # from an identifier already leased.
+            directory = os.open(path.parent, os.O_RDONLY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+        return start
+
+
+class BlockIdAllocator:
+    """Allocates identifiers from blocks leased from a shared source.
+
+    Each thread leases its own blocks, so allocating doesn't take any lock
+    until the thread's block runs out. Blocks are tagged with the process
+    that leased them, so forked processes don't reuse their parent's block.
+    """
+
+    def __init__(self, source: IdSource, block_size: int = 1000) -> None:
+        """Initializes the allocator.
+
+        Args:
+            source: The shared source of the blocks.
+            block_size: The number of identifiers in each block. Larger blocks
+                lease less often, but leave larger gaps when discarded on exit.
+
+        Raises:
+            ValueError: if the block size isn't positive.
+        """
+        if block_size < 1:
+            raise ValueError("The block size must be positive.")
+        self._source = source
+        self._block_size = block_size
+        self._local = threading.local()
+
+    def allocate(self) -> int:
+        """Allocates the next identifier of the thread's block.
+
+        Returns:
+            The identifier.
+        """
+        local = self._local
+        pid = os.getpid()
+        try:
+            if local.pid == pid:
+                identifier: int = next(local.block)
+                return identifier
+        except (AttributeError, StopIteration):
+            pass
+        start = self._source.lease(self._block_size)
+        block: Iterator[int] = iter(range(start, start + self._block_size))
+        local.block, local.pid = block, pid
+        return next(block)
@@ -0,0 +1,297 @@
+"""Provides a columnar history of sales."""
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+from typing import (
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+    overload,
+)
+
+from appstore.appstore import Sale
+
+KEY_COLUMNS = ("app_id", "app_item", "user_id", "developer_id")
+AMOUNT_COLUMNS = ("user_debit", "developer_credit", "store_credit", "reward")
+
+
+class JournalEntry(NamedTuple):
+    """A journaled sale, with when and what was sold to whom."""
+
+    time: float
+    app_id: str
+    app_item: str
+    user_id: str
+    sale: Sale
+
+
+class _KeyColumn:
+    """A column of strings, interned to dense integer identifiers."""
+
+    def __init__(self) -> None:
+        self.ids: Dict[str, int] = {}
+        self.values: List[str] = []
+        self.rows = array("q")
+
+    def append(self, value: str) -> None:
+        """Appends a string to the column.
+
+        Args:
+            value: The string to append.
+        """
+        identifier = self.ids.get(value)
+        if identifier is None:
+            identifier = self.ids[value] = len(self.values)
+            self.values.append(value)
+        self.rows.append(identifier)
+
+    def get(self, index: int) -> str:
+        """Get the string at a position.
+
+        Args:
+            index: The position.
+
+        Returns:
+            The string at the position.
+        """
+        return self.values[self.rows[index]]
+
+
+class SalesJournal:
+    """Journals sales in columns, for aggregating them without materializing them.
+
+    Each sale's fields are appended to typed arrays, one per column,
+    and its identifiers are interned, so each sale takes a few dozens of bytes.
+    Entries are materialized only when they are accessed.
+
+    >>> journal = SalesJournal(clock=iter([1.0, 2.0]).__next__)
+    >>> journal.record_sale(Sale(1, 2.0, "Dev", 1.5, 0.5), "App", "Item", "U1")
+    >>> journal.record_sale(Sale(2, 4.0, "Dev", 3.0, 1.0), "App", "Item", "U2")
+    >>> journal.revenue_by_developer()
+    {'Dev': 4.5}
+    >>> journal.total("user_debit", start=2.0, user_id="U2")
+    4.0
+    >>> journal[0].user_id, journal[0].sale.identifier
+    ('U1', 1)
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time) -> None:
+        """Creates an empty journal.
+
+        Args:
+            clock: Function returning the current time, to timestamp the sales.
+        """
+        self._clock = clock
+        self._locker = threading.Lock()
+        self._in_order = True
+        self._identifiers = array("q")
+        self._keys = {column: _KeyColumn() for column in KEY_COLUMNS}
+        self._amounts = {column: array("d") for column in AMOUNT_COLUMNS}
+        # The times are appended last, so their length is the journal's length.
+        self._times = array("d")
+
+    def __len__(self) -> int:
+        """Counts the journaled sales.
+
+        Returns:
+            The number of journaled sales.
+        """
+        return len(self._times)
+
+    def record_sale(self, sale: Sale, app_id: str, app_item: str, user_id: str) -> None:
+        """Journals a completed sale, timestamped with the journal's clock.
+
+        Args:
+            sale: The sale representation.
+            app_id: The identifier of the app where the item belongs.
+            app_item: The app item sold.
+            user_id: The user who bought the item.
+        """
+        keys = (app_id, app_item, user_id, sale.develper_id)
+        amounts = (sale.user_debit, sale.developer_credit, sale.store_credit)
+        with self._locker:
+            now = self._clock()
+            if self._times and now < self._times[-1]:
+                self._in_order = False
+            self._identifiers.append(sale.identifier)
+            for column, key in zip(KEY_COLUMNS, keys):
+                self._keys[column].append(key)
+            for column, amount in zip(AMOUNT_COLUMNS, amounts + (sale.reward,)):
+                self._amounts[column].append(amount)
+            self._times.append(now)
+
+    @overload
+    def __getitem__(self, index: int) -> JournalEntry:
+        ...  # pragma: no cover
+
+    @overload
+    def __getitem__(self, index: slice) -> List[JournalEntry]:
+        ...  # pragma: no cover
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[JournalEntry, List[JournalEntry]]:
+        """Materializes journaled sales.
+
+        Args:
+            index: The position of a sale, or a slice of positions.
+
+        Raises:
+            IndexError: if the position is out of the journal.
+
+        Returns:
+            The journal entry, or the list of entries, at the given positions.
+        """
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        length = len(self)
+        if not -length <= index < length:
+            raise IndexError(index)
+        index %= length
+        app_id, app_item, user_id, developer_id = (
+            self._keys[column].get(index) for column in KEY_COLUMNS
+        )
+        user_debit, developer_credit, store_credit, reward = (
+            self._amounts[column][index] for column in AMOUNT_COLUMNS
+        )
+        sale = Sale(
+            identifier=self._identifiers[index],
+            user_debit=user_debit,
+            develper_id=developer_id,
+            developer_credit=developer_credit,
+            store_credit=store_credit,
+            reward=reward,
+        )
+        return JournalEntry(self._times[index], app_id, app_item, user_id, sale)
+
+    def __iter__(self) -> Iterator[JournalEntry]:
+        """Materializes the journaled sales one by one.
+
+        Yields:
+            The journal entries, in the order they were recorded.
+        """
+        for index in range(len(self)):
+            yield self[index]
+
+    def _select(
+        self, start: Optional[float], end: Optional[float], equals: Dict[str, str]
+    ) -> Iterator[int]:
+        """Finds the positions of the sales matching the given filters.
+
+        If the sales were journaled in time order, which is the usual case,
+        the time window is found by binary search. Otherwise, it is scanned.
+
+        Args:
+            start: The earliest time to include, if any.
+            end: The time from which to exclude sales, if any.
+            equals: The required identifier for each key column.
+
+        Yields:
+            The positions of the matching sales.
+        """
+        length = len(self)
+        conditions: List[Tuple["array[int]", int]] = []
+        for column, value in equals.items():
+            identifier = self._keys[column].ids.get(value)
+            if identifier is None:
+                return
+            conditions.append((self._keys[column].rows, identifier))
+
+        first, last = 0, length
+        if self._in_order:
+            if start is not None:
+                first = bisect_left(self._times, start, 0, length)
+            if end is not None:
+                last = bisect_left(self._times, end, 0, length)
+            start = end = None
+
+        for index in range(first, last):
+            if start is not None and self._times[index] < start:
+                continue
+            if end is not None and self._times[index] >= end:
+                continue
+            if all(keys[index] == identifier for keys, identifier in conditions):
+                yield index
+
+    def total(
+        self,
+        column: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        **equals: str,
+    ) -> float:
+        """Sums an amount over the journaled sales.
+
+        Args:
+            column: The amount to sum, one of `AMOUNT_COLUMNS`.
+            start: The earliest time to include, if any.
+            end: The time from which to exclude sales, if any.
+            equals: The required value of key columns, such as `app_id="App"`.
+
+        Returns:
+            The sum of the amount over the matching sales.
+        """
+        amounts = self._amounts[column]
+        return sum(amounts[index] for index in self._select(start, end, equals))
+
+    def total_by(
+        self,
+        column: str,
+        key: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        **equals: str,
+    ) -> Dict[str, float]:
+        """Sums an amount over the journaled sales, grouped by a key.
+
+        Args:
+            column: The amount to sum, one of `AMOUNT_COLUMNS`.
+            key: The column by which to group the sales, one of `KEY_COLUMNS`.
+            start: The earliest time to include, if any.
+            end: The time from which to exclude sales, if any.
+            equals: The required value of key columns, such as `app_id="App"`.
+
+        Returns:
+            The sum of the amount over the matching sales, for each key.
+        """
+        amounts, keys = self._amounts[column], self._keys[key].rows
+        totals: Dict[int, float] = defaultdict(float)
+        for index in self._select(start, end, equals):
+            totals[keys[index]] += amounts[index]
+        values = self._keys[key].values
+        return {values[identifier]: total for identifier, total in totals.items()}
+
+    def revenue_by_developer(
+        self, start: Optional[float] = None, end: Optional[float] = None
+    ) -> Dict[str, float]:
+        """Sums the developers' credits.
+
+        Args:
+            start: The earliest time to include, if any.
+            end: The time from which to exclude sales, if any.
+
+        Returns:
+            The revenue of each developer.
+        """
+        return self.total_by("developer_credit", "developer_id", start, end)
+
+    def revenue_by_app(
+        self, start: Optional[float] = None, end: Optional[float] = None
+    ) -> Dict[str, float]:
+        """Sums the users' debits for each app.
+
+        Args:
+            start: The earliest time to include, if any.
+            end: The time from which to exclude sales, if any.
+
+        Returns:
+            The gross revenue of each app.
+        """
+        return self.total_by("user_debit", "app_id", start, end)
@@ -0,0 +1,146 @@
+"""Provides a compact accounts controller for large numbers of accounts."""
+import threading
+from array import array
+from typing import List, Optional
+
+from appstore.accounts import AccountsController, ForbiddenDebit
+from appstore.wal import WriteAheadLog
+
+CENTS = 100
+INITIAL_INDEX_SIZE = 8
+
+
+def to_cents(amount: float) -> int:
+    """Converts an amount to an integer number of cents.
+
+    >>> to_cents(1.2 * 0.75)
+    90
+
+    Args:
+        amount: The amount to convert.
+
+    Returns:
+        The amount rounded to the nearest cent.
+    """
+    return round(amount * CENTS)
+
+
+def _place(cells: "array[int]", holder_id: str, slot: int) -> None:
+    mask = len(cells) - 1
+    cell = hash(holder_id) & mask
+    while cells[cell]:
+        cell = (cell + 1) & mask
+    cells[cell] = slot + 1
+
+
+class CompactAccountsController(AccountsController):
+    """A controller for executing transferences between accounts.
+
+    Holders' identifiers are interned to dense slots, and balances are kept
+    in a contiguous array of integer cents, instead of a mapping of floats.
+    Slots are found with an open addressing hash table in an array of
+    integers, so that, unlike a `dict`, no object is allocated per account.
+    Amounts are rounded to the cent.
+
+    >>> accounts = CompactAccountsController()
+    >>> accounts.deposit(10, "A1")
+    >>> accounts.transfer("A1", 1.2 * 0.75, "A2")
+    >>> accounts.get_balance("A1"), accounts.get_balance("A2")
+    (9.1, 0.9)
+    """
+
+    def __init__(
+        self, log: Optional[WriteAheadLog] = None, deferred: bool = False
+    ) -> None:
+        """Initializes an in-memory compact accounts controller.
+
+        Args:
+            log: A log where to persist committed operations.
+                The operations already in the log are replayed.
+            deferred: Whether transactions defer their writes until commit.
+        """
+        self._holders: List[str] = []
+        self._cents = array("q")
+        # The hash table's cells hold their holder's slot plus one, or 0 if empty.
+        self._cells = array("i", [0]) * INITIAL_INDEX_SIZE
+        self._slots_locker = threading.Lock()
+        super().__init__(log, deferred)
+
+    def __len__(self) -> int:
+        """Counts the accounts.
+
+        Returns:
+            The number of accounts.
+        """
+        return len(self._cents)
+
+    def _find_slot(self, holder_id: str) -> Optional[int]:
+        cells = self._cells
+        mask = len(cells) - 1
+        cell = hash(holder_id) & mask
+        while cells[cell]:
+            slot = cells[cell] - 1
+            if self._holders[slot] == holder_id:
+                return slot
+            cell = (cell + 1) & mask
+        return None
+
+    def _get_slot(self, holder_id: str) -> int:
+        slot = self._find_slot(holder_id)
+        if slot is None:
+            with self._slots_locker:
+                slot = self._find_slot(holder_id)
+                if slot is None:
+                    slot = self._insert(holder_id)
+        return slot
+
+    def _insert(self, holder_id: str) -> int:
+        slot = len(self._holders)
+        self._holders.append(holder_id)
+        self._cents.append(0)
+        cells = self._cells
+        # The table is kept at most three quarters full, so probes stay short.
+        if len(self._holders) * 4 > len(cells) * 3:
+            cells = array("i", [0]) * (len(cells) * 2)
+            for other_slot, other_id in enumerate(self._holders):
+                _place(cells, other_id, other_slot)
+            self._cells = cells
+        else:
+            _place(cells, holder_id, slot)
+        return slot
+
+    def _apply(self, amount: float, holder_id: str) -> None:
+        slot = self._get_slot(holder_id)
+        balance = self._cents[slot]
+        cents = to_cents(amount)
+        if balance + cents < 0:
+            raise ForbiddenDebit(holder_id, amount, balance / CENTS)
+        self._cents[slot] = balance + cents
+
+    def _force(self, amount: float, holder_id: str) -> None:
+        self._cents[self._get_slot(holder_id)] += to_cents(amount)
+
+    def _round(self, amount: float) -> float:
+        """Rounds an amount to the cent, before buffering it.
+
+        Args:
+            amount: The amount to round.
+
+        Returns:
+            The amount rounded to the nearest cent.
+        """
+        return to_cents(amount) / CENTS
+
+    def get_balance(self, holder_id: str) -> float:
+        """Get an account's balance.
+
+        Args:
+            holder_id: The account holder identifier.
+
+        Returns:
+            The account's balance.
+        """
+        slot = self._find_slot(holder_id)
+        if slot is None:
+            return 0.0
+        return self._cents[slot] / CENTS
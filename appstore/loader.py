@@ -0,0 +1,81 @@
+"""Provides streaming loaders of apps, users and opening balances from files.
+
+Files are either JSON lines, with a `.jsonl` suffix, or CSV, with a `.csv` suffix
+and a header. Each kind of file has the following fields:
+
+- apps: `app_id`, `developer_id` and `items`, an object mapping items to prices.
+  As CSV, there is a row per item, with `item` and `price` instead of `items`,
+  and the rows of each app are consecutive.
+- users: `user_id`.
+- balances: `holder_id` and `amount`.
+
+Files are read a line at a time, so memory doesn't grow with their size,
+and the readers feed the bulk APIs, such as `InMemoryAppsDB.add_apps`,
+`InMemoryUsersDB.add_users` and `AccountsController.deposit_many`.
+"""
+import csv
+import json
+from itertools import groupby
+from pathlib import Path
+from typing import Any, Dict, Iterator, Tuple, Union
+
+_Path = Union[str, Path]
+
+
+def _read_records(path: _Path) -> Iterator[Dict[str, Any]]:
+    suffix = Path(path).suffix
+    if suffix not in {".jsonl", ".csv"}:
+        raise ValueError(f"Unsupported file format: {path}")
+    with open(path, newline="", encoding="utf-8") as file:
+        if suffix == ".csv":
+            yield from csv.DictReader(file)
+        else:
+            yield from (json.loads(line) for line in file if line.strip())
+
+
+def read_apps(path: _Path) -> Iterator[Tuple[str, str, Dict[str, float]]]:
+    """Reads apps, their developers and their items' prices.
+
+    Args:
+        path: The apps' file.
+
+    Yields:
+        Tuples with the app identifier, its developer identifier,
+        and the mapping from the app items to their prices.
+    """
+    records = _read_records(path)
+    if Path(path).suffix == ".jsonl":
+        for record in records:
+            items = {item: float(price) for item, price in record["items"].items()}
+            yield record["app_id"], record["developer_id"], items
+        return
+    for (app_id, developer_id), rows in groupby(
+        records, key=lambda record: (record["app_id"], record["developer_id"])
+    ):
+        yield app_id, developer_id, {row["item"]: float(row["price"]) for row in rows}
+
+
+def read_users(path: _Path) -> Iterator[str]:
+    """Reads users.
+
+    Args:
+        path: The users' file.
+
+    Yields:
+        Users identifiers.
+    """
+    for record in _read_records(path):
+        yield record["user_id"]
+
+
+def read_balances(path: _Path) -> Iterator[Tuple[float, str]]:
+    """Reads opening balances.
+
+    Args:
+        path: The balances' file.
+
+    Yields:
+        The amount and the holder identifier of each balance.
+    """
+    for record in _read_records(path):
+        yield float(record["amount"]), record["holder_id"]
@@ -0,0 +1,246 @@
+"""Provides an accounts controller with versioned balances, for lock-free reads."""
+import threading
+import time
+from contextvars import ContextVar
+from typing import (
+    Callable,
+    ContextManager,
+    Dict,
+    Iterable,
+    NamedTuple,
+    Optional,
+    Set,
+    TypeVar,
+)
+
+from appstore.accounts import (
+    AccountsController,
+    ForbiddenDebit,
+    _DeferredTransactionContextManager,
+    _WriteSet,
+)
+from appstore.wal import WriteAheadLog
+
+T = TypeVar("T")
+
+
+class TransactionConflict(Exception):
+    """Exception for when a balance read in a transaction changed before its commit."""
+
+    def __init__(self, holder: str):
+        super().__init__(holder)
+        self.holder_id = holder
+
+
+class _Account(NamedTuple):
+    version: int
+    balance: float
+
+
+_NO_ACCOUNT = _Account(0, 0.0)
+
+
+class _Transaction(_WriteSet):
+    """The balances a transaction read, and the changes it buffers until commit."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.reads: Dict[str, _Account] = {}
+        self.observed: Set[str] = set()
+
+
+class VersionedAccountsController(AccountsController):
+    """A controller for executing transferences between accounts.
+
+    Each account's balance carries the version of the commit that last changed it,
+    and committed balances are replaced, never updated in place.
+    So, reads never wait for writers, and never see uncommitted changes.
+
+    Transactions are optimistic. They buffer their changes, checking debits
+    against the balances as of their first read, and apply them atomically on commit.
+    If a balance the transaction debited changed meanwhile, the debit is checked
+    again against the new balance. If a balance it explicitly read with
+    `get_balance` changed, the commit fails with `TransactionConflict`,
+    and `atomically` runs the transaction again.
+
+    >>> accounts = VersionedAccountsController()
+    >>> accounts.deposit(10, "A1")
+    >>> with accounts.transaction():
+    ...     accounts.transfer("A1", 4, "A2")
+    ...     accounts.snapshot(["A1", "A2"])
+    {'A1': 10.0, 'A2': 0.0}
+    >>> accounts.snapshot(["A1", "A2"])
+    {'A1': 6.0, 'A2': 4.0}
+    """
+
+    def __init__(self, log: Optional[WriteAheadLog] = None) -> None:
+        """Initializes an in-memory versioned accounts controller.
+
+        Args:
+            log: A log where to persist committed operations.
+                The operations already in the log are replayed.
+        """
+        self._accounts: Dict[str, _Account] = {}
+        # Incremented before and after applying each commit, so it is odd while
+        # a commit is being applied, like a sequence lock.
+        self._sequence = 0
+        self._commit_locker = threading.Lock()
+        self._transaction: ContextVar[Optional[_Transaction]] = ContextVar(
+            f"transaction-{id(self)}", default=None
+        )
+        super().__init__(log)
+
+    def _publish(self, balances: Dict[str, float]) -> None:
+        """Replaces balances, as a single commit.
+
+        It must be called while holding the commit lock.
+
+        Args:
+            balances: The new balance of each changed account.
+        """
+        self._sequence += 1
+        version = self._sequence // 2 + 1
+        for holder_id, balance in balances.items():
+            self._accounts[holder_id] = _Account(version, balance)
+        self._sequence += 1
+
+    def _apply(self, amount: float, holder_id: str) -> None:
+        transaction = self._transaction.get()
+        if transaction is None:
+            with self._commit_locker:
+                balance = self._accounts.get(holder_id, _NO_ACCOUNT).balance
+                if balance + amount < 0:
+                    raise ForbiddenDebit(holder_id, amount, balance)
+                self._publish({holder_id: balance + amount})
+            return
+
+        if holder_id not in transaction.reads:
+            transaction.reads[holder_id] = self._accounts.get(holder_id, _NO_ACCOUNT)
+        delta = transaction.deltas.get(holder_id, 0.0)
+        balance = transaction.reads[holder_id].balance + delta
+        if balance + amount < 0:
+            raise ForbiddenDebit(holder_id, amount, balance)
+        transaction.deltas[holder_id] += amount
+
+    def _force(self, amount: float, holder_id: str) -> None:
+        with self._commit_locker:
+            balance = self._accounts.get(holder_id, _NO_ACCOUNT).balance
+            self._publish({holder_id: balance + amount})
+
+    def _commit(self, transaction: _Transaction) -> None:
+        if not transaction.entries:
+            return
+        balances: Dict[str, float] = {}
+        with self._commit_locker:
+            for holder_id in transaction.observed:
+                current = self._accounts.get(holder_id, _NO_ACCOUNT)
+                if current.version != transaction.reads[holder_id].version:
+                    raise TransactionConflict(holder_id)
+            for holder_id, delta in transaction.deltas.items():
+                if delta == 0:
+                    continue
+                current = self._accounts.get(holder_id, _NO_ACCOUNT)
+                balances[holder_id] = current.balance + delta
+                changed = current.version != transaction.reads[holder_id].version
+                if changed and delta < 0 and balances[holder_id] < 0:
+                    raise ForbiddenDebit(holder_id, delta, current.balance)
+            self._publish(balances)
+            position = (
+                None if self._log is None else self._log.write(transaction.entries)
+            )
+        self._sync_log(position)
+
+    def transfer(self, issuer_id: str, amount: float, recepient_id: str) -> None:
+        """Transfers an amount from an account to another, atomically.
+
+        Args:
+            issuer_id: Holder of the account to debit.
+            amount: Amount to transfer.
+            recepient_id: Holder of the account to credit.
+        """
+        with self.transaction():
+            super().transfer(issuer_id, amount, recepient_id)
+
+    def get_balance(self, holder_id: str) -> float:
+        """Get an account's balance, without waiting for writers.
+
+        Within a transaction, the balance includes the transaction's changes,
+        and the transaction fails on commit if the account changes meanwhile.
+
+        Args:
+            holder_id: The account holder identifier.
+
+        Returns:
+            The account's balance.
+        """
+        transaction = self._transaction.get()
+        if transaction is None:
+            return self._accounts.get(holder_id, _NO_ACCOUNT).balance
+        if holder_id not in transaction.reads:
+            transaction.reads[holder_id] = self._accounts.get(holder_id, _NO_ACCOUNT)
+        transaction.observed.add(holder_id)
+        delta = transaction.deltas.get(holder_id, 0.0)
+        return transaction.reads[holder_id].balance + delta
+
+    def snapshot(self, holder_ids: Iterable[str]) -> Dict[str, float]:
+        """Get the committed balances of many accounts, as of the same point in time.
+
+        Reads don't wait for writers. Instead, they are retried
+        if a commit was applied meanwhile.
+
+        Args:
+            holder_ids: The accounts' holders identifiers.
+
+        Returns:
+            Mapping from the holders identifiers to their balances.
+        """
+        holder_ids = list(holder_ids)
+        while True:
+            sequence = self._sequence
+            if sequence % 2 == 0:
+                balances = {
+                    holder_id: self._accounts.get(holder_id, _NO_ACCOUNT).balance
+                    for holder_id in holder_ids
+                }
+                if self._sequence == sequence:
+                    return balances
+            time.sleep(0)
+
+    def transaction(self) -> ContextManager[None]:
+        """Creates an optimistic transaction context.
+
+        Operations in the context are buffered, and applied atomically on exit,
+        unless an operation fails. Nested contexts only roll back their own
+        operations. Each thread or asynchronous task keeps its own transactions.
+
+        Returns:
+            Nothing.
+        """
+        return _DeferredTransactionContextManager(
+            write_set=self._transaction,
+            journal=self._journal,
+            create_write_set=_Transaction,
+            commit_write_set=self._commit,
+        )
+
+    def atomically(self, operation: Callable[[], T], attempts: int = 10) -> T:
+        """Runs an operation in a transaction, running it again on conflicts.
+
+        Args:
+            operation: The operation, whose reads and writes form the transaction.
+            attempts: The maximum number of times to run the operation.
+
+        Raises:
+            TransactionConflict: if the last attempt conflicted.
+
+        Returns:
+            The operation's result.
+        """
+        for attempt in range(1, attempts + 1):
+            try:
+                with self.transaction():
+                    return operation()
+            except TransactionConflict:
+                if attempt == attempts:
+                    raise
+        raise ValueError("The number of attempts must be positive.")
@@ -0,0 +1,535 @@
+"""Provides a users' database in a key-value store speaking RESP, like Redis.
+
+Users are members of the `{prefix}users` set, and each user's purchases are
+counted in the `{prefix}purchases:{user_id}` key. Reads send the membership
+check and the counter's `GET` together, pipelined, so they cost a single round
+trip. Updates run a script that only updates the counters of members, so that
+unknown users' counters are never created, and batches of purchases pipeline
+a script call per purchase.
+
+`LocalRESPServer` is a small stand-in for such a store, to test and benchmark
+the database without external services.
+
+>>> with LocalRESPServer() as server:
+...     usersdb = RESPUsersDB(*server.address)
+...     usersdb.add_users(["User#1", "User#2"])
+...     usersdb.record_purchases(["User#1", "User#1", "Nobody"])
+...     usersdb.close()
+[0, 1, KeyError('Nobody')]
+"""
+import queue
+import socket
+import socketserver
+import threading
+from contextlib import contextmanager
+from io import BufferedIOBase
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from appstore.collections import chunks
+
+# Seconds between checks for shutting the local server down.
+_POLL_INTERVAL = 0.05
+
+_WRONG_TYPE = "WRONGTYPE Operation against a key holding the wrong kind of value"
+
+_Command = Sequence[Union[str, bytes, int]]
+
+# Updates a user's counter with the given command, atomically, if it's a member.
+_COUNT_SCRIPT = (
+    "if redis.call('SISMEMBER', KEYS[1], ARGV[1]) == 1 then "
+    "return redis.call(ARGV[2], KEYS[2]) end return false"
+)
+
+
+class RESPError(Exception):
+    """Exception for an error reply."""
+
+
+def _encode(command: _Command) -> bytes:
+    """Encodes a command as an array of bulk strings.
+
+    Args:
+        command: The command's name and arguments.
+
+    Returns:
+        The encoded command.
+    """
+    parts = [b"*%d\r\n" % len(command)]
+    for argument in command:
+        data = argument if isinstance(argument, bytes) else str(argument).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+def _read(file: BufferedIOBase) -> Any:
+    """Reads a RESP value.
+
+    Args:
+        file: The buffered stream where to read.
+
+    Raises:
+        ConnectionError: if the stream ends.
+        RESPError: if the value is of an unknown kind.
+
+    Returns:
+        The value. Error replies are returned as `RESPError`, instead of raised,
+        so that the replies after them in a pipeline can still be read.
+    """
+    line = file.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("The connection was closed.")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode()
+    if kind == b"-":
+        return RESPError(payload.decode())
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        return None if length < 0 else file.read(length + 2)[:-2]
+    if kind == b"*":
+        return [_read(file) for _ in range(int(payload))]
+    raise RESPError(f"Unknown reply: {line!r}")
+
+
+class _Connection:
+    """A socket to the store, with a buffered reader for the replies."""
+
+    def __init__(self, address: Tuple[str, int], timeout: float) -> None:
+        self._socket = socket.create_connection(address, timeout)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._socket.makefile("rb")
+
+    def execute(self, commands: Sequence[_Command]) -> List[Any]:
+        """Sends commands at once, pipelined, and reads their replies.
+
+        Args:
+            commands: The commands.
+
+        Returns:
+            The replies, in the commands' order.
+        """
+        self._socket.sendall(b"".join(_encode(command) for command in commands))
+        return [_read(self._file) for _ in commands]
+
+    def close(self) -> None:
+        """Closes the socket."""
+        self._file.close()
+        self._socket.close()
+
+
+def _check(reply: Any) -> Any:
+    if isinstance(reply, RESPError):
+        raise reply
+    return reply
+
+
+class RESPUsersDB:
+    """Implements a users' database in a RESP key-value store, such as Redis.
+
+    Connections are pooled and shared by all threads. Each thread takes an idle
+    connection for the duration of a pipeline, opening it if needed.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 6379,
+        prefix: str = "appstore:",
+        max_connections: int = 16,
+        timeout: float = 5.0,
+    ) -> None:
+        """Initializes the users' database. Connections are opened on demand.
+
+        Args:
+            host: The store's host.
+            port: The store's port.
+            prefix: The prefix of the database's keys.
+            max_connections: The maximum number of connections open at once.
+                When all are busy, threads wait for one to become idle.
+            timeout: Seconds to wait for connecting and for each reply.
+        """
+        self._address = (host, port)
+        self._timeout = timeout
+        self._users_key = f"{prefix}users"
+        self._purchases_prefix = f"{prefix}purchases:"
+        # Idle connections, and a placeholder for each one not opened yet.
+        self._pool: "queue.LifoQueue[Optional[_Connection]]" = queue.LifoQueue()
+        for _ in range(max_connections):
+            self._pool.put(None)
+
+    @contextmanager
+    def _connection(self) -> Iterator[_Connection]:
+        connection = self._pool.get()
+        try:
+            if connection is None:
+                connection = _Connection(self._address, self._timeout)
+            yield connection
+        except BaseException:
+            # The connection may have unread replies, so it can't be reused.
+            if connection is not None:
+                connection.close()
+                connection = None
+            raise
+        finally:
+            self._pool.put(connection)
+
+    def _execute(self, commands: Sequence[_Command]) -> List[Any]:
+        with self._connection() as connection:
+            return connection.execute(commands)
+
+    def _counter(self, user_id: str) -> str:
+        return f"{self._purchases_prefix}{user_id}"
+
+    def _count(
+        self, command: str, user_ids: Sequence[str]
+    ) -> List[Union[int, KeyError]]:
+        """Updates the purchases' counters of users, in a single pipeline.
+
+        Each update checks the user's membership and updates the counter
+        atomically, in a script, so unknown users' counters aren't touched.
+
+        Args:
+            command: The counter update, either `INCR` or `DECR`.
+            user_ids: The users identifiers, repeated for each update.
+
+        Returns:
+            For each update, in the same order, either the updated count
+            or the error for an unknown user.
+        """
+        replies = self._execute(
+            [
+                (
+                    "EVAL",
+                    _COUNT_SCRIPT,
+                    2,
+                    self._users_key,
+                    self._counter(user_id),
+                    user_id,
+                    command,
+                )
+                for user_id in user_ids
+            ]
+        )
+        return [
+            KeyError(user_id) if count is None else _check(count)
+            for user_id, count in zip(user_ids, replies)
+        ]
+
+    def _count_one(self, command: str, user_id: str) -> int:
+        count = self._count(command, [user_id])[0]
+        if isinstance(count, KeyError):
+            raise count
+        return count
+
+    def add_user(self, user_id: str) -> None:
+        """Adds a user.
+
+        Args:
+            user_id: User identifier.
+        """
+        self.add_users([user_id])
+
+    def add_users(self, user_ids: Iterable[str], chunk_size: int = 1024) -> None:
+        """Adds users in bulk, pipelining a command per chunk of users.
+
+        Args:
+            user_ids: Users identifiers.
+            chunk_size: The number of users added by each command.
+        """
+        commands: List[_Command] = [
+            ("SADD", self._users_key, *chunk) for chunk in chunks(user_ids, chunk_size)
+        ]
+        for reply in self._execute(commands) if commands else []:
+            _check(reply)
+
+    def get_purchases(self, user_id: str) -> int:
+        """Get the number of purchases the given user made.
+
+        Args:
+            user_id: User identifier.
+
+        Raises:
+            KeyError: if the user doesn't exits.
+
+        Returns:
+            The number of purchases made by the given user.
+        """
+        member, purchases = self._execute(
+            [("SISMEMBER", self._users_key, user_id), ("GET", self._counter(user_id))]
+        )
+        if not _check(member):
+            raise KeyError(user_id)
+        return int(_check(purchases) or 0)
+
+    def increment_purchases(self, user_id: str) -> int:
+        """Count a user's purchase.
+
+        Args:
+            user_id: User identifier.
+
+        Raises:
+            KeyError: if the user doesn't exits.
+
+        Returns:
+            The number of purchases made by the given user after the increment.
+        """
+        try:
+            return self._count_one("INCR", user_id)
+        except KeyError:
+            raise KeyError(f"No user: {user_id}") from None
+
+    def record_purchase(self, user_id: str) -> int:
+        """Count a user's purchase, atomically.
+
+        Args:
+            user_id: User identifier.
+
+        Returns:
+            The number of purchases made by the given user before the increment.
+        """
+        return self._count_one("INCR", user_id) - 1
+
+    def cancel_purchase(self, user_id: str) -> int:
+        """Discount a user's purchase, atomically.
+
+        Args:
+            user_id: User identifier.
+
+        Returns:
+            The number of purchases made by the given user after the decrement.
+        """
+        return self._count_one("DECR", user_id)
+
+    def record_purchases(self, user_ids: Sequence[str]) -> List[Union[int, KeyError]]:
+        """Count a batch of purchases, atomically each, in a single round trip.
+
+        Args:
+            user_ids: The user of each purchase. Users with many purchases
+                are repeated.
+
+        Returns:
+            For each purchase, in the same order, either the number of purchases
+            made by the user before it, or the error for an unknown user.
+        """
+        return [
+            count if isinstance(count, KeyError) else count - 1
+            for count in self._count("INCR", user_ids)
+        ]
+
+    def cancel_purchases(self, user_ids: Sequence[str]) -> None:
+        """Discount a batch of purchases, atomically each, in a single round trip.
+
+        Args:
+            user_ids: The user of each purchase.
+        """
+        self._count("DECR", user_ids)
+
+    def close(self) -> None:
+        """Closes the idle connections."""
+        connections: List[Optional[_Connection]] = []
+        while not self._pool.empty():
+            connections.append(self._pool.get())
+        for connection in connections:
+            if connection is not None:
+                connection.close()
+            self._pool.put(None)
+
+
+class _Store:
+    """The stand-in server's data, and the commands it supports."""
+
+    def __init__(self) -> None:
+        self.values: Dict[bytes, Union[bytes, Set[bytes]]] = {}
+        self.locker = threading.Lock()
+        self.commands: Dict[bytes, Callable[..., Any]] = {
+            b"PING": lambda: "PONG",
+            b"GET": self._get,
+            b"SET": self._set,
+            b"INCR": lambda key: self._increment(key, 1),
+            b"DECR": lambda key: self._increment(key, -1),
+            b"SADD": self._add,
+            b"SISMEMBER": lambda key, member: int(member in self._set_at(key)),
+            b"DEL": lambda *keys: sum(
+                self.values.pop(key, None) is not None for key in keys
+            ),
+            b"EVAL": self._evaluate,
+        }
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        value = self.values.get(key)
+        if isinstance(value, set):
+            raise RESPError(_WRONG_TYPE)
+        return value
+
+    def _set(self, key: bytes, value: bytes) -> str:
+        self.values[key] = value
+        return "OK"
+
+    def _increment(self, key: bytes, amount: int) -> int:
+        value = self.values.get(key, b"0")
+        if not isinstance(value, bytes) or not value.lstrip(b"-").isdigit():
+            raise RESPError("ERR value is not an integer or out of range")
+        count = int(value) + amount
+        self.values[key] = b"%d" % count
+        return count
+
+    def _set_at(self, key: bytes) -> Set[bytes]:
+        members = self.values.get(key, set())
+        if not isinstance(members, set):
+            raise RESPError(_WRONG_TYPE)
+        return members
+
+    def _add(self, key: bytes, *members: bytes) -> int:
+        current = self.values[key] = self._set_at(key)
+        size = len(current)
+        current.update(members)
+        return len(current) - size
+
+    def _evaluate(self, script: bytes, _keys_count: bytes, *arguments: bytes) -> Any:
+        """Runs a script, which can only be the users' database counting script.
+
+        Args:
+            script: The script's source.
+            _keys_count: The number of keys in the arguments.
+            arguments: The script's keys and arguments.
+
+        Raises:
+            RESPError: if the script isn't the counting script.
+
+        Returns:
+            The updated count, or `None` if the user isn't a member.
+        """
+        if script != _COUNT_SCRIPT.encode():
+            raise RESPError("ERR scripts are not supported")
+        users_key, counter, user_id, command = arguments
+        if user_id not in self._set_at(users_key):
+            return None
+        return self.commands[command.upper()](counter)
+
+    def execute(self, command: Any) -> Any:
+        """Executes a command, atomically.
+
+        Args:
+            command: The command's name and arguments.
+
+        Returns:
+            The command's reply, or the error.
+        """
+        if not isinstance(command, list) or not command:
+            return RESPError("ERR Protocol error")
+        name, *arguments = command
+        handler = self.commands.get(name.upper())
+        if handler is None:
+            return RESPError(f"ERR unknown command '{name.decode()}'")
+        try:
+            with self.locker:
+                return handler(*arguments)
+        except TypeError:
+            return RESPError(f"ERR wrong number of arguments for '{name.decode()}'")
+        except RESPError as err:
+            return err
+
+
+def _reply(value: Any) -> bytes:
+    """Encodes a reply.
+
+    Args:
+        value: The reply's value.
+
+    Returns:
+        The encoded reply.
+    """
+    if isinstance(value, RESPError):
+        return b"-%s\r\n" % str(value).encode()
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+class _RESPHandler(socketserver.StreamRequestHandler):
+    """Handles a connection, replying to its commands in order."""
+
+    server: "LocalRESPServer"
+    disable_nagle_algorithm = True
+
+    def handle(self) -> None:
+        """Replies to the commands until the connection is closed."""
+        while True:
+            try:
+                command = _read(self.rfile)
+            except (ConnectionError, RESPError, ValueError):
+                return
+            self.wfile.write(_reply(self.server.store.execute(command)))
+
+
+class LocalRESPServer(socketserver.ThreadingTCPServer):
+    """A small in-memory RESP server, for tests and benchmarks.
+
+    It supports the few commands `RESPUsersDB` needs, and some more
+    (`PING`, `GET`, `SET`, `INCR`, `DECR`, `SADD`, `SISMEMBER`, `DEL`, and
+    `EVAL` of the database's script only), with a thread per connection.
+    As a context manager, it serves in the background.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        """Creates the server, listening.
+
+        Args:
+            host: The interface where to listen.
+            port: The port where to listen. By default, a free port.
+        """
+        super().__init__((host, port), _RESPHandler)
+        self.store = _Store()
+        self._thread = threading.Thread(
+            target=self.serve_forever, args=(_POLL_INTERVAL,), daemon=True
+        )
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """Get the host and the port where the server listens.
+
+        Returns:
+            The host and the port.
+        """
+        host, port = self.server_address[:2]
+        return str(host), int(port)
+
+    def __enter__(self) -> "LocalRESPServer":
+        """Starts serving in the background.
+
+        Returns:
+            The server.
+        """
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        """Stops serving and closes the listening socket.
+
+        Args:
+            args: The exception's type, value and traceback, if any.
+        """
+        self.shutdown()
+        self._thread.join()
+        self.server_close()
@@ -0,0 +1,132 @@
+"""Provides revenue rollups maintained as sales complete."""
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Mapping, TypeVar
+
+from appstore.appstore import Sale
+
+K = TypeVar("K")
+
+
+@dataclass
+class Totals:
+    """Totals of a group of sales."""
+
+    sales: int = 0
+    developer_credit: float = 0.0
+    store_credit: float = 0.0
+    reward: float = 0.0
+
+    def add(self, sale: Sale) -> None:
+        """Adds a sale to the totals.
+
+        Args:
+            sale: The sale representation.
+        """
+        self.sales += 1
+        self.developer_credit += sale.developer_credit
+        self.store_credit += sale.store_credit
+        self.reward += sale.reward
+
+
+class RevenueRollups:
+    """Keeps sales' totals per developer, per app and per time bucket.
+
+    The totals are updated as each sale completes, so reading them is _O(1)_.
+    Recorded by an app store, they only count committed sales,
+    since sales rolled back aren't recorded.
+
+    >>> rollups = RevenueRollups(bucket_seconds=60, clock=lambda: 90.0)
+    >>> rollups.record_sale(Sale(1, 2.0, "Dev", 1.5, 0.5), "App", "Item", "U1")
+    >>> rollups.by_developer("Dev")
+    Totals(sales=1, developer_credit=1.5, store_credit=0.5, reward=0.0)
+    >>> rollups.by_bucket(60.0).sales, rollups.by_bucket(120.0).sales
+    (1, 0)
+    """
+
+    def __init__(
+        self, bucket_seconds: float = 3600.0, clock: Callable[[], float] = time.time
+    ) -> None:
+        """Creates empty rollups.
+
+        Args:
+            bucket_seconds: The duration of each time bucket.
+            clock: Function returning the current time, to bucket the sales.
+        """
+        self._bucket_seconds = bucket_seconds
+        self._clock = clock
+        self._locker = threading.Lock()
+        self._total = Totals()
+        self._developers: Dict[str, Totals] = defaultdict(Totals)
+        self._apps: Dict[str, Totals] = defaultdict(Totals)
+        self._buckets: Dict[int, Totals] = defaultdict(Totals)
+
+    def _bucket(self, timestamp: float) -> int:
+        return int(timestamp // self._bucket_seconds)
+
+    def record_sale(  # pylint: disable=unused-argument
+        self, sale: Sale, app_id: str, app_item: str, user_id: str
+    ) -> None:
+        """Adds a completed sale to the rollups.
+
+        Args:
+            sale: The sale representation.
+            app_id: The identifier of the app where the item belongs.
+            app_item: The app item sold.
+            user_id: The user who bought the item.
+        """
+        bucket = self._bucket(self._clock())
+        with self._locker:
+            self._total.add(sale)
+            self._developers[sale.develper_id].add(sale)
+            self._apps[app_id].add(sale)
+            self._buckets[bucket].add(sale)
+
+    def _get(self, totals: Mapping[K, Totals], key: K) -> Totals:
+        with self._locker:
+            found = totals.get(key)
+            return replace(found) if found is not None else Totals()
+
+    def total(self) -> Totals:
+        """Get the totals of all sales.
+
+        Returns:
+            A copy of the totals.
+        """
+        with self._locker:
+            return replace(self._total)
+
+    def by_developer(self, developer_id: str) -> Totals:
+        """Get the totals of a developer's sales.
+
+        Args:
+            developer_id: The developer identifier.
+
+        Returns:
+            A copy of the developer's totals.
+        """
+        return self._get(self._developers, developer_id)
+
+    def by_app(self, app_id: str) -> Totals:
+        """Get the totals of an app's sales.
+
+        Args:
+            app_id: The app identifier.
+
+        Returns:
+            A copy of the app's totals.
+        """
+        return self._get(self._apps, app_id)
+
+    def by_bucket(self, timestamp: float) -> Totals:
+        """Get the totals of the sales in the time bucket of a given time.
+
+        Args:
+            timestamp: A time within the bucket.
+
+        Returns:
+            A copy of the bucket's totals.
+        """
+        return self._get(self._buckets, self._bucket(timestamp))
@@ -0,0 +1,199 @@
+"""Provides a TCP server for the app store, with a line-oriented JSON protocol.
+
+Clients send a request per line, either as a JSON object or as words:
+
+    {"op": "sell", "app": "TrivialDrive", "item": "Oil", "user": "User#123"}
+    {"op": "balance", "holder": "User#123"}
+    sell TrivialDrive Oil User#123
+    balance User#123
+
+and the server writes a JSON object per request, in the requests' order.
+JSON requests' `id` field, if any, is echoed in the response.
+Failed requests get an `error` field, such as `not_found` or `forbidden_debit`.
+Clients may pipeline requests, sending more before reading the responses.
+"""
+import asyncio
+import json
+from concurrent.futures import Executor
+from typing import Any, Dict, Optional
+
+from appstore.accounts import ForbiddenDebit
+from appstore.appstore import AccountsController, AppStore
+
+_Response = Dict[str, Any]
+
+_FIELDS = {"sell": ("app", "item", "user"), "balance": ("holder",)}
+
+
+def _parse(line: bytes) -> Dict[str, Any]:
+    if line.lstrip().startswith(b"{"):
+        request: Dict[str, Any] = json.loads(line)
+        return request
+    op, *words = line.decode().split()
+    fields = _FIELDS.get(op, ())
+    if len(words) != len(fields):
+        raise ValueError(f"Wrong number of arguments for {op}.")
+    return {"op": op, **dict(zip(fields, words))}
+
+
+class StoreServer:
+    """Serves an app store's sales and its accounts' balances over TCP.
+
+    Requests are handled concurrently, up to a bound shared by all connections.
+    When the bound is reached, or a connection has too many responses pending,
+    the server stops reading new requests, so TCP backpressure slows clients down.
+    Writes wait for the clients to read, so slow readers don't grow the buffers.
+    """
+
+    def __init__(
+        self,
+        store: AppStore,
+        accounts: AccountsController,
+        max_concurrency: int = 64,
+        pipeline_depth: int = 128,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        """Creates a server.
+
+        Args:
+            store: The app store selling the items.
+            accounts: The accounts controller for balance queries.
+            max_concurrency: Maximum number of requests being handled at once.
+            pipeline_depth: Maximum number of responses a connection
+                can have pending.
+            executor: Where to run the requests, for stores with blocking
+                dependencies. By default, requests run in the event loop,
+                which is the fastest for in-memory stores.
+        """
+        self._store = store
+        self._accounts = accounts
+        self._pipeline_depth = pipeline_depth
+        self._executor = executor
+        self._max_concurrency = max_concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def handle(self, request: Dict[str, Any]) -> _Response:
+        """Handles a request.
+
+        Args:
+            request: The request, with the operation and its arguments.
+
+        Returns:
+            The response. Errors are reported in the response, instead of raised,
+            so that a failing request doesn't close the connection.
+        """
+        response: _Response = {} if "id" not in request else {"id": request["id"]}
+        fields = _FIELDS.get(str(request.get("op")), ())
+        if not fields or any(field not in request for field in fields):
+            response["error"] = "bad_request"
+            return response
+        args = [str(request[field]) for field in fields]
+        try:
+            if request["op"] == "sell":
+                sale = self._store.sell(*args)
+                response.update(
+                    sale=sale.identifier,
+                    amount=sale.user_debit,
+                    developer=sale.develper_id,
+                    developer_credit=sale.developer_credit,
+                    store_credit=sale.store_credit,
+                    reward=sale.reward,
+                )
+            else:
+                response["balance"] = self._accounts.get_balance(*args)
+        except KeyError as err:
+            missing = err.args[0]
+            response.update(
+                error="not_found",
+                missing=missing[-1] if isinstance(missing, tuple) else missing,
+            )
+        except ForbiddenDebit as err:
+            response.update(
+                error="forbidden_debit", holder=err.holder_id, balance=err.balance
+            )
+        except Exception:  # pylint: disable=broad-except
+            response["error"] = "internal_error"
+        return response
+
+    async def _execute(self, semaphore: asyncio.Semaphore, line: bytes) -> bytes:
+        try:
+            request = _parse(line)
+        except ValueError:
+            response: _Response = {"error": "bad_request"}
+        else:
+            if self._executor is None:
+                response = self.handle(request)
+            else:
+                response = await asyncio.get_running_loop().run_in_executor(
+                    self._executor, self.handle, request
+                )
+        finally:
+            semaphore.release()
+        return json.dumps(response, separators=(",", ":")).encode() + b"\n"
+
+    async def _respond(
+        self,
+        pending: "asyncio.Queue[Optional[asyncio.Future[bytes]]]",
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        while True:
+            response = await pending.get()
+            if response is None:
+                return
+            data = await response
+            if writer.is_closing():
+                continue
+            try:
+                writer.write(data)
+                await writer.drain()
+            except ConnectionError:
+                writer.close()
+
+    async def _serve_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        if self._semaphore is None:
+            # Created within the serving loop, which older asyncio binds it to.
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        semaphore = self._semaphore
+        pending: "asyncio.Queue[Optional[asyncio.Future[bytes]]]" = asyncio.Queue(
+            self._pipeline_depth
+        )
+        responder = asyncio.ensure_future(self._respond(pending, writer))
+        try:
+            async for line in reader:
+                if line.strip():
+                    await semaphore.acquire()
+                    await pending.put(
+                        asyncio.ensure_future(self._execute(semaphore, line))
+                    )
+        except (ValueError, ConnectionError):
+            pass
+        finally:
+            await pending.put(None)
+            await responder
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> "asyncio.Server":
+        """Starts serving, in the background.
+
+        Args:
+            host: The interface where to listen.
+            port: The port where to listen. By default, a free port.
+
+        Returns:
+            The listening server, whose sockets give the port.
+        """
+        self._semaphore = None
+        return await asyncio.start_server(self._serve_connection, host, port)
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        """Serves until cancelled.
+
+        Args:
+            host: The interface where to listen.
+            port: The port where to listen. By default, a free port.
+        """
+        server = await self.start(host, port)
+        async with server:
+            await server.serve_forever()
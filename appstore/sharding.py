@@ -0,0 +1,360 @@
+"""Provides an accounts controller partitioned across worker processes."""
+import itertools
+import multiprocessing
+import threading
+import zlib
+from collections import defaultdict
+from contextvars import ContextVar
+from multiprocessing.connection import Connection
+from types import TracebackType
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
+
+from appstore.accounts import (
+    DEPOSITS_CHUNK_SIZE,
+    AccountsController,
+    ForbiddenDebit,
+    _Journal,
+    _TransactionContextManager,
+)
+from appstore.collections import chunks
+
+_Entries = Sequence[Tuple[float, str]]
+
+
+class ShardError(Exception):
+    """Exception for when a shard's worker failed to handle a request."""
+
+
+def shard_of(holder_id: str, shards: int) -> int:
+    """Maps an account's holder to a shard.
+
+    The mapping is stable across processes and runs.
+
+    >>> shard_of("User#123", 4)
+    3
+
+    Args:
+        holder_id: The account holder identifier.
+        shards: The number of shards.
+
+    Returns:
+        The index of the shard that keeps the holder's account.
+    """
+    return zlib.crc32(holder_id.encode()) % shards
+
+
+class _Shard:
+    """The accounts of a shard, handling one request at a time.
+
+    Cross-shard operations are committed in two phases.
+    On prepare, the shard checks and applies its debits, and holds its credits.
+    On commit, it applies the held credits. On abort, it refunds the debits.
+    So, money in flight can't be spent before the operation commits.
+    """
+
+    def __init__(self, accounts: AccountsController) -> None:
+        self._accounts = accounts
+        self._prepared: Dict[int, _Entries] = {}
+
+    def _apply_checked(self, entries: _Entries) -> None:
+        balances: Dict[str, float] = {}
+        for amount, holder_id in entries:
+            if holder_id not in balances:
+                balances[holder_id] = self._accounts.get_balance(holder_id)
+            if balances[holder_id] + amount < 0:
+                raise ForbiddenDebit(holder_id, amount, balances[holder_id])
+            balances[holder_id] += amount
+        self._accounts.replay([entries])
+
+    def handle(self, request: Tuple[Any, ...]) -> Any:
+        """Handles a request.
+
+        Args:
+            request: The operation's name followed by its arguments.
+
+        Raises:
+            ValueError: if the operation is unknown.
+
+        Returns:
+            The requested balance, or `None` for other operations.
+        """
+        operation, *args = request
+        if operation == "balance":
+            return self._accounts.get_balance(args[0])
+        if operation == "apply":
+            self._apply_checked(args[0])
+        elif operation == "force":
+            self._accounts.replay([args[0]])
+        elif operation == "prepare":
+            transaction_id, entries = args
+            self._apply_checked([entry for entry in entries if entry[0] < 0])
+            self._prepared[transaction_id] = entries
+        elif operation == "commit":
+            entries = self._prepared.pop(args[0])
+            self._accounts.replay([[entry for entry in entries if entry[0] > 0]])
+        elif operation == "abort":
+            entries = self._prepared.pop(args[0])
+            self._accounts.replay(
+                [[(-amount, holder_id) for amount, holder_id in entries if amount < 0]]
+            )
+        else:
+            raise ValueError(f"Unknown operation: {operation}")
+        return None
+
+
+def _serve(
+    connection: Connection, accounts_controller: Callable[[], AccountsController]
+) -> None:  # pragma: no cover
+    # Created on the first request, so that its errors are sent back too.
+    shard: Optional[_Shard] = None
+    while True:
+        request = connection.recv()
+        if request is None:
+            break
+        try:
+            if shard is None:
+                shard = _Shard(accounts_controller())
+            connection.send((True, shard.handle(request)))
+        except ForbiddenDebit as error:
+            connection.send((False, (error.holder_id, error.amount, error.balance)))
+        except Exception as error:  # pylint: disable=broad-except
+            connection.send((None, f"{type(error).__name__}: {error}"))
+    connection.close()
+
+
+class _ShardClient:
+    def __init__(
+        self,
+        context: Any,
+        accounts_controller: Callable[[], AccountsController],
+    ) -> None:
+        self._connection, child_connection = context.Pipe()
+        self._locker = threading.Lock()
+        self.process = context.Process(
+            target=_serve, args=(child_connection, accounts_controller), daemon=True
+        )
+        self.process.start()
+        child_connection.close()
+
+    def request(self, *request: Any) -> Any:
+        """Sends a request to the shard's worker and waits for its response.
+
+        Args:
+            request: The operation's name followed by its arguments.
+
+        Raises:
+            ForbiddenDebit: if the worker refused a debit.
+            ShardError: if the worker failed otherwise.
+
+        Returns:
+            The worker's result.
+        """
+        with self._locker:
+            self._connection.send(request)
+            succeeded, result = self._connection.recv()
+        if succeeded is None:
+            raise ShardError(result)
+        if not succeeded:
+            raise ForbiddenDebit(*result)
+        return result
+
+    def close(self) -> None:
+        """Stops the shard's worker."""
+        with self._locker:
+            self._connection.send(None)
+            self._connection.close()
+        self.process.join()
+
+
+class ShardedAccountsController:
+    """A controller for executing transferences between accounts in many processes.
+
+    Holders' accounts are hash-partitioned across worker processes.
+    Operations on a single shard are sent straight to its worker,
+    while operations spanning many shards are committed in two phases.
+    Transactions are journaled in the calling process,
+    and rolled back by compensating their operations on each shard.
+
+    >>> with ShardedAccountsController(shards=2) as accounts:
+    ...     accounts.deposit(10, "A1")
+    ...     accounts.transfer("A1", 4, "A4")
+    ...     accounts.get_balance("A1"), accounts.get_balance("A4")
+    (6.0, 4.0)
+    """
+
+    def __init__(
+        self,
+        shards: int = 4,
+        accounts_controller: Callable[[], AccountsController] = AccountsController,
+    ) -> None:
+        """Starts a worker process for each shard.
+
+        Args:
+            shards: The number of shards.
+            accounts_controller: Factory for each shard's accounts controller.
+                It must be picklable, for example, a class.
+        """
+        context = multiprocessing.get_context("spawn")
+        self._shards = [
+            _ShardClient(context, accounts_controller) for _ in range(shards)
+        ]
+        self._transaction_ids = itertools.count(1)
+        self._journal: ContextVar[Optional[_Journal]] = ContextVar(
+            f"journal-{id(self)}", default=None
+        )
+
+    def __enter__(self) -> "ShardedAccountsController":
+        return self
+
+    def __exit__(
+        self,
+        _exc_type: Optional[Type[BaseException]],
+        _exc_value: Optional[BaseException],
+        _traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Stops the worker processes."""
+        for shard in self._shards:
+            shard.close()
+
+    def _partition(self, entries: _Entries) -> Dict[int, List[Tuple[float, str]]]:
+        partitions: Dict[int, List[Tuple[float, str]]] = defaultdict(list)
+        for amount, holder_id in entries:
+            partitions[shard_of(holder_id, len(self._shards))].append(
+                (amount, holder_id)
+            )
+        return partitions
+
+    def _execute(self, entries: _Entries) -> None:
+        """Applies an operation's entries atomically.
+
+        Args:
+            entries: The operation's `(amount, holder_id)` entries.
+
+        Raises:
+            ForbiddenDebit: if some debit is bigger than the balance.
+            ShardError: if some shard failed otherwise.
+        """
+        partitions = self._partition(entries)
+        if len(partitions) == 1:
+            [(index, shard_entries)] = partitions.items()
+            self._shards[index].request("apply", shard_entries)
+        else:
+            transaction_id = next(self._transaction_ids)
+            prepared: List[int] = []
+            try:
+                for index, shard_entries in sorted(partitions.items()):
+                    self._shards[index].request(
+                        "prepare", transaction_id, shard_entries
+                    )
+                    prepared.append(index)
+            except BaseException:
+                for index in prepared:
+                    self._shards[index].request("abort", transaction_id)
+                raise
+            for index in prepared:
+                self._shards[index].request("commit", transaction_id)
+
+        journal = self._journal.get()
+        if journal is not None:
+            journal.extend(entries)
+
+    def deposit(self, amount: float, holder_id: str) -> None:
+        """Makes a deposit.
+
+        Args:
+            amount: Amount to add to the account balance.
+            holder_id: Identifier of the account's hodler.
+
+        Raises:
+            ValueError: if the amount isn't greater than 0.
+        """
+        if amount <= 0:
+            raise ValueError("Deposit amount must be greater than 0.")
+        self._execute([(amount, holder_id)])
+
+    def deposit_many(self, deposits: Iterable[Tuple[float, str]]) -> None:
+        """Makes deposits in bulk.
+
+        Deposits are made a chunk at a time, with a single request
+        to each shard per chunk. As deposits can't fail,
+        the shards apply them without a two-phase commit.
+
+        Args:
+            deposits: The amount and the holder identifier of each deposit.
+
+        Raises:
+            ValueError: if some amount isn't greater than 0. The chunks before
+                the one with such amount are already deposited.
+        """
+        for chunk in chunks(deposits, DEPOSITS_CHUNK_SIZE):
+            if any(amount <= 0 for amount, _ in chunk):
+                raise ValueError("Deposit amount must be greater than 0.")
+            for index, shard_entries in sorted(self._partition(chunk).items()):
+                self._shards[index].request("apply", shard_entries)
+            journal = self._journal.get()
+            if journal is not None:
+                journal.extend(chunk)
+
+    def transfer(self, issuer_id: str, amount: float, recepient_id: str) -> None:
+        """Transfers an amount from an account to another.
+
+        Args:
+            issuer_id: Holder of the account to debit.
+            amount: Amount to transfer.
+            recepient_id: Holder of the account to credit.
+
+        Raises:
+            ValueError: if the amount isn't greater than 0.
+        """
+        if amount <= 0:
+            raise ValueError("Transference amount must be greater than 0.")
+        self._execute([(-1 * amount, issuer_id), (amount, recepient_id)])
+
+    def get_balance(self, holder_id: str) -> float:
+        """Get an account's balance.
+
+        Args:
+            holder_id: The account holder identifier.
+
+        Returns:
+            The account's balance.
+        """
+        balance: float = self._shards[shard_of(holder_id, len(self._shards))].request(
+            "balance", holder_id
+        )
+        return balance
+
+    def _revert_transaction(self, journal: _Journal) -> None:
+        reverted = [(-1 * amount, holder_id) for amount, holder_id in reversed(journal)]
+        for index, shard_entries in self._partition(reverted).items():
+            self._shards[index].request("force", shard_entries)
+
+    def transaction(self) -> ContextManager[None]:
+        """Creates a transaction context.
+
+        It rolls back all operations in such a context if any operation fails.
+        Each thread or asynchronous task keeps its own transactions,
+        which can be nested.
+
+        Returns:
+            Nothing.
+        """
+        return _TransactionContextManager(
+            journal=self._journal,
+            commit_transaction=lambda journal: None,
+            revert_transaction=self._revert_transaction,
+        )
@@ -0,0 +1,161 @@
+"""Provides persistent accounts with log segments and snapshots."""
+import mmap
+import os
+import re
+import struct
+from array import array
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from appstore.accounts import AccountsController
+from appstore.wal import Entry, WriteAheadLog, read_log
+
+_MAGIC = b"APPSNAP1"
+_HEADER = struct.Struct("<8sQQ")
+_SEGMENT = "segment-{:08d}.log"
+_SNAPSHOT = "snapshot-{:08d}.bin"
+_FILE_PATTERN = re.compile(r"(segment|snapshot)-(\d{8})\.(log|bin)")
+
+
+def write_snapshot(path: Union[str, Path], balances: Dict[str, float]) -> None:
+    """Writes a binary snapshot of the accounts' balances.
+
+    The snapshot has a header, with the number of accounts and the holders'
+    index size, followed by the balances, as 8-byte floats, and by the holders'
+    index, as NUL-separated UTF-8 identifiers in the same order.
+    The file is written aside and then renamed, so that a crash never leaves
+    an incomplete snapshot.
+
+    Args:
+        path: The snapshot file path.
+        balances: Mapping from the holders' identifiers to their balances.
+    """
+    path = Path(path)
+    index = b"\0".join(holder_id.encode() for holder_id in balances)
+    partial_path = path.with_name(path.name + ".partial")
+    with partial_path.open("wb") as file:
+        file.write(_HEADER.pack(_MAGIC, len(balances), len(index)))
+        file.write(array("d", balances.values()).tobytes())
+        file.write(index)
+        file.flush()
+        os.fsync(file.fileno())
+    partial_path.replace(path)
+
+
+def read_snapshot(path: Union[str, Path]) -> Iterator[Entry]:
+    """Reads a binary snapshot, memory-mapping it.
+
+    Args:
+        path: The snapshot file path.
+
+    Raises:
+        ValueError: if the file isn't a snapshot.
+
+    Yields:
+        The balance of each account and its holder's identifier.
+    """
+    with Path(path).open("rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+            magic, count, index_size = _HEADER.unpack_from(mapping)
+            if magic != _MAGIC:
+                raise ValueError(f"{path} isn't a snapshot.")
+            balances_end = _HEADER.size + 8 * count
+            index = mapping[balances_end : balances_end + index_size]
+            holder_ids = index.decode().split("\0") if count else []
+            with memoryview(mapping) as view:
+                with view[_HEADER.size : balances_end] as section:
+                    with section.cast("d") as balances:
+                        yield from zip(balances, holder_ids)
+
+
+class LedgerStore:
+    """A directory with an accounts' log split in segments, and snapshots.
+
+    Operations are logged to the last segment.
+    A checkpoint starts a new segment and folds the previous ones into
+    a snapshot, after which they are deleted.
+    Restoring the accounts reads the last snapshot and replays only the segments
+    after it, so it doesn't slow down as the history grows.
+    """
+
+    def __init__(self, directory: Union[str, Path]) -> None:
+        """Opens the store, creating its directory if it doesn't exist.
+
+        Args:
+            directory: The store's directory.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        segments = self._list("segment")
+        self._segment = segments[-1] if segments else 1
+        self.log = WriteAheadLog(self.directory / _SEGMENT.format(self._segment))
+
+    def _list(self, kind: str) -> List[int]:
+        numbers = []
+        for path in self.directory.iterdir():
+            match = _FILE_PATTERN.fullmatch(path.name)
+            if match and match.group(1) == kind:
+                numbers.append(int(match.group(2)))
+        return sorted(numbers)
+
+    def _last_snapshot(self) -> Optional[int]:
+        snapshots = self._list("snapshot")
+        return snapshots[-1] if snapshots else None
+
+    def _history(self) -> Iterator[Iterable[Entry]]:
+        """Reads the last snapshot and the closed segments after it.
+
+        Yields:
+            The snapshot's balances, as a single record,
+            followed by the closed segments' records.
+        """
+        snapshot = self._last_snapshot()
+        if snapshot is not None:
+            yield read_snapshot(self.directory / _SNAPSHOT.format(snapshot))
+        for segment in self._list("segment"):
+            if (snapshot is None or segment >= snapshot) and segment < self._segment:
+                yield from read_log(self.directory / _SEGMENT.format(segment))
+
+    def load(
+        self,
+        accounts_controller: Callable[
+            [WriteAheadLog], AccountsController
+        ] = AccountsController,
+    ) -> AccountsController:
+        """Restores the accounts, logging their next operations to the store.
+
+        Args:
+            accounts_controller: Creates an accounts controller with a given log,
+                e.g., an accounts controller class.
+
+        Returns:
+            The restored accounts controller.
+        """
+        accounts = accounts_controller(self.log)
+        accounts.replay(self._history())
+        return accounts
+
+    def checkpoint(self) -> None:
+        """Starts a new log segment and compacts the previous ones into a snapshot.
+
+        The snapshot is built from the previous snapshot and segments,
+        not from the accounts in memory, so it only includes committed operations
+        and doesn't block them.
+        """
+        self._segment += 1
+        self.log.rotate(self.directory / _SEGMENT.format(self._segment))
+
+        balances: Dict[str, float] = {}
+        for entries in self._history():
+            for amount, holder_id in entries:
+                balances[holder_id] = balances.get(holder_id, 0.0) + amount
+        write_snapshot(self.directory / _SNAPSHOT.format(self._segment), balances)
+
+        for kind, pattern in [("segment", _SEGMENT), ("snapshot", _SNAPSHOT)]:
+            for number in self._list(kind):
+                if number < self._segment:
+                    (self.directory / pattern.format(number)).unlink()
+
+    def close(self) -> None:
+        """Closes the store's log."""
+        self.log.close()
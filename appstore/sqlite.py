@@ -0,0 +1,274 @@
+"""Provides SQLite apps' and users' databases."""
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from appstore.appstore import Listing
+
+_STATEMENTS_CACHE_SIZE = 64
+
+_APPS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS apps (
+    app_id TEXT PRIMARY KEY,
+    developer_id TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS items (
+    app_id TEXT NOT NULL,
+    item TEXT NOT NULL,
+    price REAL NOT NULL,
+    PRIMARY KEY (app_id, item)
+) WITHOUT ROWID;
+"""
+_INSERT_APP = "INSERT OR REPLACE INTO apps (app_id, developer_id) VALUES (?, ?)"
+_INSERT_ITEM = "INSERT OR REPLACE INTO items (app_id, item, price) VALUES (?, ?, ?)"
+_SELECT_DEVELOPER = "SELECT developer_id FROM apps WHERE app_id = ?"
+_SELECT_PRICE = "SELECT price FROM items WHERE app_id = ? AND item = ?"
+_SELECT_LISTING = """
+SELECT items.price, apps.developer_id
+FROM items JOIN apps ON apps.app_id = items.app_id
+WHERE items.app_id = ? AND items.item = ?
+"""
+
+_USERS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id TEXT PRIMARY KEY,
+    purchases INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+"""
+_INSERT_USER = "INSERT OR IGNORE INTO users (user_id) VALUES (?)"
+_SELECT_PURCHASES = "SELECT purchases FROM users WHERE user_id = ?"
+_INCREMENT_PURCHASES = "UPDATE users SET purchases = purchases + 1 WHERE user_id = ?"
+_DECREMENT_PURCHASES = "UPDATE users SET purchases = purchases - 1 WHERE user_id = ?"
+
+
+class _SQLiteDB:
+    """A SQLite database with a connection per thread.
+
+    Each connection keeps its prepared statements cached,
+    so that repeated queries aren't parsed again.
+    """
+
+    def __init__(self, path: Union[str, Path], schema: str) -> None:
+        self.path = Path(path)
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_locker = threading.Lock()
+        self._connect().executescript(schema)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection: Optional[sqlite3.Connection] = getattr(
+            self._local, "connection", None
+        )
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path,
+                check_same_thread=False,
+                cached_statements=_STATEMENTS_CACHE_SIZE,
+            )
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            self._local.connection = connection
+            with self._connections_locker:
+                self._connections.append(connection)
+        return connection
+
+    def close(self) -> None:
+        """Closes the connections of all threads."""
+        with self._connections_locker:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class SQLiteAppsDB(_SQLiteDB):
+    """Implements an apps' database persisted in SQLite."""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        """Opens the apps' database, creating it if it doesn't exist.
+
+        Args:
+            path: The database file path.
+        """
+        super().__init__(path, _APPS_SCHEMA)
+
+    def add_app(self, app_id: str, developer_id: str, items: Dict[str, float]) -> None:
+        """Adds an application to the apps' database.
+
+        Args:
+            app_id: Identifier for the app.
+            developer_id: Identifier for the app's developer.
+            items: Mapping from the app items to their prices.
+        """
+        self.add_apps([(app_id, developer_id, items)])
+
+    def add_apps(self, apps: Iterable[Tuple[str, str, Mapping[str, float]]]) -> None:
+        """Adds applications to the apps' database in a single transaction.
+
+        Args:
+            apps: Tuples with the app identifier, its developer identifier,
+                and the mapping from the app items to their prices.
+        """
+        connection = self._connect()
+        with connection:
+            for app_id, developer_id, items in apps:
+                connection.execute(_INSERT_APP, (app_id, developer_id))
+                connection.executemany(
+                    _INSERT_ITEM,
+                    ((app_id, item, price) for item, price in items.items()),
+                )
+
+    def get_developer_id(self, app_id: str) -> str:
+        """Get the developer of a given app.
+
+        Args:
+            app_id: The app identifier.
+
+        Raises:
+            KeyError: if the app doesn't exist.
+
+        Returns:
+            The identifier for the developer who published the app
+            that corresponds to `app_id`.
+        """
+        row = self._connect().execute(_SELECT_DEVELOPER, (app_id,)).fetchone()
+        if row is None:
+            raise KeyError(app_id)
+        developer_id: str = row[0]
+        return developer_id
+
+    def get_item_price(self, app_id: str, item: str) -> float:
+        """Get an app items' price.
+
+        Args:
+            app_id: The app identifier.
+            item: The apps item.
+
+        Raises:
+            KeyError: if the app or the item doesn't exist.
+
+        Returns:
+            The price for the item of the app that corresponds to `app_id`.
+        """
+        row = self._connect().execute(_SELECT_PRICE, (app_id, item)).fetchone()
+        if row is None:
+            raise KeyError((app_id, item))
+        price: float = row[0]
+        return price
+
+    def get_listing(self, app_id: str, item: str) -> Listing:
+        """Get an app item's price and the app's developer.
+
+        Args:
+            app_id: The app identifier.
+            item: The apps item.
+
+        Raises:
+            KeyError: if the app or the item doesn't exist.
+
+        Returns:
+            The price for the item of the app that corresponds to `app_id`,
+            and the identifier for the developer who published the app.
+        """
+        row = self._connect().execute(_SELECT_LISTING, (app_id, item)).fetchone()
+        if row is None:
+            raise KeyError((app_id, item))
+        return Listing(*row)
+
+
+class SQLiteUsersDB(_SQLiteDB):
+    """Implements a users' database persisted in SQLite."""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        """Opens the users' database, creating it if it doesn't exist.
+
+        Args:
+            path: The database file path.
+        """
+        super().__init__(path, _USERS_SCHEMA)
+
+    def add_user(self, user_id: str) -> None:
+        """Adds a user.
+
+        Args:
+            user_id: User identifier.
+        """
+        self.add_users([user_id])
+
+    def add_users(self, user_ids: Iterable[str]) -> None:
+        """Adds users in a single transaction.
+
+        Args:
+            user_ids: Users identifiers.
+        """
+        connection = self._connect()
+        with connection:
+            connection.executemany(_INSERT_USER, ((user_id,) for user_id in user_ids))
+
+    def get_purchases(self, user_id: str) -> int:
+        """Get the number of purchases the given user made.
+
+        Args:
+            user_id: User identifier.
+
+        Raises:
+            KeyError: if the user doesn't exits.
+
+        Returns:
+            The number of purchases made by the given user.
+        """
+        row = self._connect().execute(_SELECT_PURCHASES, (user_id,)).fetchone()
+        if row is None:
+            raise KeyError(user_id)
+        purchases: int = row[0]
+        return purchases
+
+    def increment_purchases(self, user_id: str) -> int:
+        """Count a user's purchase.
+
+        Args:
+            user_id: User identifier.
+
+        Raises:
+            KeyError: if the user doesn't exits.
+
+        Returns:
+            The number of purchases made by the given user after the increment.
+        """
+        try:
+            return self._update_purchases(_INCREMENT_PURCHASES, user_id)
+        except KeyError:
+            raise KeyError(f"No user: {user_id}") from None
+
+    def record_purchase(self, user_id: str) -> int:
+        """Count a user's purchase, atomically.
+
+        Args:
+            user_id: User identifier.
+
+        Returns:
+            The number of purchases made by the given user before the increment.
+        """
+        return self._update_purchases(_INCREMENT_PURCHASES, user_id) - 1
+
+    def cancel_purchase(self, user_id: str) -> int:
+        """Discount a user's purchase, atomically.
+
+        Args:
+            user_id: User identifier.
+
+        Returns:
+            The number of purchases made by the given user after the decrement.
+        """
+        return self._update_purchases(_DECREMENT_PURCHASES, user_id)
+
+    def _update_purchases(self, update: str, user_id: str) -> int:
+        connection = self._connect()
+        with connection:
+            if connection.execute(update, (user_id,)).rowcount == 0:
+                raise KeyError(user_id)
+            purchases: int = connection.execute(
+                _SELECT_PURCHASES, (user_id,)
+            ).fetchone()[0]
+        return purchases
@@ -1,6 +1,8 @@
 """Provides the users' database."""
+import threading
 from collections import Counter
 from collections.abc import MutableSet
+from typing import Iterable
 
 
 class InMemoryUsersDB:
@@ -10,6 +12,7 @@ class InMemoryUsersDB:
         """Initializes the in-memory users database."""
         self._user_ids: MutableSet[str] = set()
         self._purchases_counter: Counter[str] = Counter()
+        self._locker = threading.Lock()
 
     def add_user(self, user_id: str) -> None:
         """Adds a user.
@@ -19,6 +22,16 @@ class InMemoryUsersDB:
         """
         self._user_ids.add(user_id)
 
+    def add_users(self, user_ids: Iterable[str]) -> None:
+        """Adds users in bulk.
+
+        Args:
+            user_ids: Users identifiers.
+        """
+        add_user = self._user_ids.add
+        for user_id in user_ids:
+            add_user(user_id)
+
     def get_purchases(self, user_id: str) -> int:
         """Get the number of purchases the given user made.
 
@@ -51,5 +64,43 @@ class InMemoryUsersDB:
         if user_id not in self._user_ids:
             raise KeyError(f"No user: {user_id}")
 
-        self._purchases_counter[user_id] += 1
-        return self._purchases_counter[user_id]
+        return self.record_purchase(user_id) + 1
+
+    def record_purchase(self, user_id: str) -> int:
+        """Count a user's purchase, atomically.
+
+        Args:
+            user_id: User identifier.
+
+        Raises:
+            KeyError: if the user doesn't exits.
+
+        Returns:
+            The number of purchases made by the given user before the increment.
+        """
+        if user_id not in self._user_ids:
+            raise KeyError(user_id)
+
+        with self._locker:
+            purchases = self._purchases_counter[user_id]
+            self._purchases_counter[user_id] = purchases + 1
+        return purchases
+
+    def cancel_purchase(self, user_id: str) -> int:
+        """Discount a user's purchase, atomically.
+
+        Args:
+            user_id: User identifier.
+
+        Raises:
+            KeyError: if the user doesn't exits.
+
+        Returns:
+            The number of purchases made by the given user after the decrement.
+        """
+        if user_id not in self._user_ids:
+            raise KeyError(user_id)
+
+        with self._locker:
+            self._purchases_counter[user_id] -= 1
+            return self._purchases_counter[user_id]
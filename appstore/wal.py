@@ -0,0 +1,197 @@
+"""Provides a write-ahead log for the accounts' transactions."""
+import json
+import os
+import threading
+from pathlib import Path
+from types import TracebackType
+from typing import BinaryIO, Iterator, List, Optional, Sequence, Tuple, Type, Union
+
+Entry = Tuple[float, str]
+
+_CHUNK_SIZE = 1 << 16
+
+
+def _complete_length(file: BinaryIO) -> int:
+    """Find the length of a log file without its last incomplete record.
+
+    Args:
+        file: The log file.
+
+    Returns:
+        The position after the last complete record.
+    """
+    end = file.seek(0, os.SEEK_END)
+    while end > 0:
+        start = max(end - _CHUNK_SIZE, 0)
+        file.seek(start)
+        newline = file.read(end - start).rfind(b"\n")
+        if newline >= 0:
+            return start + newline + 1
+        end = start
+    return 0
+
+
+def read_log(path: Union[str, Path]) -> Iterator[List[Entry]]:
+    """Reads the records of a log file.
+
+    Args:
+        path: The log file path.
+
+    Yields:
+        The entries of each record, in the order they were written.
+    """
+    with Path(path).open("rb") as file:
+        for line in file:
+            if not line.endswith(b"\n"):
+                return
+            yield [
+                (float(amount), str(holder_id))
+                for amount, holder_id in json.loads(line)
+            ]
+
+
+def _open(path: Path) -> BinaryIO:
+    """Opens a log file for appending, creating it if it doesn't exist.
+
+    Args:
+        path: The log file path.
+
+    Returns:
+        The log file, positioned after its last complete record.
+    """
+    path.touch()
+    file = path.open("r+b")  # pylint: disable=consider-using-with
+    file.truncate(_complete_length(file))
+    file.seek(0, os.SEEK_END)
+    return file
+
+
+class WriteAheadLog:
+    """An append-only file of committed transactions.
+
+    Each record is a JSON line with the `(amount, holder_id)` entries
+    of a transaction.
+    Writers that wait for their records at the same time share a single `fsync`,
+    i.e., the log commits in groups.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        """Opens the log for appending, creating it if it doesn't exist.
+
+        An incomplete record left by a crash at the end of the log is discarded.
+
+        Args:
+            path: The log file path.
+        """
+        self.path = Path(path)
+        self._file = _open(self.path)
+        self._condition = threading.Condition()
+        self._written = 0
+        self._synced = 0
+        self._syncing = False
+        self.syncs = 0
+
+    def read(self) -> Iterator[List[Entry]]:
+        """Reads the log's records.
+
+        Returns:
+            The entries of each record, in the order they were written.
+        """
+        return read_log(self.path)
+
+    def write(self, entries: Sequence[Entry]) -> int:
+        """Writes a record, without waiting for it to be durable.
+
+        Args:
+            entries: The `(amount, holder_id)` entries of a transaction.
+
+        Returns:
+            The record's position, for waiting on it with `sync`.
+        """
+        line = json.dumps(entries, separators=(",", ":")).encode() + b"\n"
+        with self._condition:
+            self._file.write(line)
+            self._written += 1
+            return self._written
+
+    def sync(self, position: int) -> None:
+        """Waits until the record at the given position is durable.
+
+        The first waiter flushes and syncs all records written so far,
+        while the others wait for it.
+
+        Args:
+            position: The position returned by `write`.
+        """
+        with self._condition:
+            while self._synced < position:
+                if self._syncing:
+                    self._condition.wait()
+                else:
+                    self._sync()
+
+    def _sync(self) -> None:
+        self._syncing = True
+        target = self._written
+        try:
+            self._file.flush()
+            self._condition.release()
+            try:
+                os.fsync(self._file.fileno())
+            finally:
+                self._condition.acquire()
+            self._synced = target
+            self.syncs += 1
+        finally:
+            self._syncing = False
+            self._condition.notify_all()
+
+    def rotate(self, path: Union[str, Path]) -> Path:
+        """Syncs the log and continues it in another file.
+
+        Args:
+            path: The new log file path.
+
+        Returns:
+            The previous log file path.
+        """
+        with self._condition:
+            while self._syncing:
+                self._condition.wait()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._synced = self._written
+            self._condition.notify_all()
+            self._file.close()
+            previous_path, self.path = self.path, Path(path)
+            self._file = _open(self.path)
+            return previous_path
+
+    def append(self, entries: Sequence[Entry]) -> None:
+        """Writes a record and waits until it is durable.
+
+        Args:
+            entries: The `(amount, holder_id)` entries of a transaction.
+        """
+        self.sync(self.write(entries))
+
+    def close(self) -> None:
+        """Syncs and closes the log."""
+        self.sync(self._written)
+        self._file.close()
+
+    def __enter__(self) -> "WriteAheadLog":
+        """Uses the log as a context manager.
+
+        Returns:
+            The log itself.
+        """
+        return self
+
+    def __exit__(
+        self,
+        _exc_type: Optional[Type[BaseException]],
+        _exc_value: Optional[BaseException],
+        _traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
@@ -0,0 +1,7 @@
+"""Benchmarks for the app store's hot paths.
+
+Run them, and compare them with a previous run's baseline, as follows:
+
+    python -m benchmarks --output baseline.json
+    python -m benchmarks --compare baseline.json
+"""
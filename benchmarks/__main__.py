@@ -0,0 +1,349 @@
+"""Runs the benchmarks, and compares them with a baseline."""
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from appstore.accounts import AccountsController
+from appstore.appstore import BONUS_TABLE_SIZE
+from appstore.collections import MaxKeyAccessor
+from appstore.resp import LocalRESPServer, RESPUsersDB
+from appstore.server import StoreServer
+from benchmarks.workload import (
+    Workload,
+    bonus_tiers,
+    build_server,
+    build_store,
+    fund_hot_accounts,
+    hot_transfers,
+    purchases,
+    tier_limits,
+)
+
+PERCENTILES = (50, 90, 99)
+WINDOW = 32
+BATCH_SIZE = 64
+
+
+@dataclass
+class Result:
+    """The throughput and latency percentiles of a benchmark."""
+
+    operations: int
+    threads: int
+    ops_per_second: float
+    p50_us: float
+    p90_us: float
+    p99_us: float
+    max_us: float
+
+
+def measure(
+    operation: Callable[..., object],
+    calls: Sequence[Tuple[Any, ...]],
+    threads: int = 1,
+    repeat: int = 1,
+) -> Result:
+    """Runs an operation, with calls split across threads, timing each call.
+
+    Args:
+        operation: The operation to benchmark. Its exceptions are ignored,
+            as workloads include failing operations.
+        calls: The arguments of each call.
+        threads: The number of threads.
+        repeat: The number of runs, of which the fastest is kept.
+
+    Returns:
+        The benchmark's result.
+    """
+    return max(
+        (_run(operation, calls, threads) for _ in range(repeat)),
+        key=lambda result: result.ops_per_second,
+    )
+
+
+def _run(
+    operation: Callable[..., object], calls: Sequence[Tuple[Any, ...]], threads: int
+) -> Result:
+    latencies: List[List[int]] = [[] for _ in range(threads)]
+
+    def run(thread: int) -> None:
+        timings = latencies[thread]
+        for arguments in calls[thread::threads]:
+            started = time.perf_counter_ns()
+            try:
+                operation(*arguments)
+            except Exception:  # pylint: disable=broad-except
+                pass
+            timings.append(time.perf_counter_ns() - started)
+
+    workers = [
+        threading.Thread(target=run, args=(thread,)) for thread in range(threads)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    return _result(latencies, threads, elapsed)
+
+
+def _result(latencies: List[List[int]], threads: int, elapsed: float) -> Result:
+    merged = sorted(latency for timings in latencies for latency in timings)
+    p50, p90, p99 = (
+        merged[min(len(merged) - 1, len(merged) * percentile // 100)] / 1000
+        for percentile in PERCENTILES
+    )
+    return Result(
+        operations=len(merged),
+        threads=threads,
+        ops_per_second=len(merged) / elapsed,
+        p50_us=p50,
+        p90_us=p90,
+        p99_us=p99,
+        max_us=merged[-1] / 1000,
+    )
+
+
+def serve(
+    server: StoreServer,
+    calls: Sequence[Tuple[str, str, str]],
+    clients: int = 1,
+    repeat: int = 1,
+) -> Result:
+    """Serves sales over TCP to local clients, timing each request.
+
+    Each client pipelines its share of the sales, keeping up to `WINDOW`
+    requests in flight, so a request's latency includes the time it waits
+    behind the previous ones.
+
+    Args:
+        server: The server, which is started and stopped on each run.
+        calls: The app, item and user of each sale.
+        clients: The number of concurrent client connections.
+        repeat: The number of runs, of which the fastest is kept.
+
+    Returns:
+        The benchmark's result.
+    """
+    return max(
+        (_serve(server, calls, clients) for _ in range(repeat)),
+        key=lambda result: result.ops_per_second,
+    )
+
+
+def _serve(
+    server: StoreServer, calls: Sequence[Tuple[str, str, str]], clients: int
+) -> Result:
+    latencies: List[List[int]] = [[] for _ in range(clients)]
+
+    async def client(port: int, index: int) -> None:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        sent: Deque[int] = deque()
+        in_flight = asyncio.Semaphore(WINDOW)
+
+        async def send() -> None:
+            for app, item, user in calls[index::clients]:
+                await in_flight.acquire()
+                sent.append(time.perf_counter_ns())
+                writer.write(f"sell {app} {item} {user}\n".encode())
+                await writer.drain()
+            writer.write_eof()
+
+        async def receive() -> None:
+            async for _ in reader:
+                latencies[index].append(time.perf_counter_ns() - sent.popleft())
+                in_flight.release()
+
+        await asyncio.gather(send(), receive())
+        writer.close()
+
+    async def run() -> float:
+        listening = await server.start()
+        port = listening.sockets[0].getsockname()[1]
+        started = time.perf_counter()
+        async with listening:
+            await asyncio.gather(*(client(port, index) for index in range(clients)))
+        return time.perf_counter() - started
+
+    elapsed = asyncio.run(run())
+    return _result(latencies, clients, elapsed)
+
+
+def measure_resp(
+    workload: Workload,
+    calls: Sequence[Tuple[str, str, str]],
+    threads: int = 1,
+    repeat: int = 1,
+) -> Dict[str, Result]:
+    """Sells with the users in a local RESP server, one by one and in batches.
+
+    Args:
+        workload: The workload parameters.
+        calls: The arguments of each sale.
+        threads: The number of threads.
+        repeat: The number of runs, of which the fastest is kept.
+
+    Returns:
+        The result of each benchmark. Batches count as an operation each.
+    """
+    batches = [(calls[i : i + BATCH_SIZE],) for i in range(0, len(calls), BATCH_SIZE)]
+    with LocalRESPServer() as resp_server:
+        usersdb = RESPUsersDB(*resp_server.address)
+        store = build_store(workload, AccountsController(), usersdb)
+        results = {
+            f"resp/sell/threads={threads}": measure(store.sell, calls, threads, repeat),
+            f"resp/sell_many/threads={threads}": measure(
+                store.sell_many, batches, threads, repeat
+            ),
+        }
+        usersdb.close()
+    return results
+
+
+def run_benchmarks(
+    workload: Workload, operations: int, threads: int, repeat: int
+) -> Dict[str, Result]:
+    """Runs all benchmarks, in a single thread and in many threads.
+
+    Args:
+        workload: The workload parameters.
+        operations: The number of operations of each benchmark.
+        threads: The number of threads of the multi-thread benchmarks.
+        repeat: The number of runs of each benchmark, of which the fastest is kept.
+
+    Returns:
+        The result of each benchmark.
+    """
+    results: Dict[str, Result] = {}
+    sales = purchases(workload, operations)
+    transfers = hot_transfers(workload, operations)
+    limits = tier_limits(workload, operations)
+    for thread_count in sorted({1, threads}):
+        store = build_store(workload, AccountsController())
+        results[f"sell/threads={thread_count}"] = measure(
+            store.sell, sales, thread_count, repeat
+        )
+
+        results[f"server/clients={thread_count}"] = serve(
+            build_server(workload), sales, thread_count, repeat
+        )
+
+        results.update(measure_resp(workload, sales, thread_count, repeat))
+
+        accounts = fund_hot_accounts(AccountsController())
+        results[f"transfer/threads={thread_count}"] = measure(
+            accounts.transfer, transfers, thread_count, repeat
+        )
+
+    tiers = bonus_tiers(workload.bonus_tiers)
+    for name, table_size in [("bisect", 0), ("table", BONUS_TABLE_SIZE)]:
+        accessor = MaxKeyAccessor(tiers, max_table_size=table_size)
+        results[f"get_max/{name}"] = measure(accessor.get_max, limits, 1, repeat)
+    return results
+
+
+def compare(
+    baseline: Dict[str, Dict[str, Any]],
+    current: Dict[str, Dict[str, Any]],
+    tolerance: float,
+) -> List[str]:
+    """Compares results with a baseline.
+
+    Args:
+        baseline: The baseline's results, by benchmark.
+        current: The current results, by benchmark.
+        tolerance: The relative throughput drop, or p99 latency growth,
+            beyond which a benchmark regressed.
+
+    Returns:
+        The benchmarks that regressed.
+    """
+    regressions = []
+    for name in sorted(baseline.keys() & current.keys()):
+        throughput = current[name]["ops_per_second"] / baseline[name]["ops_per_second"]
+        latency = current[name]["p99_us"] / baseline[name]["p99_us"]
+        regressed = throughput < 1 - tolerance or latency > 1 + tolerance
+        print(
+            f"{name:24} throughput {throughput - 1:+7.1%}  p99 {latency - 1:+7.1%}"
+            + ("  REGRESSION" if regressed else "")
+        )
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Runs the benchmarks from the command line.
+
+    Args:
+        argv: The command line arguments, or `None` for the process' arguments.
+
+    Returns:
+        The exit status: 1 if some benchmark regressed, 0 otherwise.
+    """
+    defaults = Workload()
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--operations", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--apps", type=int, default=defaults.apps)
+    parser.add_argument("--items-per-app", type=int, default=defaults.items_per_app)
+    parser.add_argument("--users", type=int, default=defaults.users)
+    parser.add_argument("--zipf-exponent", type=float, default=defaults.zipf_exponent)
+    parser.add_argument("--bonus-tiers", type=int, default=defaults.bonus_tiers)
+    parser.add_argument("--failure-ratio", type=float, default=defaults.failure_ratio)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--output", type=Path, help="where to write the results")
+    parser.add_argument("--compare", type=Path, help="baseline to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args(argv)
+
+    workload = Workload(
+        apps=args.apps,
+        items_per_app=args.items_per_app,
+        users=args.users,
+        zipf_exponent=args.zipf_exponent,
+        bonus_tiers=args.bonus_tiers,
+        failure_ratio=args.failure_ratio,
+        seed=args.seed,
+    )
+    results = {
+        name: asdict(result)
+        for name, result in run_benchmarks(
+            workload, args.operations, args.threads, args.repeat
+        ).items()
+    }
+    for name, result in results.items():
+        print(
+            f"{name:24} {result['ops_per_second']:12.0f} ops/s"
+            f"  p50 {result['p50_us']:8.1f}us  p99 {result['p99_us']:8.1f}us"
+        )
+
+    if args.output is not None:
+        report = {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "workload": asdict(workload),
+            "operations": args.operations,
+            "results": results,
+        }
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    if args.compare is not None:
+        baseline = json.loads(args.compare.read_text())
+        if compare(baseline["results"], results, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""Generates synthetic, reproducible app store workloads."""
+import random
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import Dict, List, Tuple, Union
+
+from appstore.accounts import AccountsController
+from appstore.apps import InMemoryAppsDB
+from appstore.appstore import AppStore
+from appstore.resp import RESPUsersDB
+from appstore.server import StoreServer
+from appstore.users import InMemoryUsersDB
+
+STORE_ID = "Store"
+MISSING_ITEM = "MissingItem"
+HOT_ACCOUNTS = 8
+
+
+@dataclass
+class Workload:
+    """The parameters of a synthetic workload."""
+
+    apps: int = 1000
+    items_per_app: int = 5
+    users: int = 10000
+    zipf_exponent: float = 1.1
+    bonus_tiers: int = 10
+    failure_ratio: float = 0.01
+    seed: int = 42
+
+
+def zipf_weights(count: int, exponent: float) -> List[float]:
+    """Get cumulative Zipf weights, so that low ranks are the most popular.
+
+    Args:
+        count: The number of ranks.
+        exponent: The Zipf exponent. The higher, the more skewed.
+
+    Returns:
+        The cumulative weight of each rank.
+    """
+    return list(accumulate(1 / rank**exponent for rank in range(1, count + 1)))
+
+
+def bonus_tiers(tiers: int) -> Dict[int, float]:
+    """Get bonus tiers, doubling the purchases needed for each tier.
+
+    Args:
+        tiers: The number of tiers.
+
+    Returns:
+        Mapping from the number of purchases to their bonus.
+    """
+    return {2**tier: (tier + 1) / 100 for tier in range(tiers)}
+
+
+def build_store(
+    workload: Workload,
+    accounts: AccountsController,
+    usersdb: Union[InMemoryUsersDB, RESPUsersDB, None] = None,
+) -> AppStore:
+    """Creates an app store with the workload's catalog and users.
+
+    Users and the store are given balances that no sale exhausts.
+
+    Args:
+        workload: The workload parameters.
+        accounts: The accounts controller for the store.
+        usersdb: The empty users' database where to add the users.
+            By default, an in-memory one.
+
+    Returns:
+        The app store.
+    """
+    appsdb = InMemoryAppsDB()
+    for app in range(workload.apps):
+        appsdb.add_app(
+            f"App#{app}",
+            developer_id=f"Developer#{app % 100}",
+            items={
+                f"Item#{item}": 1.0 + item for item in range(workload.items_per_app)
+            },
+        )
+    if usersdb is None:
+        usersdb = InMemoryUsersDB()
+    usersdb.add_users(f"User#{user}" for user in range(workload.users))
+    accounts.deposit_many((1e9, f"User#{user}") for user in range(workload.users))
+    accounts.deposit(1e12, STORE_ID)
+    return AppStore(
+        appstore_id=STORE_ID,
+        commission=0.3,
+        bonus_after_purchases=bonus_tiers(workload.bonus_tiers),
+        accounts_controller=accounts,
+        appsdb=appsdb,
+        usersdb=usersdb,
+    )
+
+
+def build_server(workload: Workload) -> StoreServer:
+    """Creates a server for an app store with the workload's catalog and users.
+
+    Args:
+        workload: The workload parameters.
+
+    Returns:
+        The server, not yet started.
+    """
+    accounts = AccountsController()
+    return StoreServer(build_store(workload, accounts), accounts)
+
+
+def purchases(workload: Workload, count: int) -> List[Tuple[str, str, str]]:
+    """Generates purchases of Zipf-distributed apps by Zipf-distributed users.
+
+    A share of the purchases, given by the failure ratio, is of missing items.
+
+    Args:
+        workload: The workload parameters.
+        count: The number of purchases.
+
+    Returns:
+        The app, item and user of each purchase.
+    """
+    rng = random.Random(workload.seed)  # nosec B311
+    apps = rng.choices(
+        range(workload.apps),
+        cum_weights=zipf_weights(workload.apps, workload.zipf_exponent),
+        k=count,
+    )
+    users = rng.choices(
+        range(workload.users),
+        cum_weights=zipf_weights(workload.users, workload.zipf_exponent),
+        k=count,
+    )
+    result = []
+    for app, user in zip(apps, users):
+        if rng.random() < workload.failure_ratio:
+            item = MISSING_ITEM
+        else:
+            item = f"Item#{rng.randrange(workload.items_per_app)}"
+        result.append((f"App#{app}", item, f"User#{user}"))
+    return result
+
+
+def fund_hot_accounts(accounts: AccountsController) -> AccountsController:
+    """Gives the few accounts that contend for locks balances no transfer exhausts.
+
+    Args:
+        accounts: The accounts controller.
+
+    Returns:
+        The same accounts controller.
+    """
+    for account in range(HOT_ACCOUNTS):
+        accounts.deposit(1e9, f"Hot#{account}")
+    return accounts
+
+
+def hot_transfers(workload: Workload, count: int) -> List[Tuple[str, float, str]]:
+    """Generates transfers between random pairs of the hot accounts.
+
+    Args:
+        workload: The workload parameters.
+        count: The number of transfers.
+
+    Returns:
+        The issuer, amount and recipient of each transfer.
+    """
+    rng = random.Random(workload.seed)  # nosec B311
+    return [
+        (
+            f"Hot#{rng.randrange(HOT_ACCOUNTS)}",
+            1.0,
+            f"Hot#{rng.randrange(HOT_ACCOUNTS)}",
+        )
+        for _ in range(count)
+    ]
+
+
+def tier_limits(workload: Workload, count: int) -> List[Tuple[int, float]]:
+    """Generates bonus tier lookups, spanning all tiers.
+
+    Args:
+        workload: The workload parameters.
+        count: The number of lookups.
+
+    Returns:
+        The limit, as a number of purchases, and the default bonus of each lookup.
+    """
+    rng = random.Random(workload.seed)  # nosec B311
+    return [(rng.randrange(2**workload.bonus_tiers), 0.0) for _ in range(count)]
@@ -1,7 +1,14 @@
 """Tests the interface for an accounts database."""
+import threading
+from pathlib import Path
+from typing import Type
+
 import pytest
 
+import appstore.accounts
 from appstore.accounts import AccountsController, ForbiddenDebit
+from appstore.ledger import CompactAccountsController
+from appstore.wal import WriteAheadLog
 
 
 def test_accounts_get_balance() -> None:
@@ -51,3 +58,193 @@ def test_accounts_db_transaction() -> None:
     # because the a transference in the transaction failed.
     assert accounts.get_balance("A1") == 10
     assert accounts.get_balance("A2") == 1
+
+
+def test_accounts_concurrent_transferences() -> None:
+    """Tests that concurrent transferences don't lose or create money."""
+    accounts = AccountsController()
+    holders = ["A1", "A2", "A3"]
+    for holder in holders:
+        accounts.deposit(100, holder)
+
+    def transfer(issuer: str, recepient: str) -> None:
+        for _ in range(1000):
+            accounts.transfer(issuer, 1, recepient)
+            accounts.transfer(recepient, 1, issuer)
+
+    threads = [
+        threading.Thread(target=transfer, args=(issuer, recepient))
+        for issuer, recepient in [("A1", "A2"), ("A2", "A3"), ("A3", "A1")]
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [accounts.get_balance(holder) for holder in holders] == [100, 100, 100]
+
+
+def test_accounts_striped_locks() -> None:
+    """Tests that accounts sharing locks can be transferred between, concurrently."""
+    accounts = AccountsController()
+    holders = [f"A{i}" for i in range(2 * appstore.accounts.LOCK_STRIPES)]
+    accounts.deposit_many((10, holder) for holder in holders)
+
+    def transfer(offset: int) -> None:
+        for index, holder in enumerate(holders):
+            accounts.transfer(holder, 1, holders[(index + offset) % len(holders)])
+
+    threads = [threading.Thread(target=transfer, args=(i,)) for i in range(1, 5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [accounts.get_balance(holder) for holder in holders] == [10] * len(holders)
+    lockers = accounts._lockers  # pylint: disable=protected-access
+    assert len(lockers) == appstore.accounts.LOCK_STRIPES
+
+
+def test_accounts_rollback_spent_credit() -> None:
+    """Tests rolling back a credit that another thread spent meanwhile."""
+    accounts = AccountsController()
+    accounts.deposit(10, "A1")
+    with pytest.raises(ForbiddenDebit):
+        with accounts.transaction():
+            accounts.transfer("A1", 10, "A2")
+            spend = threading.Thread(target=accounts.transfer, args=("A2", 10, "A3"))
+            spend.start()
+            spend.join()
+            accounts.transfer("A1", 10, "A2")
+
+    assert [accounts.get_balance(holder) for holder in ["A1", "A2", "A3"]] == [
+        10,
+        -10,
+        10,
+    ]
+
+
+def test_accounts_nested_transactions() -> None:
+    """Tests that a failing transaction rolls back the nested ones."""
+    accounts = AccountsController()
+    accounts.deposit(10, "A1")
+    with pytest.raises(ForbiddenDebit):
+        with accounts.transaction():
+            with accounts.transaction():
+                accounts.transfer("A1", 5, "A2")
+            accounts.transfer("A1", 20, "A2")
+
+    assert accounts.get_balance("A1") == 10
+    assert accounts.get_balance("A2") == 0
+
+
+def test_accounts_concurrent_transactions() -> None:
+    """Tests that rolling back a transaction doesn't affect concurrent ones."""
+    accounts = AccountsController()
+    accounts.deposit(10, "A1")
+    accounts.deposit(10, "A2")
+    transferred = threading.Event()
+    reverted = threading.Event()
+
+    def transfer() -> None:
+        with accounts.transaction():
+            accounts.transfer("A1", 5, "A3")
+            transferred.set()
+            reverted.wait()
+
+    thread = threading.Thread(target=transfer)
+    thread.start()
+    transferred.wait()
+    with pytest.raises(ForbiddenDebit):
+        with accounts.transaction():
+            accounts.transfer("A2", 5, "A3")
+            accounts.transfer("A2", 20, "A3")
+    reverted.set()
+    thread.join()
+
+    assert accounts.get_balance("A1") == 5
+    assert accounts.get_balance("A2") == 10
+    assert accounts.get_balance("A3") == 5
+
+
+def test_accounts_deposit_many(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    """Tests making deposits in bulk, logging a record per chunk.
+
+    Args:
+        monkeypatch: Pytest patch fixture.
+        tmp_path: Pytest fixture with a temporary directory.
+    """
+    monkeypatch.setattr(appstore.accounts, "DEPOSITS_CHUNK_SIZE", 2)
+    with WriteAheadLog(tmp_path / "accounts.log") as log:
+        accounts = AccountsController(log)
+        accounts.deposit_many([(1.0, "A1"), (2.0, "A2"), (3.0, "A1")])
+        assert accounts.get_balance("A1") == 4
+        assert len(list(log.read())) == 2
+
+        with pytest.raises(ValueError):
+            accounts.deposit_many([(1.0, "A1"), (1.0, "A2"), (0.0, "A2")])
+        assert accounts.get_balance("A1") == 5
+        assert accounts.get_balance("A2") == 3
+
+    with pytest.raises(RuntimeError):
+        with accounts.transaction():
+            accounts.deposit_many([(1.0, "A3")])
+            raise RuntimeError()
+    assert accounts.get_balance("A3") == 0
+
+
+@pytest.mark.parametrize("controller", [AccountsController, CompactAccountsController])
+def test_accounts_deferred_transactions(
+    controller: Type[AccountsController], tmp_path: Path
+) -> None:
+    """Tests transactions that apply their net changes on commit.
+
+    Args:
+        controller: The accounts controller class.
+        tmp_path: Pytest fixture with a temporary directory.
+    """
+    with WriteAheadLog(tmp_path / "accounts.log") as log:
+        accounts = controller(log, deferred=True)
+        accounts.deposit(10.0, "A1")
+        with accounts.transaction():
+            accounts.transfer("A1", 4.0, "A2")
+            accounts.transfer("A2", 4.0, "A3")
+            assert accounts.get_balance("A1") == 10
+            with pytest.raises(ForbiddenDebit):
+                with accounts.transaction():
+                    accounts.transfer("A1", 5.0, "A2")
+                    accounts.transfer("A1", 5.0, "A2")
+            accounts.transfer("A1", 6.0, "A3")
+        assert [accounts.get_balance(holder) for holder in ["A1", "A2", "A3"]] == [
+            0,
+            0,
+            10,
+        ]
+        assert list(log.read())[-1] == [
+            (-4.0, "A1"),
+            (4.0, "A2"),
+            (-4.0, "A2"),
+            (4.0, "A3"),
+            (-6.0, "A1"),
+            (6.0, "A3"),
+        ]
+
+        with accounts.transaction():
+            pass
+        with pytest.raises(ForbiddenDebit):
+            with accounts.transaction():
+                accounts.transfer("A3", 8.0, "A1")
+                accounts.transfer("A3", 8.0, "A2")
+        with pytest.raises(ForbiddenDebit):
+            with accounts.transaction():
+                accounts.transfer("A3", 8.0, "A1")
+                concurrent = threading.Thread(
+                    target=accounts.transfer, args=("A3", 5.0, "A2")
+                )
+                concurrent.start()
+                concurrent.join()
+        assert [accounts.get_balance(holder) for holder in ["A1", "A2", "A3"]] == [
+            0,
+            5,
+            5,
+        ]
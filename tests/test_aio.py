@@ -0,0 +1,122 @@
+"""Test app store's asynchronous purchase manager."""
+import asyncio
+from typing import Dict, Optional
+
+import pytest
+
+from appstore.accounts import AccountsController, ForbiddenDebit
+from appstore.aio import (
+    AsyncAccountsAdapter,
+    AsyncAppsAdapter,
+    AsyncAppStore,
+    AsyncUsersAdapter,
+)
+from appstore.apps import InMemoryAppsDB
+from appstore.appstore import Sale
+from appstore.users import InMemoryUsersDB
+
+STORE_ID = "AptoideStore#1"
+USER1 = "User#123"
+APP1 = "TrivialDrive"
+APP1_ITEM1 = "Oil"
+APP1_ITEM1_PRICE = 1.20
+DEV1 = "TrivialDriveDeveloper#2"
+INITIAL_BALANCES = 10.0
+
+
+class _SlowUsersDB(AsyncUsersAdapter):
+    """Users' database that counts how many queries are in flight."""
+
+    def __init__(self, usersdb: InMemoryUsersDB) -> None:
+        super().__init__(usersdb)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_purchases(self, user_id: str) -> int:
+        self.in_flight += 1
+        self.max_in_flight = max(self.in_flight, self.max_in_flight)
+        await asyncio.sleep(0)
+        self.in_flight -= 1
+        return await super().get_purchases(user_id)
+
+
+def _create_store(
+    accounts: AccountsController,
+    usersdb: Optional[AsyncUsersAdapter] = None,
+    bonus_after_purchases: Optional[Dict[int, float]] = None,
+) -> AsyncAppStore:
+    appsdb = InMemoryAppsDB()
+    appsdb.add_app(app_id=APP1, developer_id=DEV1, items={APP1_ITEM1: APP1_ITEM1_PRICE})
+    if usersdb is None:
+        in_memory_usersdb = InMemoryUsersDB()
+        in_memory_usersdb.add_user(USER1)
+        usersdb = AsyncUsersAdapter(in_memory_usersdb)
+    return AsyncAppStore(
+        appstore_id=STORE_ID,
+        commission=0.25,
+        bonus_after_purchases=bonus_after_purchases or {},
+        accounts_controller=AsyncAccountsAdapter(accounts),
+        appsdb=AsyncAppsAdapter(appsdb),
+        usersdb=usersdb,
+    )
+
+
+def _create_accounts(initial_balance: float = INITIAL_BALANCES) -> AccountsController:
+    accounts = AccountsController()
+    for holder_id in [STORE_ID, USER1, DEV1]:
+        accounts.deposit(initial_balance, holder_id)
+    return accounts
+
+
+def test_async_appstore_sale() -> None:
+    """Ensure that the asynchronous appstore sells like the synchronous one."""
+    accounts = _create_accounts()
+    store = _create_store(accounts, bonus_after_purchases={1: 0.05})
+
+    async def sell_twice() -> Sale:
+        await store.sell(APP1, APP1_ITEM1, USER1)
+        return await store.sell(APP1, APP1_ITEM1, USER1)
+
+    sale = asyncio.run(sell_twice())
+
+    reward = 0.05 * APP1_ITEM1_PRICE
+    user_balance = INITIAL_BALANCES - APP1_ITEM1_PRICE - APP1_ITEM1_PRICE + reward
+    assert sale == Sale(
+        identifier=2,
+        user_debit=APP1_ITEM1_PRICE,
+        develper_id=DEV1,
+        developer_credit=0.75 * APP1_ITEM1_PRICE,
+        store_credit=0.25 * APP1_ITEM1_PRICE,
+        reward=reward,
+    )
+    assert (
+        asyncio.run(AsyncAccountsAdapter(accounts).get_balance(USER1)) == user_balance
+    )
+
+
+def test_async_appstore_concurrent_lookups() -> None:
+    """Ensure that the asynchronous appstore overlaps its lookups."""
+    usersdb = InMemoryUsersDB()
+    usersdb.add_user(USER1)
+    slow_usersdb = _SlowUsersDB(usersdb)
+    store = _create_store(_create_accounts(), usersdb=slow_usersdb)
+
+    async def sell_concurrently() -> None:
+        await asyncio.gather(*(store.sell(APP1, APP1_ITEM1, USER1) for _ in range(3)))
+
+    asyncio.run(sell_concurrently())
+
+    assert slow_usersdb.max_in_flight == 3
+    assert usersdb.get_purchases(USER1) == 3
+
+
+def test_async_appstore_rollback() -> None:
+    """Ensure that the asynchronous appstore rolls back failed sales."""
+    accounts = _create_accounts(initial_balance=1)
+    store = _create_store(accounts)
+
+    with pytest.raises(ForbiddenDebit):
+        asyncio.run(store.sell(APP1, APP1_ITEM1, USER1))
+
+    assert accounts.get_balance(USER1) == 1
+    assert accounts.get_balance(STORE_ID) == 1
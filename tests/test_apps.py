@@ -1,5 +1,6 @@
 """Tests the app's database interface."""
 from appstore.apps import InMemoryAppsDB
+from appstore.appstore import Listing
 
 
 def test_in_memory_apps_db() -> None:
@@ -13,3 +14,11 @@ def test_in_memory_apps_db() -> None:
     )
     assert appsdb.get_developer_id(app_id="TrivialDrive") == "TrivialDriveDeveloper#2"
     assert appsdb.get_item_price(app_id="TrivialDrive", item="Oil") == 1.0
+    assert appsdb.get_listing(app_id="TrivialDrive", item="Antifreeze") == Listing(
+        price=1.20, developer_id="TrivialDriveDeveloper#2"
+    )
+
+    appsdb.add_app("TrivialDrive", developer_id="Other", items={"Map": 2.0})
+    assert appsdb.get_developer_id("TrivialDrive") == "Other"
+    assert appsdb.get_listing("TrivialDrive", "Antifreeze") == Listing(1.20, "Other")
+    assert appsdb.get_listing("TrivialDrive", "Map") == Listing(2.0, "Other")
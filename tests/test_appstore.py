@@ -1,11 +1,13 @@
 """Test app store's purchase manager."""
-from typing import Dict, Optional, Tuple
+import threading
+from typing import Dict, Iterator, Optional, Tuple, Union
 
 import pytest
 
 import appstore.accounts
 from appstore.apps import InMemoryAppsDB
 from appstore.appstore import AccountsController, AppStore, Sale
+from appstore.resp import LocalRESPServer, RESPUsersDB
 from appstore.users import InMemoryUsersDB
 
 STORE_ID = "AptoideStore#1"
@@ -44,6 +46,7 @@ def _create_store(
     commission: float = STORE_SHARE,
     bonus_after_purchases: Optional[Dict[int, float]] = None,
     accounts: Optional[AccountsController] = None,
+    usersdb: Union[InMemoryUsersDB, RESPUsersDB, None] = None,
 ) -> AppStore:
     if bonus_after_purchases is None:
         bonus_after_purchases = {}
@@ -59,7 +62,8 @@ def _create_store(
         },
     )
     appsdb.add_app(app_id=APP2, developer_id=DEV2, items={APP2_ITEM1: APP2_ITEM1_PRICE})
-    usersdb = InMemoryUsersDB()
+    if usersdb is None:
+        usersdb = InMemoryUsersDB()
     usersdb.add_user(USER1)
     usersdb.add_user(USER2)
     return AppStore(
@@ -301,3 +305,227 @@ def test_appstore_sell_without_enough_balance_for_reward() -> None:
     sale = store.sell(APP1, APP1_ITEM2, USER1)
     sale = store.sell(APP1, APP1_ITEM2, USER1)
     assert sale.reward == 0
+
+
+@pytest.fixture(name="usersdb", params=["memory", "resp"])
+def fixture_usersdb(
+    request: pytest.FixtureRequest,
+) -> Iterator[Union[InMemoryUsersDB, RESPUsersDB]]:
+    """Creates an empty users' database, either in memory or in a RESP server.
+
+    The RESP users' database counts batches of purchases at once.
+
+    Args:
+        request: Pytest request, with the kind of database.
+
+    Yields:
+        The users' database.
+    """
+    if request.param == "memory":
+        yield InMemoryUsersDB()
+        return
+    with LocalRESPServer() as server:
+        usersdb = RESPUsersDB(*server.address)
+        yield usersdb
+        usersdb.close()
+
+
+def test_appstore_sell_many(usersdb: Union[InMemoryUsersDB, RESPUsersDB]) -> None:
+    """Ensure that a batch of sales matches the same sales made one by one.
+
+    Args:
+        usersdb: Pytest fixture with an empty users' database.
+    """
+    purchases = [
+        (APP1, APP1_ITEM1, USER1),
+        (APP1, APP1_ITEM2, USER1),
+        (APP2, APP2_ITEM1, USER2),
+        (APP1, APP1_ITEM1, USER1),
+    ]
+    bonus_after_purchases = {1: 0.05, 2: 0.10}
+    accounts = _create_accounts()
+    store = _create_store(
+        accounts=accounts,
+        bonus_after_purchases=bonus_after_purchases,
+        usersdb=usersdb,
+    )
+    expected_accounts = _create_accounts()
+    expected_store = _create_store(
+        accounts=expected_accounts, bonus_after_purchases=bonus_after_purchases
+    )
+
+    sales = store.sell_many(purchases)
+
+    assert sales == [expected_store.sell(*purchase) for purchase in purchases]
+    for holder_id in [STORE_ID, USER1, USER2, DEV1, DEV2]:
+        assert accounts.get_balance(holder_id) == expected_accounts.get_balance(
+            holder_id
+        )
+
+
+def test_appstore_sell_many_failures(
+    usersdb: Union[InMemoryUsersDB, RESPUsersDB]
+) -> None:
+    """Ensure that failing sales in a batch don't abort the other sales.
+
+    Args:
+        usersdb: Pytest fixture with an empty users' database.
+    """
+    accounts = _create_accounts(
+        balances={USER1: INITIAL_BALANCES, USER2: 1, STORE_ID: INITIAL_BALANCES}
+    )
+    store = _create_store(
+        accounts=accounts, bonus_after_purchases={1: 0.05}, usersdb=usersdb
+    )
+
+    results = store.sell_many(
+        [
+            ("WrongApp", APP1_ITEM1, USER1),
+            (APP1, APP1_ITEM1, USER2),
+            (APP1, APP1_ITEM2, USER1),
+            (APP1, APP1_ITEM2, "WrongUser"),
+            (APP1, APP1_ITEM2, USER1),
+            (APP1, APP1_ITEM2, USER2),
+        ]
+    )
+
+    assert isinstance(results[0], KeyError)
+    assert isinstance(results[1], appstore.accounts.ForbiddenDebit)
+    assert isinstance(results[2], Sale)
+    assert isinstance(results[3], KeyError)
+    assert isinstance(results[4], Sale)
+    assert (results[2].identifier, results[4].identifier) == (1, 2)
+    # Only the successful sales count as purchases.
+    assert results[2].reward == 0
+    assert results[4].reward == 0.05 * APP1_ITEM2_PRICE
+    # The user's failed sale doesn't count for the bonus of their next one.
+    assert isinstance(results[5], Sale)
+    assert results[5].reward == 0
+    assert accounts.get_balance(USER2) == 0
+    assert usersdb.get_purchases(USER2) == 1
+
+
+class _LookupsAppsDB:
+    """Apps' database without listings."""
+
+    def __init__(self) -> None:
+        self.lookups = 0
+
+    def get_developer_id(self, app_id: str) -> str:
+        """Get the developer of a given app.
+
+        Args:
+            app_id: The app identifier.
+
+        Returns:
+            The app's developer.
+        """
+        self.lookups += 1
+        return f"{app_id}Developer"
+
+    def get_item_price(self, app_id: str, item: str) -> float:
+        """Get an app items' price.
+
+        Args:
+            app_id: The app identifier.
+            item: The app item.
+
+        Returns:
+            The item's price.
+        """
+        self.lookups += 1
+        return 1.0 if (app_id, item) == (APP1, APP1_ITEM1) else 2.0
+
+
+def test_appstore_sell_without_listings() -> None:
+    """Ensure that the app store sells with apps' databases without listings."""
+    appsdb = _LookupsAppsDB()
+    usersdb = InMemoryUsersDB()
+    usersdb.add_user(USER1)
+    store = AppStore(
+        appstore_id=STORE_ID,
+        commission=STORE_SHARE,
+        bonus_after_purchases={},
+        accounts_controller=_create_accounts(),
+        appsdb=appsdb,
+        usersdb=usersdb,
+    )
+
+    sale = store.sell(APP1, APP1_ITEM1, USER1)
+    assert (sale.user_debit, sale.develper_id) == (1.0, f"{APP1}Developer")
+    assert appsdb.lookups == 2
+
+    store.sell_many([(APP2, APP2_ITEM1, USER1)] * 3)
+    assert appsdb.lookups == 4
+
+
+class _UsersDB:
+    """Users' database without atomic purchases' records."""
+
+    def __init__(self) -> None:
+        self.purchases: Dict[str, int] = {USER1: 0}
+
+    def get_purchases(self, user_id: str) -> int:
+        """Get the number of purchases the given user made.
+
+        Args:
+            user_id: User identifier.
+
+        Returns:
+            The number of purchases.
+        """
+        return self.purchases[user_id]
+
+    def increment_purchases(self, user_id: str) -> int:
+        """Count a user's purchase.
+
+        Args:
+            user_id: User identifier.
+
+        Returns:
+            The number of purchases after the increment.
+        """
+        self.purchases[user_id] += 1
+        return self.purchases[user_id]
+
+
+def test_appstore_sell_without_purchases_records() -> None:
+    """Ensure that the app store sells with users' databases without records."""
+    usersdb = _UsersDB()
+    accounts = _create_accounts()
+    store = AppStore(
+        appstore_id=STORE_ID,
+        commission=STORE_SHARE,
+        bonus_after_purchases={1: 0.05},
+        accounts_controller=accounts,
+        appsdb=_LookupsAppsDB(),
+        usersdb=usersdb,
+    )
+
+    assert store.sell(APP1, APP1_ITEM1, USER1).reward == 0
+    assert store.sell(APP1, APP1_ITEM1, USER1).reward == 0.05
+    assert usersdb.purchases == {USER1: 2}
+
+
+def test_appstore_concurrent_sales_bonuses() -> None:
+    """Ensure that concurrent sales to a user get the bonus of different tiers."""
+    accounts = _create_accounts(initial_balances=1000.0)
+    bonus_after_purchases = {purchases: purchases / 100 for purchases in range(40)}
+    store = _create_store(
+        accounts=accounts, bonus_after_purchases=bonus_after_purchases
+    )
+    sales = []
+
+    def sell() -> None:
+        for _ in range(10):
+            sales.append(store.sell(APP1, APP1_ITEM2, USER1))
+
+    threads = [threading.Thread(target=sell) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(sale.reward for sale in sales) == [
+        purchases / 100 * APP1_ITEM2_PRICE for purchases in range(40)
+    ]
@@ -0,0 +1,29 @@
+"""Tests the benchmarks on a tiny workload."""
+import json
+from pathlib import Path
+
+from benchmarks.__main__ import compare, main
+
+
+def test_benchmarks(tmp_path: Path) -> None:
+    """Tests running the benchmarks and comparing them with a baseline."""
+    baseline = tmp_path / "baseline.json"
+    arguments = ["--operations", "200", "--apps", "20", "--users", "50"]
+    assert main(arguments + ["--repeat", "1", "--output", str(baseline)]) == 0
+
+    report = json.loads(baseline.read_text())
+    assert report["workload"]["apps"] == 20
+    assert report["results"]["sell/threads=4"]["operations"] == 200
+    assert report["results"]["server/clients=4"]["operations"] == 200
+    assert report["results"]["resp/sell/threads=4"]["operations"] == 200
+    assert report["results"]["resp/sell_many/threads=4"]["operations"] == 4
+    assert main(arguments + ["--compare", str(baseline), "--tolerance", "100"]) == 0
+
+
+def test_compare() -> None:
+    """Tests detecting regressions."""
+    baseline = {"sell": {"ops_per_second": 100.0, "p99_us": 10.0}}
+    assert not compare(baseline, baseline, tolerance=0.1)
+    assert compare(
+        baseline, {"sell": {"ops_per_second": 50.0, "p99_us": 10.0}}, tolerance=0.1
+    ) == ["sell"]
@@ -0,0 +1,155 @@
+"""Tests the apps' database cache."""
+from typing import Callable, List, Tuple
+
+import pytest
+
+from appstore.apps import InMemoryAppsDB
+from appstore.appstore import Listing
+from appstore.caching import CachedAppsDB, CacheStats
+
+
+class _Clock:
+    """A clock that only moves when told."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _CountingAppsDB(InMemoryAppsDB):
+    """Apps' database that records its lookups."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.lookups: List[str] = []
+
+    def get_developer_id(self, app_id: str) -> str:
+        self.lookups.append(app_id)
+        return super().get_developer_id(app_id)
+
+    def get_item_price(self, app_id: str, item: str) -> float:
+        self.lookups.append(item)
+        return super().get_item_price(app_id, item)
+
+
+def _create_appsdb(maxsize: int = 10) -> Tuple[_CountingAppsDB, CachedAppsDB, _Clock]:
+    appsdb = _CountingAppsDB()
+    clock = _Clock()
+    cache = CachedAppsDB(appsdb, maxsize=maxsize, ttl=10, clock=clock)
+    cache.add_app("App1", developer_id="Dev1", items={"Item1": 1.0, "Item2": 2.0})
+    cache.add_app("App2", developer_id="Dev2", items={"Item1": 3.0})
+    return appsdb, cache, clock
+
+
+def test_cached_apps_db_hits() -> None:
+    """Tests that repeated lookups are served from the cache until they expire."""
+    appsdb, cache, clock = _create_appsdb()
+
+    for _ in range(3):
+        assert cache.get_developer_id("App1") == "Dev1"
+        assert cache.get_item_price("App1", "Item1") == 1.0
+    assert appsdb.lookups == ["App1", "Item1"]
+    assert cache.stats == CacheStats(hits=4, misses=2)
+
+    clock.now = 10
+    assert cache.get_item_price("App1", "Item1") == 1.0
+    assert appsdb.lookups == ["App1", "Item1", "Item1"]
+
+
+def test_cached_apps_db_misses() -> None:
+    """Tests that unknown apps and items are cached."""
+    appsdb, cache, _ = _create_appsdb()
+
+    for _ in range(2):
+        with pytest.raises(KeyError) as error:
+            cache.get_item_price("App1", "WrongItem")
+        assert error.value.args == (("App1", "WrongItem"),)
+        with pytest.raises(KeyError):
+            cache.get_developer_id("WrongApp")
+    assert appsdb.lookups == ["WrongItem", "WrongApp"]
+
+    cache.add_app("WrongApp", developer_id="Dev3", items={})
+    assert cache.get_developer_id("WrongApp") == "Dev3"
+
+
+def test_cached_apps_db_eviction() -> None:
+    """Tests evicting the least recently used lookups and invalidating lookups."""
+    appsdb, cache, _ = _create_appsdb(maxsize=2)
+
+    cache.get_item_price("App1", "Item1")
+    cache.get_item_price("App1", "Item2")
+    cache.get_item_price("App1", "Item1")
+    cache.get_item_price("App2", "Item1")
+    assert len(cache) == 2
+    cache.get_item_price("App1", "Item1")
+    assert appsdb.lookups == ["Item1", "Item2", "Item1"]
+
+    cache.invalidate("App2")
+    assert len(cache) == 1
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+class _LookupsAppsDB:
+    """Apps' database without listings."""
+
+    def __init__(self, appsdb: InMemoryAppsDB) -> None:
+        self.get_developer_id = appsdb.get_developer_id
+        self.get_item_price = appsdb.get_item_price
+
+
+def test_cached_apps_db_listings() -> None:
+    """Tests caching listings of databases with and without listings."""
+    appsdb, cache, _ = _create_appsdb()
+    for _ in range(2):
+        assert cache.get_listing("App2", "Item1") == Listing(3.0, "Dev2")
+    assert not appsdb.lookups
+
+    cache = CachedAppsDB(_LookupsAppsDB(appsdb))
+    assert cache.get_listing("App2", "Item1") == Listing(3.0, "Dev2")
+    assert appsdb.lookups == ["Item1", "App2"]
+
+
+def test_cached_apps_db_add_apps() -> None:
+    """Tests that adding apps in bulk discards the cached lookups."""
+    _, cache, _ = _create_appsdb()
+    assert cache.get_item_price("App1", "Item1") == 1.0
+
+    cache.add_apps([("App1", "Dev1", {"Item1": 5.0}), ("App3", "Dev3", {})])
+    assert cache.get_item_price("App1", "Item1") == 5.0
+    assert cache.get_developer_id("App3") == "Dev3"
+
+
+class _RacingAppsDB(InMemoryAppsDB):
+    """Apps' database where apps change while prices are looked up."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.meanwhile: Callable[[], None] = lambda: None
+
+    def get_item_price(self, app_id: str, item: str) -> float:
+        price = super().get_item_price(app_id, item)
+        self.meanwhile()
+        return price
+
+
+def test_cached_apps_db_invalidation_during_lookup() -> None:
+    """Tests that lookups loaded while their app is invalidated aren't cached."""
+    appsdb = _RacingAppsDB()
+    cache = CachedAppsDB(appsdb)
+    cache.add_app("App1", developer_id="Dev1", items={"Item1": 1.0})
+    cache.add_app("App2", developer_id="Dev2", items={"Item1": 3.0})
+
+    appsdb.meanwhile = lambda: cache.add_app("App1", "Dev1", {"Item1": 5.0})
+    assert cache.get_item_price("App1", "Item1") == 1.0
+    appsdb.meanwhile = lambda: None
+    assert cache.get_item_price("App1", "Item1") == 5.0
+
+    appsdb.meanwhile = cache.invalidate
+    assert cache.get_item_price("App2", "Item1") == 3.0
+    assert len(cache) == 0
+    appsdb.meanwhile = lambda: cache.invalidate("App1")
+    assert cache.get_item_price("App2", "Item1") == 3.0
+    assert len(cache) == 1
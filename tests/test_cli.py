@@ -1,12 +1,15 @@
 """Test the command line interface for app store's purchases manager."""
+import inspect
 import io
+import json
 import os
 from pathlib import Path
-from typing import Iterable
+from typing import Any, Coroutine, Iterable, List
 
 import pytest
 
-from appstore.cli import run
+import appstore.cli
+from appstore.cli import batch, main, run
 
 
 def _get_input_files() -> Iterable[Path]:
@@ -106,3 +109,142 @@ def test_invalid_commands(
     run()
     captured = capsys.readouterr()
     assert "Supported commands:" in captured.out
+
+
+@pytest.mark.parametrize("input_file", argvalues=_get_input_files(), ids=_test_id)
+def test_batch(input_file: Path) -> None:
+    """Tests that batch mode writes the REPL's output, without the prompts.
+
+    Args:
+        input_file: Text file with the commands.
+    """
+    output = io.StringIO()
+    with input_file.open() as commands:
+        batch(commands, output)
+    expected = _output_file(input_file).read_text().replace(">", "")
+    assert output.getvalue().strip() == expected.strip()
+
+
+def test_batch_json(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Tests writing a JSON object per command, in chunks.
+
+    Args:
+        monkeypatch: Pytest patch fixture.
+    """
+    monkeypatch.setattr(appstore.cli, "BATCH_BUFFER_LINES", 2)
+    commands = ["sell TrivialDrive Oil User#123", ""]
+    commands += ["sell TrivialDrive WrongItem User#123", "help"]
+    commands += ["sell DiamondLegendDeveloper 5x_Diamonds User#123"] * 5
+    commands += ["exit", "sell TrivialDrive Oil User#123"]
+    output = io.StringIO()
+    batch(commands, output, as_json=True)
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+
+    assert len(records) == 8
+    assert records[0] == {
+        "sale": 1,
+        "app": "TrivialDrive",
+        "item": "Oil",
+        "user": "User#123",
+        "amount": 1,
+        "developer": "TrivialDriveDeveloper#2",
+        "developer_credit": 0.75,
+        "store_credit": 0.25,
+        "reward": 0,
+        "balances": {
+            "User#123": 9.0,
+            "TrivialDriveDeveloper#2": 10.75,
+            "AptoideStore#1": 10.25,
+        },
+    }
+    assert records[1] == {"error": "not_found", "id": "WrongItem"}
+    assert records[2] == {"error": "unknown_command", "command": "help"}
+    assert records[-1]["error"] == "forbidden_debit"
+    assert records[-1]["holder"] == "User#123"
+
+
+def test_main_batch(
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+    tmp_path: Path,
+) -> None:
+    """Tests running batch mode from the command line, with a file or stdin.
+
+    Args:
+        monkeypatch: Pytest patch fixture.
+        capsys: Pytest fixture for capturing the stdout and stderr.
+        tmp_path: Pytest fixture with a temporary directory.
+    """
+    script = tmp_path / "script.txt"
+    script.write_text("sell TrivialDrive Oil User#123\n")
+    main(["--batch", str(script), "--json"])
+    assert json.loads(capsys.readouterr().out)["sale"] == 1
+
+    monkeypatch.setattr("sys.stdin", io.StringIO("wrong command\n"))
+    main(["--batch", "-"])
+    assert "Supported commands:" in capsys.readouterr().out
+
+
+def test_main_interactive(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    """Tests that the command line runs the REPL without batch mode.
+
+    Args:
+        monkeypatch: Pytest patch fixture.
+        capsys: Pytest fixture for capturing the stdout and stderr.
+    """
+    monkeypatch.setattr("sys.stdin", io.StringIO("exit"))
+    main([])
+    assert capsys.readouterr().out == ">"
+
+    with pytest.raises(SystemExit):
+        main(["--json"])
+
+
+def test_main_serve(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Tests that the command line serves the store over TCP.
+
+    Args:
+        monkeypatch: Pytest patch fixture.
+    """
+    served: List[Coroutine[Any, Any, None]] = []
+    monkeypatch.setattr("appstore.cli.asyncio.run", served.append)
+    main(["--serve", "8765"])
+    assert len(served) == 1
+    assert inspect.getcoroutinelocals(served[0])["port"] == 8765
+    served[0].close()
+
+
+def test_main_load_files(capsys: pytest.CaptureFixture[str], tmp_path: Path) -> None:
+    """Tests loading the apps, users and balances from files, in batch mode.
+
+    Args:
+        capsys: Pytest fixture for capturing the stdout and stderr.
+        tmp_path: Pytest fixture with a temporary directory.
+    """
+    (tmp_path / "apps.csv").write_text("app_id,developer_id,item,price\nA,D,I,2\n")
+    (tmp_path / "users.csv").write_text("user_id\nU\n")
+    (tmp_path / "balances.csv").write_text("holder_id,amount\nU,5\nAptoideStore#1,1\n")
+    script = tmp_path / "script.txt"
+    script.write_text("sell A I U\n")
+    files = ["apps", "users", "balances"]
+    main(
+        ["--batch", str(script), "--json"]
+        + [
+            option
+            for name in files
+            for option in [f"--{name}", str(tmp_path / f"{name}.csv")]
+        ]
+    )
+    record = json.loads(capsys.readouterr().out)
+    assert record["balances"] == {"U": 3.0, "D": 1.5, "AptoideStore#1": 1.5}
+
+    script.write_text("help\n")
+    main(["--batch", str(script), "--apps", str(tmp_path / "apps.csv")])
+    help_text = capsys.readouterr().out
+    assert "sell APP ITEM USER" in help_text
+    assert "TrivialDrive" not in help_text
+
+    with pytest.raises(SystemExit):
+        main(["--users", str(tmp_path / "users.csv")])
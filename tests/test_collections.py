@@ -32,3 +32,41 @@ def test_max_mapping() -> None:
 
     # limit smaller than keys, with default
     assert accessor.get_max(default=1) == 1
+
+
+def test_max_mapping_table() -> None:
+    """Test max mapping data structure with a precomputed table."""
+    mapping = {50: 5, 10: 1, 30: 3, 40: 4, 20: 2}
+    accessor = MaxKeyAccessor(mapping, max_table_size=64)
+    searching_accessor = MaxKeyAccessor(mapping)
+
+    for limit in range(0, 60):
+        assert accessor.get_max(limit, default=0) == searching_accessor.get_max(
+            limit, default=0
+        )
+
+    # Integer keys with other limits, like fractions, search instead.
+    mixed_accessor = MaxKeyAccessor[float, int]({10: 1, 20: 2}, max_table_size=64)
+    assert mixed_accessor.get_max(15.5) == mixed_accessor.get_max_many([15.5])[0] == 1
+
+    with pytest.raises(KeyError):
+        accessor.get_max(limit=5)
+
+
+def test_max_mapping_many() -> None:
+    """Test getting many values from a max mapping data structure at once."""
+    mapping = {50: 5, 10: 1, 30: 3, 40: 4, 20: 2}
+    limits = [31, 5, 60, 10, 40, 10, 19]
+    expected = [3, 0, 5, 1, 4, 1, 1]
+
+    for accessor in [
+        MaxKeyAccessor(mapping),
+        MaxKeyAccessor(mapping, max_table_size=64),
+    ]:
+        assert accessor.get_max_many(limits, default=0) == expected
+        assert not accessor.get_max_many([])
+        with pytest.raises(KeyError):
+            accessor.get_max_many(limits)
+
+    empty_accessor: MaxKeyAccessor[int, int] = MaxKeyAccessor({})
+    assert empty_accessor.get_max_many([1, 2], default=0) == [0, 0]
@@ -0,0 +1,51 @@
+"""Tests the streaming exports of sales."""
+import csv
+from io import BytesIO, StringIO
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+
+from appstore.appstore import Sale
+from appstore.export import FIELDS, read_binary, write_binary, write_csv
+
+
+def _sales(count: int) -> Iterator[Sale]:
+    for identifier in range(1, count + 1):
+        yield Sale(identifier, 1.2, f"Développeur#{identifier % 3}", 0.9, 0.3, 0.06)
+
+
+def test_write_csv() -> None:
+    """Tests exporting sales as CSV."""
+    file = StringIO(newline="")
+    assert write_csv(_sales(5), file, chunk_size=2) == 5
+
+    rows = list(csv.DictReader(StringIO(file.getvalue(), newline="")))
+    assert list(rows[0]) == FIELDS
+    assert [row["identifier"] for row in rows] == ["1", "2", "3", "4", "5"]
+    assert rows[4]["develper_id"] == "Développeur#2"
+    assert float(rows[4]["reward"]) == 0.06
+
+
+def test_binary_export(tmp_path: Path) -> None:
+    """Tests exporting sales in binary format and reading them back."""
+    path = tmp_path / "sales.bin"
+    with path.open("wb") as file:
+        assert write_binary(_sales(5), file, chunk_size=2) == 5
+
+    with path.open("rb") as file:
+        assert list(read_binary(file, chunk_size=2)) == list(_sales(5))
+
+    with pytest.raises(ValueError):
+        write_binary([Sale(1, 1.0, "D" * 65, 1.0, 0.0)], BytesIO())
+
+
+def test_read_binary_given_invalid_exports() -> None:
+    """Tests reading files that aren't complete sales exports."""
+    with pytest.raises(ValueError):
+        list(read_binary(BytesIO(b"NOTSALES")))
+
+    file = BytesIO()
+    write_binary(_sales(1), file)
+    with pytest.raises(ValueError):
+        list(read_binary(BytesIO(file.getvalue()[:-1])))
@@ -0,0 +1,157 @@
+"""Tests the sales' identifiers allocators."""
+import multiprocessing
+import threading
+from pathlib import Path
+from typing import Any, List, Optional
+
+import pytest
+
+from appstore.accounts import AccountsController
+from appstore.apps import InMemoryAppsDB
+from appstore.appstore import AppStore
+from appstore.ids import (
+    BlockIdAllocator,
+    FileIdSource,
+    IdSource,
+    SequentialIdAllocator,
+    SharedIdSource,
+)
+from appstore.users import InMemoryUsersDB
+
+
+def _allocate(
+    source: IdSource,
+    count: int,
+    identifiers: "multiprocessing.Queue[int]",
+    allocator: Optional[BlockIdAllocator] = None,
+) -> None:
+    if allocator is None:
+        allocator = BlockIdAllocator(source, block_size=3)
+    for _ in range(count):
+        identifiers.put(allocator.allocate())
+
+
+def _allocate_in_processes(
+    source: IdSource, context: Any, allocator: Optional[BlockIdAllocator] = None
+) -> List[int]:
+    identifiers: "multiprocessing.Queue[int]" = context.Queue()
+    processes = [
+        context.Process(target=_allocate, args=(source, 9, identifiers, allocator))
+        for _ in range(3)
+    ]
+    for process in processes:
+        process.start()
+    allocated = [identifiers.get(timeout=30) for _ in range(27)]
+    for process in processes:
+        process.join()
+    return allocated
+
+
+def test_sequential_allocator() -> None:
+    """Tests allocating consecutive identifiers from many threads."""
+    allocator = SequentialIdAllocator()
+    identifiers: List[int] = []
+
+    def allocate() -> None:
+        identifiers.extend(allocator.allocate() for _ in range(1000))
+
+    threads = [threading.Thread(target=allocate) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(identifiers) == list(range(1, 4001))
+    assert SequentialIdAllocator(start=10).allocate() == 10
+
+
+def test_block_allocator() -> None:
+    """Tests that threads allocate from their own blocks."""
+    allocator = BlockIdAllocator(SharedIdSource(), block_size=10)
+    identifiers: List[List[int]] = []
+
+    def allocate() -> None:
+        identifiers.append([allocator.allocate() for _ in range(15)])
+
+    threads = [threading.Thread(target=allocate) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    allocated_ids = sum(identifiers, [])
+    assert len(set(allocated_ids)) == 60
+    assert set(allocated_ids) <= set(range(1, 81))
+    for allocated in identifiers:
+        assert allocated[:10] == list(range(allocated[0], allocated[0] + 10))
+    with pytest.raises(ValueError):
+        BlockIdAllocator(SharedIdSource(), block_size=0)
+
+
+def test_file_source(tmp_path: Path) -> None:
+    """Tests leasing blocks from a file, after restarts too.
+
+    Args:
+        tmp_path: Pytest fixture with a temporary directory.
+    """
+    path = tmp_path / "ids"
+    first = BlockIdAllocator(FileIdSource(path), block_size=10)
+    second = BlockIdAllocator(FileIdSource(path), block_size=10)
+    assert [first.allocate(), second.allocate(), first.allocate()] == [1, 11, 2]
+
+    restarted = BlockIdAllocator(FileIdSource(path), block_size=10)
+    assert restarted.allocate() == 21
+    assert path.read_text() == "31\n"
+    assert sorted(child.name for child in tmp_path.iterdir()) == ["ids", "ids.lock"]
+    assert FileIdSource(tmp_path / "other", start=100).lease(5) == 100
+
+
+@pytest.mark.parametrize("method", ["spawn", "fork"])
+@pytest.mark.parametrize("shared", ["memory", "file"])
+def test_sources_across_processes(shared: str, method: str, tmp_path: Path) -> None:
+    """Tests that worker processes allocate unique identifiers.
+
+    Forked workers inherit an allocator that already allocated in the parent.
+
+    Args:
+        shared: Where the source keeps the next identifier.
+        method: How the worker processes are started.
+        tmp_path: Pytest fixture with a temporary directory.
+    """
+    context = multiprocessing.get_context(method)
+    source: IdSource = (
+        SharedIdSource(context=context)
+        if shared == "memory"
+        else FileIdSource(tmp_path / "ids")
+    )
+    if method == "spawn":
+        allocated = _allocate_in_processes(source, context)
+        assert sorted(allocated) == list(range(1, 28))
+        return
+
+    allocator = BlockIdAllocator(source, block_size=3)
+    allocated = [allocator.allocate()]
+    allocated += _allocate_in_processes(source, context, allocator)
+    assert sorted(allocated) == [1] + list(range(4, 31))
+
+
+def test_appstore_allocator() -> None:
+    """Tests that the app store identifies its sales with its allocator."""
+    accounts = AccountsController()
+    accounts.deposit(10.0, "User")
+    appsdb = InMemoryAppsDB()
+    appsdb.add_app("App", developer_id="Developer", items={"Item": 1.0})
+    usersdb = InMemoryUsersDB()
+    usersdb.add_user("User")
+    source = SharedIdSource(start=100)
+    source.lease(5)
+    allocator = BlockIdAllocator(source)
+    store = AppStore(
+        "Store", 0.25, {}, accounts, appsdb, usersdb, id_allocator=allocator
+    )
+
+    assert [store.sell("App", "Item", "User").identifier for _ in range(3)] == [
+        105,
+        106,
+        107,
+    ]
@@ -0,0 +1,83 @@
+"""Tests the columnar history of sales."""
+import pytest
+
+from appstore.apps import InMemoryAppsDB
+from appstore.appstore import AppStore, Sale
+from appstore.journal import JournalEntry, SalesJournal
+from appstore.ledger import CompactAccountsController
+from appstore.users import InMemoryUsersDB
+
+
+def test_sales_journal_records_appstore_sales() -> None:
+    """Tests journaling the sales an app store completes."""
+    appsdb = InMemoryAppsDB()
+    appsdb.add_app("App1", developer_id="Dev1", items={"Item": 2.0})
+    appsdb.add_app("App2", developer_id="Dev2", items={"Item": 4.0})
+    usersdb = InMemoryUsersDB()
+    usersdb.add_user("U1")
+    accounts = CompactAccountsController()
+    accounts.deposit(100, "U1")
+    accounts.deposit(100, "Store")
+    journal = SalesJournal(clock=iter(range(10)).__next__)
+    store = AppStore(
+        appstore_id="Store",
+        commission=0.25,
+        bonus_after_purchases={},
+        accounts_controller=accounts,
+        appsdb=appsdb,
+        usersdb=usersdb,
+        recorders=[journal],
+    )
+
+    sale = store.sell("App1", "Item", "U1")
+    results = store.sell_many([("App2", "Item", "U1"), ("App2", "Wrong", "U1")])
+    assert isinstance(results[0], Sale)
+
+    assert list(journal) == [
+        JournalEntry(0.0, "App1", "Item", "U1", sale),
+        JournalEntry(1.0, "App2", "Item", "U1", results[0]),
+    ]
+    assert journal.revenue_by_app() == {"App1": 2.0, "App2": 4.0}
+    assert journal.revenue_by_developer(start=1) == {"Dev2": 3.0}
+
+
+def test_sales_journal_aggregates() -> None:
+    """Tests aggregating sales with filters and time windows."""
+    times = [1.0, 2.0, 2.0, 3.0, 5.0]
+    journal = SalesJournal(clock=iter(times).__next__)
+    for identifier, (app_id, user_id) in enumerate(
+        [("A1", "U1"), ("A2", "U1"), ("A1", "U2"), ("A1", "U1"), ("A2", "U2")]
+    ):
+        sale = Sale(identifier, 4.0, f"D{app_id}", 3.0, 1.0, 0.5)
+        journal.record_sale(sale, app_id, "Item", user_id)
+
+    assert len(journal) == 5
+    assert journal.total("user_debit") == 20
+    assert journal.total("reward", start=2.0, end=5.0) == 1.5
+    assert journal.total("store_credit", app_id="A1", user_id="U1") == 2
+    assert journal.total("store_credit", app_id="A3") == 0
+    assert journal.total_by("user_debit", "user_id", end=3.0) == {"U1": 8, "U2": 4}
+    assert journal.revenue_by_developer(start=2.5) == {"DA1": 3, "DA2": 3}
+
+
+def test_sales_journal_out_of_order_times() -> None:
+    """Tests aggregating sales journaled out of time order."""
+    journal = SalesJournal(clock=iter([3.0, 1.0, 2.0]).__next__)
+    for identifier in range(3):
+        journal.record_sale(Sale(identifier, 1.0, "D", 1.0, 0.0), "A", "I", "U")
+
+    assert journal.total("user_debit", start=1.5, end=2.5) == 1
+    assert journal.total("user_debit", start=1.5) == 2
+    assert journal.total("user_debit", end=2.5) == 2
+
+
+def test_sales_journal_entries() -> None:
+    """Tests materializing journaled sales."""
+    journal = SalesJournal(clock=lambda: 0.0)
+    for identifier in range(3):
+        journal.record_sale(Sale(identifier, 1.0, "D", 1.0, 0.0), "A", "I", "U")
+
+    assert journal[-1].sale.identifier == 2
+    assert [entry.sale.identifier for entry in journal[1:]] == [1, 2]
+    with pytest.raises(IndexError):
+        journal[3]  # pylint: disable=pointless-statement
@@ -0,0 +1,135 @@
+"""Tests the compact accounts controller."""
+import tracemalloc
+from pathlib import Path
+from typing import List, Type
+
+import pytest
+
+from appstore.accounts import AccountsController, ForbiddenDebit
+from appstore.apps import InMemoryAppsDB
+from appstore.appstore import AppStore
+from appstore.ledger import CompactAccountsController
+from appstore.users import InMemoryUsersDB
+from appstore.wal import WriteAheadLog
+
+
+def test_compact_accounts_transference() -> None:
+    """Tests deposits, transferences, and balances."""
+    accounts = CompactAccountsController()
+    assert accounts.get_balance("A1") == 0.0
+    assert len(accounts) == 0
+
+    accounts.deposit(10, "A1")
+    accounts.transfer("A1", 0.1, "A2")
+    accounts.transfer("A1", 0.2, "A2")
+
+    assert accounts.get_balance("A1") == 9.7
+    assert accounts.get_balance("A2") == 0.3
+    assert len(accounts) == 2
+
+
+def test_compact_accounts_forbidden_debit() -> None:
+    """Tests debiting an amount bigger than the balance."""
+    accounts = CompactAccountsController()
+    accounts.deposit(0.3, "A1")
+    with pytest.raises(ForbiddenDebit) as exception:
+        accounts.transfer("A1", 0.31, "A2")
+
+    assert exception.value.balance == 0.3
+    assert accounts.get_balance("A1") == 0.3
+    assert accounts.get_balance("A2") == 0.0
+
+    accounts.transfer("A1", 0.1 + 0.2, "A2")
+    assert accounts.get_balance("A1") == 0.0
+
+
+def test_compact_accounts_transaction() -> None:
+    """Tests that failing transactions are rolled back."""
+    accounts = CompactAccountsController()
+    accounts.deposit(1.2, "A1")
+    with pytest.raises(ForbiddenDebit):
+        with accounts.transaction():
+            accounts.transfer("A1", 0.9, "A2")
+            accounts.transfer("A1", 0.3, "A3")
+            accounts.transfer("A2", 1, "A3")
+
+    assert [accounts.get_balance(holder) for holder in ["A1", "A2", "A3"]] == [
+        1.2,
+        0.0,
+        0.0,
+    ]
+
+
+def test_compact_accounts_appstore() -> None:
+    """Tests selling with the compact accounts controller."""
+    accounts = CompactAccountsController()
+    for holder_id in ["Store", "User", "Dev"]:
+        accounts.deposit(10, holder_id)
+    appsdb = InMemoryAppsDB()
+    appsdb.add_app(app_id="App", developer_id="Dev", items={"Item": 1.2})
+    usersdb = InMemoryUsersDB()
+    usersdb.add_user("User")
+    store = AppStore(
+        appstore_id="Store",
+        commission=0.25,
+        bonus_after_purchases={1: 0.05},
+        accounts_controller=accounts,
+        appsdb=appsdb,
+        usersdb=usersdb,
+    )
+
+    store.sell("App", "Item", "User")
+    store.sell("App", "Item", "User")
+
+    assert accounts.get_balance("User") == 7.66
+    assert accounts.get_balance("Dev") == 11.8
+    assert accounts.get_balance("Store") == 10.54
+
+
+def test_compact_accounts_deferred_replay(tmp_path: Path) -> None:
+    """Tests that deferred transactions' balances are the replayed ones.
+
+    Args:
+        tmp_path: Pytest fixture with a temporary directory.
+    """
+    holders = ["Store", "User", "Dev"]
+    with WriteAheadLog(tmp_path / "accounts.log") as log:
+        accounts = CompactAccountsController(log, deferred=True)
+        accounts.deposit_many((100, holder_id) for holder_id in holders)
+        appsdb = InMemoryAppsDB()
+        appsdb.add_app(app_id="App", developer_id="Dev", items={"Item": 9.98})
+        usersdb = InMemoryUsersDB()
+        usersdb.add_user("User")
+        store = AppStore("Store", 0.3, {1: 0.1}, accounts, appsdb, usersdb)
+        for _ in range(3):
+            store.sell("App", "Item", "User")
+
+        replayed = CompactAccountsController(log)
+    balances = [accounts.get_balance(holder_id) for holder_id in holders]
+    assert balances == [replayed.get_balance(holder_id) for holder_id in holders]
+    assert sum(balances) == 300
+
+
+def _bytes_per_account(
+    controller: Type[AccountsController], holders: List[str]
+) -> float:
+    tracemalloc.start()
+    try:
+        accounts = controller()
+        before = tracemalloc.get_traced_memory()[0]
+        accounts.deposit_many((1.23, holder) for holder in holders)
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    assert [accounts.get_balance(holder) for holder in holders] == [1.23] * len(holders)
+    return used / len(holders)
+
+
+def test_compact_accounts_memory() -> None:
+    """Tests that the compact controller takes less memory per account."""
+    holders = [f"User#{i}" for i in range(20000)]
+
+    compact = _bytes_per_account(CompactAccountsController, holders)
+    regular = _bytes_per_account(AccountsController, holders)
+
+    assert compact < regular * 0.75
@@ -0,0 +1,60 @@
+"""Tests the streaming loaders of apps, users and balances."""
+from pathlib import Path
+
+import pytest
+
+from appstore.accounts import AccountsController
+from appstore.apps import InMemoryAppsDB
+from appstore.loader import read_apps, read_balances, read_users
+from appstore.users import InMemoryUsersDB
+
+
+def test_read_jsonl(tmp_path: Path) -> None:
+    """Tests loading JSON lines files into the in-memory databases."""
+    apps = tmp_path / "apps.jsonl"
+    apps.write_text(
+        '{"app_id": "App1", "developer_id": "Dev1", "items": {"A": 1, "B": 2.5}}\n'
+        "\n"
+        '{"app_id": "App2", "developer_id": "Dev2", "items": {"A": 3}}\n'
+    )
+    users = tmp_path / "users.jsonl"
+    users.write_text('{"user_id": "U1"}\n{"user_id": "U2"}\n')
+    balances = tmp_path / "balances.jsonl"
+    balances.write_text('{"holder_id": "U1", "amount": 5}\n')
+
+    appsdb = InMemoryAppsDB()
+    appsdb.add_apps(read_apps(apps))
+    assert appsdb.get_item_price("App1", "B") == 2.5
+    assert appsdb.get_developer_id("App2") == "Dev2"
+    assert list(read_users(users)) == ["U1", "U2"]
+    assert list(read_balances(balances)) == [(5.0, "U1")]
+
+
+def test_read_csv(tmp_path: Path) -> None:
+    """Tests loading CSV files, with a row per app item."""
+    apps = tmp_path / "apps.csv"
+    apps.write_text(
+        "app_id,developer_id,item,price\n"
+        "App1,Dev1,A,1\nApp1,Dev1,B,2.5\nApp2,Dev2,A,3\n"
+    )
+    users = tmp_path / "users.csv"
+    users.write_text("user_id\nU1\nU2\n")
+    balances = tmp_path / "balances.csv"
+    balances.write_text("holder_id,amount\nU1,5\nU2,7.5\n")
+
+    assert list(read_apps(apps)) == [
+        ("App1", "Dev1", {"A": 1.0, "B": 2.5}),
+        ("App2", "Dev2", {"A": 3.0}),
+    ]
+    usersdb = InMemoryUsersDB()
+    usersdb.add_users(read_users(users))
+    assert usersdb.get_purchases("U2") == 0
+    accounts = AccountsController()
+    accounts.deposit_many(read_balances(balances))
+    assert accounts.get_balance("U2") == 7.5
+
+
+def test_read_unsupported_format(tmp_path: Path) -> None:
+    """Tests that files without a supported suffix are rejected."""
+    with pytest.raises(ValueError):
+        list(read_users(tmp_path / "users.txt"))
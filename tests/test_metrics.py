@@ -0,0 +1,81 @@
+"""Tests the instrumentation."""
+import pytest
+
+from appstore.accounts import AccountsController, ForbiddenDebit
+from appstore.apps import InMemoryAppsDB
+from appstore.appstore import AppStore
+from appstore.metrics import Histogram, MetricsRegistry, timed
+from appstore.users import InMemoryUsersDB
+
+
+def test_histogram() -> None:
+    """Tests estimating percentiles."""
+    histogram = Histogram()
+    assert histogram.percentile(50) == 0
+
+    for _ in range(98):
+        histogram.observe(0.000001)
+    histogram.observe(0.001)
+    histogram.observe(1e12)
+
+    assert histogram.count == 100
+    assert histogram.percentile(50) == pytest.approx(1.024e-6)
+    assert histogram.percentile(99) == pytest.approx(1.048576e-3)
+    assert histogram.percentile(100) == 2**63 / 1e9
+
+
+def test_timed() -> None:
+    """Tests timing calls and counting their errors."""
+    registry = MetricsRegistry()
+    get = timed({"key": 1}.__getitem__, registry, "get")
+
+    assert get("key") == 1
+    with pytest.raises(KeyError):
+        get("missing")
+
+    assert registry.counters == {"get.KeyError": 1}
+    summary = registry.summary()
+    assert summary["get"]["count"] == 2
+    assert summary["get"]["p50"] <= summary["get"]["p99"]
+
+
+def test_appstore_metrics() -> None:
+    """Tests timing the stages of the sales."""
+    appsdb = InMemoryAppsDB()
+    appsdb.add_app("App", developer_id="Dev", items={"Item": 5.0})
+    usersdb = InMemoryUsersDB()
+    usersdb.add_user("U1")
+    accounts = AccountsController()
+    accounts.deposit(8, "U1")
+    registry = MetricsRegistry()
+    store = AppStore(
+        "Store",
+        0.25,
+        {},
+        accounts,
+        appsdb,
+        usersdb,
+        metrics=registry,
+    )
+
+    store.sell("App", "Item", "U1")
+    with pytest.raises(ForbiddenDebit):
+        store.sell("App", "Item", "U1")
+    with pytest.raises(KeyError):
+        store.sell("App", "Missing", "U1")
+
+    assert registry.counters == {
+        "accounts.transfer.ForbiddenDebit": 1,
+        "accounts.rollbacks": 1,
+        "appstore.get_listing.KeyError": 1,
+    }
+    assert {
+        name: histogram.count for name, histogram in registry.histograms.items()
+    } == {
+        "appstore.get_listing": 3,
+        "users.record_purchase": 2,
+        "users.cancel_purchase": 1,
+        "accounts.transaction": 2,
+        "accounts.transfer": 3,
+    }
+    assert usersdb.get_purchases("U1") == 1
@@ -0,0 +1,153 @@
+"""Tests the accounts controller with versioned balances."""
+import threading
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+
+from appstore.accounts import ForbiddenDebit
+from appstore.mvcc import TransactionConflict, VersionedAccountsController
+from appstore.wal import WriteAheadLog
+
+
+def _in_thread(function: Any, *args: Any) -> None:
+    thread = threading.Thread(target=function, args=args)
+    thread.start()
+    thread.join()
+
+
+def test_versioned_accounts(tmp_path: Path) -> None:
+    """Tests transferences, their checks and their persistence.
+
+    Args:
+        tmp_path: Pytest fixture with a temporary directory.
+    """
+    with WriteAheadLog(tmp_path / "accounts.log") as log:
+        accounts = VersionedAccountsController(log)
+        accounts.deposit(10.0, "A1")
+        accounts.transfer("A1", 4.0, "A2")
+        with pytest.raises(ForbiddenDebit):
+            accounts.transfer("A1", 7.0, "A2")
+        with pytest.raises(ForbiddenDebit):
+            accounts._apply(-7.0, "A1")  # pylint: disable=protected-access
+
+        with accounts.transaction():
+            accounts.transfer("A2", 1.0, "A3")
+            with pytest.raises(ForbiddenDebit):
+                with accounts.transaction():
+                    accounts.transfer("A2", 2.0, "A3")
+                    accounts.transfer("A2", 2.0, "A3")
+            assert accounts.get_balance("A2") == 3
+        assert accounts.snapshot(["A1", "A2", "A3"]) == {"A1": 6, "A2": 3, "A3": 1}
+
+    with WriteAheadLog(tmp_path / "accounts.log") as log:
+        replayed = VersionedAccountsController(log)
+        assert replayed.snapshot(["A1", "A2", "A3"]) == {"A1": 6, "A2": 3, "A3": 1}
+
+
+def test_versioned_accounts_isolation() -> None:
+    """Tests that other threads don't see uncommitted or rolled back changes."""
+    accounts = VersionedAccountsController()
+    accounts.deposit(10.0, "A1")
+    seen: List[float] = []
+
+    with pytest.raises(RuntimeError):
+        with accounts.transaction():
+            accounts.transfer("A1", 4.0, "A2")
+            _in_thread(lambda: seen.append(accounts.get_balance("A1")))
+            assert accounts.get_balance("A1") == 6
+            raise RuntimeError()
+    assert seen == [10]
+    assert accounts.get_balance("A1") == 10
+
+
+def test_versioned_accounts_commit_checks() -> None:
+    """Tests checking debits again if their balances changed before commit."""
+    accounts = VersionedAccountsController()
+    accounts.deposit(10.0, "A1")
+
+    with accounts.transaction():
+        accounts.transfer("A1", 8.0, "A2")
+        _in_thread(accounts.deposit, 1.0, "A1")
+    assert accounts.get_balance("A1") == 3
+
+    with pytest.raises(ForbiddenDebit):
+        with accounts.transaction():
+            accounts.transfer("A1", 2.0, "A2")
+            _in_thread(accounts.transfer, "A1", 2.0, "A3")
+    assert accounts.snapshot(["A1", "A2", "A3"]) == {"A1": 1, "A2": 8, "A3": 2}
+
+
+def test_versioned_accounts_conflicts() -> None:
+    """Tests running transactions again when the balances they read change."""
+    accounts = VersionedAccountsController()
+    accounts.deposit(10.0, "A1")
+    attempts: List[float] = []
+
+    def withdraw_half() -> float:
+        balance = accounts.get_balance("A1")
+        attempts.append(balance)
+        if len(attempts) == 1:
+            _in_thread(accounts.deposit, 10.0, "A1")
+        accounts.transfer("A1", balance / 2, "A2")
+        return balance / 2
+
+    assert accounts.atomically(withdraw_half) == 10
+    assert attempts == [10, 20]
+    assert accounts.get_balance("A1") == 10
+
+    def conflict() -> None:
+        accounts.transfer("A1", accounts.get_balance("A1"), "A2")
+        _in_thread(accounts.deposit, 1.0, "A1")
+
+    with pytest.raises(TransactionConflict):
+        accounts.atomically(conflict, attempts=2)
+    with pytest.raises(ValueError):
+        accounts.atomically(conflict, attempts=0)
+    with accounts.transaction():
+        assert accounts.get_balance("A1") == 12
+
+    def check_then_transfer() -> None:
+        if accounts.get_balance("A3") == 0:
+            accounts.transfer("A1", 1.0, "A2")
+        accounts.transfer("A1", 1.0, "A3")
+        accounts.transfer("A3", 1.0, "A1")
+
+    def concurrent_check() -> None:
+        check_then_transfer()
+        _in_thread(accounts.atomically, check_then_transfer)
+
+    # Only reading an account, or not changing its balance, keeps its version.
+    accounts.atomically(concurrent_check, attempts=1)
+    assert accounts.snapshot(["A1", "A2", "A3"]) == {"A1": 10, "A2": 12, "A3": 0}
+
+
+def test_versioned_accounts_snapshot() -> None:
+    """Tests that snapshots are retried when a commit is applied meanwhile."""
+    accounts = VersionedAccountsController()
+    accounts.deposit(10.0, "A1")
+
+    transferred = threading.Event()
+
+    class _Accounts(Dict[str, Any]):
+        """Accounts whose first snapshot read happens while a transference commits."""
+
+        def get(self, *args: Any) -> Any:
+            """Get an account, transferring in another thread the first time.
+
+            Args:
+                args: The holder identifier and the default account.
+
+            Returns:
+                The account.
+            """
+            account = super().get(*args)
+            if not transferred.is_set():
+                transferred.set()
+                _in_thread(accounts.transfer, "A1", 5.0, "A2")
+            return account
+
+    accounts._accounts = _Accounts(  # pylint: disable=protected-access
+        accounts._accounts  # pylint: disable=protected-access
+    )
+    assert accounts.snapshot(["A1", "A2"]) == {"A1": 5, "A2": 5}
@@ -0,0 +1,269 @@
+"""Tests the RESP users' database and the local RESP server."""
+import io
+import socket
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Tuple
+
+import pytest
+
+import appstore.resp
+from appstore.accounts import AccountsController
+from appstore.apps import InMemoryAppsDB
+from appstore.appstore import AppStore, Sale
+from appstore.metrics import MetricsRegistry
+from appstore.resp import LocalRESPServer, RESPError, RESPUsersDB, _Connection, _read
+
+
+@pytest.fixture(name="server")
+def fixture_server() -> Iterator[LocalRESPServer]:
+    """Serves a local RESP server.
+
+    Yields:
+        The server.
+    """
+    with LocalRESPServer() as server:
+        yield server
+
+
+def test_resp_users_db(server: LocalRESPServer) -> None:
+    """Tests adding users and counting their purchases.
+
+    Args:
+        server: Pytest fixture with a local RESP server.
+    """
+    usersdb = RESPUsersDB(*server.address, max_connections=2)
+
+    usersdb.add_users(f"U{i}" for i in range(2500))
+    usersdb.add_user("U1")
+    assert usersdb.increment_purchases("U2") == 1
+    assert [usersdb.get_purchases(user_id) for user_id in ["U1", "U2"]] == [0, 1]
+    assert usersdb.record_purchase("U2") == 1
+    assert usersdb.cancel_purchase("U2") == 1
+    with pytest.raises(KeyError):
+        usersdb.get_purchases("Nobody")
+    with pytest.raises(KeyError) as error:
+        usersdb.increment_purchases("Nobody")
+    assert error.value.args[0] == "No user: Nobody"
+    with pytest.raises(KeyError) as error:
+        usersdb.record_purchase("Nobody")
+    assert error.value.args[0] == "Nobody"
+
+    counts = usersdb.record_purchases(["U1", "Nobody", "U1", "U2"])
+    assert [repr(count) for count in counts] == ["0", "KeyError('Nobody')", "1", "1"]
+    usersdb.cancel_purchases(["U1", "U2"])
+    assert [usersdb.get_purchases(user_id) for user_id in ["U1", "U2"]] == [1, 1]
+    # Unknown users' counters aren't touched.
+    server.store.values[b"appstore:purchases:Ghost"] = b"5"
+    with ThreadPoolExecutor(4) as executor:
+        for _ in range(50):
+            executor.submit(usersdb.record_purchases, ["Nobody", "Ghost", "Nobody"])
+            executor.submit(usersdb.cancel_purchases, ["Ghost"])
+    assert b"appstore:purchases:Nobody" not in server.store.values
+    assert server.store.values[b"appstore:purchases:Ghost"] == b"5"
+    usersdb.add_user("Nobody")
+    assert usersdb.get_purchases("Nobody") == 0
+    usersdb.add_users([])
+    usersdb.close()
+
+    other = RESPUsersDB(*server.address, prefix="other:")
+    with pytest.raises(KeyError):
+        other.get_purchases("U1")
+    other.close()
+
+
+def test_resp_users_db_concurrent_increments(server: LocalRESPServer) -> None:
+    """Tests counting purchases from more threads than pooled connections.
+
+    Args:
+        server: Pytest fixture with a local RESP server.
+    """
+    usersdb = RESPUsersDB(*server.address, max_connections=2)
+    usersdb.add_user("U1")
+
+    with ThreadPoolExecutor(4) as executor:
+        for _ in range(200):
+            executor.submit(usersdb.record_purchases, ["U1", "U1"])
+
+    assert usersdb.get_purchases("U1") == 400
+    usersdb.close()
+
+
+def test_resp_users_db_errors(server: LocalRESPServer) -> None:
+    """Tests error replies, and discarding broken connections.
+
+    Args:
+        server: Pytest fixture with a local RESP server.
+    """
+    usersdb = RESPUsersDB(*server.address, max_connections=1)
+    server.store.values[b"appstore:users"] = b"Not a set"
+    with pytest.raises(RESPError):
+        usersdb.get_purchases("U1")
+    with pytest.raises(RESPError):
+        usersdb.add_user("U1")
+    usersdb.close()
+
+
+def test_resp_users_db_broken_connections() -> None:
+    """Tests discarding connections that fail, instead of pooling them again."""
+    with socket.create_server(("127.0.0.1", 0)) as listener:
+        host, port = listener.getsockname()
+        usersdb = RESPUsersDB(host, port, max_connections=1, timeout=0.01)
+        for _ in range(2):
+            with pytest.raises(TimeoutError):
+                usersdb.get_purchases("U1")
+    with pytest.raises(ConnectionRefusedError):
+        usersdb.get_purchases("U1")
+    usersdb.close()
+
+
+def test_resp_users_db_unread_replies(
+    server: LocalRESPServer, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Tests discarding connections whose replies weren't all read.
+
+    Args:
+        server: Pytest fixture with a local RESP server.
+        monkeypatch: Pytest patch fixture.
+    """
+    usersdb = RESPUsersDB(*server.address, max_connections=1)
+    usersdb.add_user("U1")
+
+    def unknown_reply(_file: object) -> None:
+        raise RESPError("Unknown reply")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(appstore.resp, "_read", unknown_reply)
+        with pytest.raises(RESPError):
+            usersdb.get_purchases("Nobody")
+    assert usersdb.get_purchases("U1") == 0
+    usersdb.close()
+
+
+def test_local_resp_server(server: LocalRESPServer) -> None:
+    """Tests the local server's commands and its protocol errors.
+
+    Args:
+        server: Pytest fixture with a local RESP server.
+    """
+    connection = _Connection(server.address, timeout=5.0)
+    replies = connection.execute(
+        [
+            ("PING",),
+            ("SET", "K", "V"),
+            ("GET", "K"),
+            ("INCR", "K"),
+            ("DECR", "N"),
+            ("del", "K", "N", "M"),
+            ("GET", "K"),
+            ("SADD", "S", "A", "B", "A"),
+            ("SISMEMBER", "S", "B"),
+            ("SISMEMBER", "K", "B"),
+            ("GET", "S"),
+            ("EVAL", "return 1", 0),
+            ("GET",),
+            ("FLUSHALL",),
+        ]
+    )
+    assert [
+        str(reply) if isinstance(reply, RESPError) else reply for reply in replies
+    ] == [
+        "PONG",
+        "OK",
+        b"V",
+        "ERR value is not an integer or out of range",
+        -1,
+        2,
+        None,
+        2,
+        1,
+        0,
+        "WRONGTYPE Operation against a key holding the wrong kind of value",
+        "ERR scripts are not supported",
+        "ERR wrong number of arguments for 'GET'",
+        "ERR unknown command 'FLUSHALL'",
+    ]
+    connection.close()
+
+    with socket.create_connection(server.address) as raw:
+        raw.sendall(b"+PING\r\n*0\r\n?\r\n")
+        assert raw.makefile("rb").read() == b"-ERR Protocol error\r\n" * 2
+
+
+def test_read() -> None:
+    """Tests reading each kind of RESP value."""
+    stream = io.BytesIO(b"*3\r\n+OK\r\n:-2\r\n$-1\r\n$0\r\n\r\n?\r\n")
+    assert _read(stream) == ["OK", -2, None]
+    assert _read(stream) == b""
+    with pytest.raises(RESPError):
+        _read(stream)
+    with pytest.raises(ConnectionError):
+        _read(stream)
+
+
+class _FailingRecorder:
+    """Sales recorder that fails to record the first sale."""
+
+    def __init__(self) -> None:
+        self.recorded: List[Tuple[Sale, str, str, str]] = []
+
+    def record_sale(self, sale: Sale, app_id: str, app_item: str, user_id: str) -> None:
+        """Records a sale, failing the first time.
+
+        Args:
+            sale: The sale.
+            app_id: The app identifier.
+            app_item: The app item.
+            user_id: The user who bought the item.
+
+        Raises:
+            RuntimeError: the first time.
+        """
+        self.recorded.append((sale, app_id, app_item, user_id))
+        if len(self.recorded) == 1:
+            raise RuntimeError()
+
+
+def test_sell_many_counts_batches(server: LocalRESPServer) -> None:
+    """Tests that failing to record a completed sale keeps its purchase.
+
+    Args:
+        server: Pytest fixture with a local RESP server.
+    """
+    accounts = AccountsController()
+    accounts.deposit(10.0, "U1")
+    appsdb = InMemoryAppsDB()
+    appsdb.add_app("App", developer_id="Dev", items={"Item": 1.0})
+    usersdb = RESPUsersDB(*server.address)
+    usersdb.add_user("U1")
+    store = AppStore("S", 0.25, {}, accounts, appsdb, usersdb, [_FailingRecorder()])
+
+    results = store.sell_many([("App", "Item", "U1"), ("App", "Item", "U1")])
+
+    assert isinstance(results[0], RuntimeError)
+    assert isinstance(results[1], Sale)
+    assert usersdb.get_purchases("U1") == 2
+    usersdb.close()
+
+
+def test_sell_many_metrics(server: LocalRESPServer) -> None:
+    """Tests counting the purchases in batches, timed, with metrics.
+
+    Args:
+        server: Pytest fixture with a local RESP server.
+    """
+    accounts = AccountsController()
+    accounts.deposit(10.0, "U1")
+    appsdb = InMemoryAppsDB()
+    appsdb.add_app("App", developer_id="Dev", items={"Item": 1.0})
+    usersdb = RESPUsersDB(*server.address)
+    usersdb.add_user("U1")
+    registry = MetricsRegistry()
+    store = AppStore("S", 0.25, {}, accounts, appsdb, usersdb, metrics=registry)
+
+    store.sell_many([("App", "Item", "U1"), ("App", "Item", "U1")])
+    store.sell("App", "Item", "U1")
+
+    assert registry.histograms["users.record_purchases"].count == 1
+    assert registry.histograms["users.record_purchase"].count == 1
+    assert usersdb.get_purchases("U1") == 3
+    usersdb.close()
@@ -0,0 +1,45 @@
+"""Tests the revenue rollups."""
+import pytest
+
+from appstore.accounts import AccountsController, ForbiddenDebit
+from appstore.apps import InMemoryAppsDB
+from appstore.appstore import AppStore
+from appstore.rollups import RevenueRollups, Totals
+from appstore.users import InMemoryUsersDB
+
+
+def test_revenue_rollups() -> None:
+    """Tests rolling up the sales an app store completes."""
+    appsdb = InMemoryAppsDB()
+    appsdb.add_app("App1", developer_id="Dev", items={"Item": 4.0})
+    appsdb.add_app("App2", developer_id="Dev", items={"Item": 8.0})
+    usersdb = InMemoryUsersDB()
+    usersdb.add_user("U1")
+    accounts = AccountsController()
+    accounts.deposit(10, "U1")
+    times = iter([10.0, 70.0])
+    rollups = RevenueRollups(bucket_seconds=60, clock=times.__next__)
+    store = AppStore(
+        "Store",
+        0.25,
+        {1: 0.5},
+        accounts,
+        appsdb,
+        usersdb,
+        recorders=[rollups],
+    )
+
+    store.sell("App1", "Item", "U1")
+    # The reward exceeds the store's balance, so the sale is rolled back.
+    with pytest.raises(ForbiddenDebit):
+        store.sell("App2", "Item", "U1")
+    store.sell("App1", "Item", "U1")
+
+    assert rollups.total() == Totals(
+        sales=2, developer_credit=6.0, store_credit=2.0, reward=2.0
+    )
+    assert rollups.by_developer("Dev") == rollups.total()
+    assert rollups.by_app("App1") == rollups.total()
+    assert rollups.by_app("App2") == Totals()
+    assert rollups.by_bucket(0.0).sales == 1
+    assert rollups.by_bucket(119.0).reward == 2.0
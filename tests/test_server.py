@@ -0,0 +1,206 @@
+"""Test the app store's TCP server."""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, cast
+
+import pytest
+
+from appstore.accounts import AccountsController
+from appstore.apps import InMemoryAppsDB
+from appstore.appstore import AppStore
+from appstore.server import StoreServer
+from appstore.users import InMemoryUsersDB
+
+STORE = "Store"
+DEV = "Developer"
+USERS = ["User#1", "User#2", "User#3"]
+
+
+def _create_server(**options: Any) -> Tuple[StoreServer, AccountsController]:
+    accounts = AccountsController()
+    appsdb = InMemoryAppsDB()
+    appsdb.add_app("App", developer_id=DEV, items={"Item": 1.0, "Free": 0.0})
+    usersdb = InMemoryUsersDB()
+    for user in USERS:
+        usersdb.add_user(user)
+        accounts.deposit(10.0, user)
+    accounts.deposit(10.0, STORE)
+    store = AppStore(STORE, 0.25, {}, accounts, appsdb, usersdb)
+    return StoreServer(store, accounts, **options), accounts
+
+
+async def _exchange(
+    server: StoreServer, lines: List[bytes], connections: int = 1
+) -> List[List[Dict[str, Any]]]:
+    listening = await server.start()
+    port = listening.sockets[0].getsockname()[1]
+
+    async def client() -> List[Dict[str, Any]]:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.writelines(lines)
+        writer.write_eof()
+        responses = [json.loads(line) async for line in reader]
+        writer.close()
+        return responses
+
+    async with listening:
+        return list(await asyncio.gather(*(client() for _ in range(connections))))
+
+
+def test_handle() -> None:
+    """Tests handling each kind of request and error."""
+    server, _ = _create_server()
+
+    sale = server.handle({"op": "sell", "app": "App", "item": "Item", "user": "User#1"})
+    assert sale == {
+        "sale": 1,
+        "amount": 1.0,
+        "developer": DEV,
+        "developer_credit": 0.75,
+        "store_credit": 0.25,
+        "reward": 0.0,
+    }
+    assert server.handle({"op": "balance", "holder": "User#1", "id": 7}) == {
+        "id": 7,
+        "balance": 9.0,
+    }
+    assert server.handle({"op": "sell", "app": "App", "item": "Item"}) == {
+        "error": "bad_request"
+    }
+    assert server.handle({"op": "refund"}) == {"error": "bad_request"}
+    assert server.handle(
+        {"op": "sell", "app": "App", "item": "Nothing", "user": "User#1"}
+    ) == {"error": "not_found", "missing": "Nothing"}
+    assert server.handle(
+        {"op": "sell", "app": "App", "item": "Item", "user": "Nobody"}
+    ) == {"error": "not_found", "missing": "Nobody"}
+    assert server.handle(
+        {"op": "sell", "app": "App", "item": "Free", "user": "User#1"}
+    ) == {"error": "internal_error"}
+
+    for _ in range(10):
+        server.handle({"op": "sell", "app": "App", "item": "Item", "user": "User#2"})
+    assert server.handle(
+        {"op": "sell", "app": "App", "item": "Item", "user": "User#2"}
+    ) == {"error": "forbidden_debit", "holder": "User#2", "balance": 0.0}
+
+
+def test_pipelining() -> None:
+    """Tests that pipelined requests of both formats are answered in order."""
+    server, _ = _create_server(pipeline_depth=2, max_concurrency=1)
+    lines = [
+        b'{"id": "a", "op": "sell", "app": "App", "item": "Item", "user": "User#1"}\n',
+        b"\n",
+        b"sell App Item User#1\n",
+        b"balance User#1\n",
+        b"sell App Item\n",
+        b"{not json\n",
+        b"[1, 2]\n",
+    ]
+    lines += [b"sell App Item User#3\n"] * 20
+
+    [responses] = asyncio.run(_exchange(server, lines))
+
+    assert responses[0]["id"] == "a"
+    assert [response.get("sale") for response in responses[:2]] == [1, 2]
+    assert responses[2] == {"balance": 8.0}
+    assert responses[3:6] == [{"error": "bad_request"}] * 3
+    assert [response["sale"] for response in responses[6:16]] == list(range(3, 13))
+    assert all(response["error"] == "forbidden_debit" for response in responses[16:])
+
+
+def test_concurrent_clients() -> None:
+    """Tests many clients pipelining sales, handled in a thread pool."""
+    with ThreadPoolExecutor(4) as executor:
+        server, accounts = _create_server(executor=executor, max_concurrency=4)
+        lines = [f"sell App Item {user}\n".encode() for user in USERS]
+        connections = asyncio.run(_exchange(server, lines * 3, connections=3))
+
+    identifiers = [
+        response["sale"] for responses in connections for response in responses
+    ]
+    assert sorted(identifiers) == list(range(1, 28))
+    assert accounts.get_balance(STORE) + accounts.get_balance(DEV) == pytest.approx(37)
+
+
+def test_line_too_long() -> None:
+    """Tests that the server closes connections sending overly long lines."""
+    server, _ = _create_server()
+    lines = [b"balance User#1\n", b"x" * 100_000 + b"\n", b"balance User#1\n"]
+
+    [responses] = asyncio.run(_exchange(server, lines))
+
+    assert responses == [{"balance": 10.0}]
+
+
+class _ClosedWriter:
+    """Stream writer whose connection was reset by the peer."""
+
+    def __init__(self) -> None:
+        self.written: List[bytes] = []
+        self.closed = False
+
+    def is_closing(self) -> bool:
+        """Tells whether the writer was closed.
+
+        Returns:
+            Whether the writer was closed.
+        """
+        return self.closed
+
+    def write(self, data: bytes) -> None:
+        """Buffers data.
+
+        Args:
+            data: The data to write.
+        """
+        self.written.append(data)
+
+    async def drain(self) -> None:
+        """Fails to flush the data.
+
+        Raises:
+            ConnectionResetError: always.
+        """
+        raise ConnectionResetError()
+
+    def close(self) -> None:
+        """Closes the writer."""
+        self.closed = True
+
+
+def test_reset_connection() -> None:
+    """Tests that responses to a reset connection are dropped."""
+    server, _ = _create_server()
+    writer = _ClosedWriter()
+
+    async def respond() -> None:
+        pending: "asyncio.Queue[Optional[asyncio.Future[bytes]]]" = asyncio.Queue()
+        for data in [b"1\n", b"2\n"]:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(data)
+            pending.put_nowait(future)
+        pending.put_nowait(None)
+        await server._respond(  # pylint: disable=protected-access
+            pending, cast(asyncio.StreamWriter, writer)
+        )
+
+    asyncio.run(respond())
+
+    assert writer.closed
+    assert writer.written == [b"1\n"]
+
+
+def test_serve_forever() -> None:
+    """Tests serving until cancelled."""
+    server, _ = _create_server()
+
+    async def serve() -> None:
+        serving = asyncio.ensure_future(server.serve_forever())
+        await asyncio.sleep(0.01)
+        serving.cancel()
+        await serving
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(serve())
@@ -0,0 +1,192 @@
+"""Tests the accounts controller partitioned across worker processes."""
+import threading
+from typing import Iterator
+
+import pytest
+
+from appstore.accounts import AccountsController, ForbiddenDebit
+from appstore.apps import InMemoryAppsDB
+from appstore.appstore import AppStore
+from appstore.ledger import CompactAccountsController
+from appstore.sharding import ShardedAccountsController, ShardError, _Shard, shard_of
+from appstore.users import InMemoryUsersDB
+
+# With 2 shards, holders ending in 1 or 2 are in the shard 1,
+# while holders ending in 4 are in the shard 0.
+
+
+@pytest.fixture(name="accounts", scope="module")
+def fixture_accounts() -> Iterator[ShardedAccountsController]:
+    """Starts a sharded accounts controller with 2 shards.
+
+    Yields:
+        The accounts controller.
+    """
+    with ShardedAccountsController(shards=2) as accounts:
+        yield accounts
+
+
+def test_shard_of() -> None:
+    """Tests mapping holders to shards."""
+    assert [shard_of(holder, 2) for holder in ["A1", "A2", "A4"]] == [1, 1, 0]
+    assert all(0 <= shard_of(f"H{i}", 3) < 3 for i in range(100))
+
+
+def test_shard_two_phase_commit() -> None:
+    """Tests preparing, committing and aborting operations in a shard."""
+    shard = _Shard(AccountsController())
+    shard.handle(("apply", [(10.0, "A1")]))
+    shard.handle(("prepare", 1, [(-4.0, "A1"), (4.0, "A2")]))
+    # Debits are applied on prepare, but credits are held until commit.
+    assert shard.handle(("balance", "A1")) == 6
+    assert shard.handle(("balance", "A2")) == 0
+    shard.handle(("commit", 1))
+    assert shard.handle(("balance", "A2")) == 4
+
+    shard.handle(("prepare", 2, [(-6.0, "A1")]))
+    shard.handle(("abort", 2))
+    assert shard.handle(("balance", "A1")) == 6
+
+    with pytest.raises(ForbiddenDebit):
+        shard.handle(("prepare", 3, [(-4.0, "A1"), (-4.0, "A1")]))
+    assert shard.handle(("balance", "A1")) == 6
+
+    shard.handle(("force", [(-10.0, "A1")]))
+    assert shard.handle(("balance", "A1")) == -4
+    with pytest.raises(ValueError):
+        shard.handle(("unknown",))
+
+
+def test_sharded_accounts_deposit_many(accounts: ShardedAccountsController) -> None:
+    """Tests making deposits in bulk across shards."""
+    accounts.deposit_many([(1.0, "D1"), (2.0, "D4"), (3.0, "D1")])
+    assert accounts.get_balance("D1") == 4
+    assert accounts.get_balance("D4") == 2
+
+    with pytest.raises(ValueError):
+        accounts.deposit_many([(-1.0, "D1")])
+    with pytest.raises(ForbiddenDebit):
+        with accounts.transaction():
+            accounts.deposit_many([(1.0, "D2"), (1.0, "D4")])
+            accounts.transfer("D2", 5.0, "D4")
+    assert accounts.get_balance("D2") == 0
+    assert accounts.get_balance("D4") == 2
+
+
+def test_sharded_accounts_transferences(accounts: ShardedAccountsController) -> None:
+    """Tests transferences within a shard and across shards."""
+    accounts.deposit(10, "T1")
+    accounts.transfer("T1", 3, "T2")
+    accounts.transfer("T1", 2, "T4")
+    assert [accounts.get_balance(holder) for holder in ["T1", "T2", "T4"]] == [5, 3, 2]
+
+    with pytest.raises(ForbiddenDebit) as error:
+        accounts.transfer("T4", 5, "T1")
+    assert error.value.holder_id == "T4"
+    with pytest.raises(ForbiddenDebit):
+        accounts.transfer("T1", 6, "T4")
+    assert [accounts.get_balance(holder) for holder in ["T1", "T2", "T4"]] == [5, 3, 2]
+
+    with pytest.raises(ValueError):
+        accounts.deposit(0, "T1")
+    with pytest.raises(ValueError):
+        accounts.transfer("T1", 0, "T2")
+
+
+def test_sharded_accounts_transaction(accounts: ShardedAccountsController) -> None:
+    """Tests rolling back transactions spanning many shards."""
+    accounts.deposit(10, "R1")
+    with pytest.raises(ForbiddenDebit):
+        with accounts.transaction():
+            accounts.transfer("R1", 4, "R4")
+            with accounts.transaction():
+                accounts.transfer("R4", 1, "R2")
+            accounts.transfer("R2", 2, "R1")
+
+    assert [accounts.get_balance(holder) for holder in ["R1", "R2", "R4"]] == [10, 0, 0]
+
+    with accounts.transaction():
+        accounts.transfer("R1", 4, "R4")
+    assert accounts.get_balance("R4") == 4
+
+
+class _Unpicklable(str):
+    """Holder identifier that can't be sent to the workers."""
+
+    def __reduce__(self) -> str:
+        """Fails to pickle.
+
+        Raises:
+            TypeError: always.
+        """
+        raise TypeError("Unpicklable")
+
+
+def test_sharded_accounts_prepare_error(accounts: ShardedAccountsController) -> None:
+    """Tests aborting the prepared shards when another fails to prepare."""
+    accounts.deposit(10, "P4")
+    # The shard 0 prepares its debit, and the request to the shard 1 fails.
+    with pytest.raises(TypeError):
+        accounts.transfer("P4", 4, _Unpicklable("P1"))
+    assert accounts.get_balance("P4") == 10
+
+
+def _failing_controller() -> AccountsController:
+    raise RuntimeError("No accounts")
+
+
+def test_sharded_accounts_factory_error() -> None:
+    """Tests sending back the errors creating the shards' controllers."""
+    with ShardedAccountsController(1, _failing_controller) as accounts:
+        with pytest.raises(ShardError, match="RuntimeError: No accounts"):
+            accounts.get_balance("A1")
+
+
+def test_sharded_accounts_concurrent_transferences(
+    accounts: ShardedAccountsController,
+) -> None:
+    """Tests that concurrent transferences across shards don't lose money."""
+    holders = ["C1", "C2", "C4"]
+    for holder in holders:
+        accounts.deposit(100, holder)
+
+    def transfer(issuer: str, recepient: str) -> None:
+        for _ in range(100):
+            accounts.transfer(issuer, 1, recepient)
+            accounts.transfer(recepient, 1, issuer)
+
+    threads = [
+        threading.Thread(target=transfer, args=(issuer, recepient))
+        for issuer, recepient in [("C1", "C2"), ("C2", "C4"), ("C4", "C1")]
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(accounts.get_balance(holder) for holder in holders) == 300
+    assert all(accounts.get_balance(holder) == 100 for holder in holders)
+
+
+def test_sharded_accounts_appstore() -> None:
+    """Tests selling with sharded compact accounts."""
+    appsdb = InMemoryAppsDB()
+    appsdb.add_app("App", developer_id="Developer", items={"Item": 1.2})
+    usersdb = InMemoryUsersDB()
+    usersdb.add_user("User#1")
+    with ShardedAccountsController(3, CompactAccountsController) as accounts:
+        accounts.deposit(10, "User#1")
+        accounts.deposit(10, "Store")
+        store = AppStore(
+            appstore_id="Store",
+            commission=0.25,
+            bonus_after_purchases={1: 0.5},
+            accounts_controller=accounts,
+            appsdb=appsdb,
+            usersdb=usersdb,
+        )
+        store.sell("App", "Item", "User#1")
+        store.sell("App", "Item", "User#1")
+        assert accounts.get_balance("User#1") == 8.2
+        assert accounts.get_balance("Developer") == 1.8
+        assert accounts.get_balance("Store") == 10
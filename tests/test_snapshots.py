@@ -0,0 +1,62 @@
+"""Tests persistent accounts with log segments and snapshots."""
+from pathlib import Path
+
+import pytest
+
+from appstore.ledger import CompactAccountsController
+from appstore.snapshots import LedgerStore, read_snapshot, write_snapshot
+from appstore.wal import WriteAheadLog
+
+
+def test_snapshot(tmp_path: Path) -> None:
+    """Tests writing and reading snapshots."""
+    path = tmp_path / "snapshot.bin"
+    write_snapshot(path, {"A1": 1.5, "Ä2": -2.0})
+    assert list(read_snapshot(path)) == [(1.5, "A1"), (-2.0, "Ä2")]
+
+    write_snapshot(path, {})
+    assert not list(read_snapshot(path))
+
+    path.write_bytes(b"NOTASNAPSHOT" * 4)
+    with pytest.raises(ValueError):
+        list(read_snapshot(path))
+
+
+def test_ledger_store(tmp_path: Path) -> None:
+    """Tests restoring accounts from snapshots and log segments."""
+    store = LedgerStore(tmp_path)
+    accounts = store.load()
+    accounts.deposit(10, "A1")
+    accounts.transfer("A1", 2, "A2")
+    store.checkpoint()
+    accounts.transfer("A2", 1, "A3")
+    store.checkpoint()
+    accounts.transfer("A1", 3, "A3")
+    store.close()
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "segment-00000003.log",
+        "snapshot-00000003.bin",
+    ]
+
+    store = LedgerStore(tmp_path)
+    for accounts in [store.load(), store.load(CompactAccountsController)]:
+        assert accounts.get_balance("A1") == 5
+        assert accounts.get_balance("A2") == 1
+        assert accounts.get_balance("A3") == 4
+    store.close()
+
+
+def test_ledger_store_crash_before_snapshot(tmp_path: Path) -> None:
+    """Tests restoring accounts when a checkpoint didn't write its snapshot."""
+    with WriteAheadLog(tmp_path / "segment-00000001.log") as log:
+        log.append([(10.0, "A1")])
+    with WriteAheadLog(tmp_path / "segment-00000002.log") as log:
+        log.append([(-1.0, "A1"), (1.0, "A2")])
+    (tmp_path / "snapshot-00000003.bin.partial").write_bytes(b"")
+
+    store = LedgerStore(tmp_path)
+    accounts = store.load()
+    assert accounts.get_balance("A1") == 9
+    assert accounts.get_balance("A2") == 1
+    store.close()
@@ -0,0 +1,83 @@
+"""Tests the SQLite apps' and users' databases."""
+import threading
+from pathlib import Path
+
+import pytest
+
+from appstore.appstore import Listing
+from appstore.sqlite import SQLiteAppsDB, SQLiteUsersDB
+
+
+def test_sqlite_apps_db(tmp_path: Path) -> None:
+    """Tests adding apps and getting their developers and items prices."""
+    appsdb = SQLiteAppsDB(tmp_path / "apps.db")
+    appsdb.add_app(
+        app_id="TrivialDrive",
+        developer_id="TrivialDriveDeveloper#2",
+        items={"Oil": 1.0, "Antifreeze": 1.20},
+    )
+    appsdb.add_apps(
+        (f"App{i}", f"Developer{i}", {"Item": float(i)}) for i in range(100)
+    )
+    appsdb.close()
+
+    appsdb = SQLiteAppsDB(tmp_path / "apps.db")
+    assert appsdb.get_developer_id(app_id="TrivialDrive") == "TrivialDriveDeveloper#2"
+    assert appsdb.get_item_price(app_id="TrivialDrive", item="Antifreeze") == 1.20
+    assert appsdb.get_item_price(app_id="App42", item="Item") == 42.0
+    assert appsdb.get_listing(app_id="App42", item="Item") == Listing(
+        price=42.0, developer_id="Developer42"
+    )
+    with pytest.raises(KeyError):
+        appsdb.get_listing(app_id="App42", item="WrongItem")
+    with pytest.raises(KeyError):
+        appsdb.get_developer_id(app_id="WrongApp")
+    with pytest.raises(KeyError) as error:
+        appsdb.get_item_price(app_id="TrivialDrive", item="WrongItem")
+    assert error.value.args[0] == ("TrivialDrive", "WrongItem")
+    appsdb.close()
+
+
+def test_sqlite_users_db(tmp_path: Path) -> None:
+    """Tests adding users and counting their purchases."""
+    usersdb = SQLiteUsersDB(tmp_path / "users.db")
+
+    usersdb.add_users(["U1", "U2"])
+    assert usersdb.increment_purchases("U2") == 1
+    usersdb.close()
+
+    usersdb = SQLiteUsersDB(tmp_path / "users.db")
+    assert [usersdb.get_purchases(user_id) for user_id in ["U1", "U2"]] == [0, 1]
+    assert usersdb.increment_purchases("U2") == 2
+    with pytest.raises(KeyError):
+        usersdb.get_purchases("U3")
+    with pytest.raises(KeyError):
+        usersdb.increment_purchases("U3")
+    usersdb.add_user("U3")
+    assert usersdb.get_purchases("U3") == 0
+    assert usersdb.record_purchase("U3") == 0
+    assert usersdb.record_purchase("U3") == 1
+    assert usersdb.cancel_purchase("U3") == 1
+    with pytest.raises(KeyError) as error:
+        usersdb.record_purchase("U4")
+    assert error.value.args[0] == "U4"
+    usersdb.close()
+
+
+def test_sqlite_users_db_concurrent_increments(tmp_path: Path) -> None:
+    """Tests counting purchases from several threads."""
+    usersdb = SQLiteUsersDB(tmp_path / "users.db")
+    usersdb.add_user("U1")
+
+    def increment() -> None:
+        for _ in range(50):
+            usersdb.increment_purchases("U1")
+
+    threads = [threading.Thread(target=increment) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert usersdb.get_purchases("U1") == 200
+    usersdb.close()
@@ -19,3 +19,21 @@ def test_users_in_memory_db() -> None:
     assert usersdb.get_purchases("U1") == 0
     assert usersdb.increment_purchases("U1") == 1
     assert usersdb.get_purchases("U1") == 1
+
+
+def test_users_in_memory_db_records_purchases() -> None:
+    """Tests recording and cancelling purchases atomically."""
+    usersdb = InMemoryUsersDB()
+
+    with pytest.raises(KeyError):
+        usersdb.record_purchase("U1")
+
+    with pytest.raises(KeyError):
+        usersdb.cancel_purchase("U1")
+
+    usersdb.add_user("U1")
+
+    assert usersdb.record_purchase("U1") == 0
+    assert usersdb.record_purchase("U1") == 1
+    assert usersdb.cancel_purchase("U1") == 1
+    assert usersdb.get_purchases("U1") == 1
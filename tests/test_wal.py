@@ -0,0 +1,165 @@
+"""Tests the accounts' write-ahead log."""
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from appstore.accounts import AccountsController, ForbiddenDebit
+from appstore.ledger import CompactAccountsController
+from appstore.wal import WriteAheadLog, read_log
+
+
+def test_write_ahead_log(tmp_path: Path) -> None:
+    """Tests appending and reading records."""
+    path = tmp_path / "accounts.log"
+    with WriteAheadLog(path) as log:
+        log.append([(10.0, "A1")])
+        log.append([(-1.5, "A1"), (1.5, "A2")])
+        assert log.syncs == 2
+
+    # A crash left an incomplete record.
+    with path.open("ab") as file:
+        file.write(b'[[1.0,"A')
+
+    with WriteAheadLog(path) as log:
+        assert list(log.read()) == [[(10.0, "A1")], [(-1.5, "A1"), (1.5, "A2")]]
+        log.append([(2.0, "A3")])
+        assert list(log.read())[-1] == [(2.0, "A3")]
+
+
+def test_write_ahead_log_incomplete_first_record(tmp_path: Path) -> None:
+    """Tests discarding an incomplete record in an otherwise empty log."""
+    path = tmp_path / "accounts.log"
+    path.write_bytes(b'[[1.0,"A')
+
+    with WriteAheadLog(path) as log:
+        assert not list(log.read())
+        assert path.read_bytes() == b""
+
+
+def test_write_ahead_log_read_while_writing(tmp_path: Path) -> None:
+    """Tests that reading ignores a record that is being written."""
+    path = tmp_path / "accounts.log"
+    with WriteAheadLog(path) as log:
+        log.append([(1.0, "A1")])
+        with path.open("ab") as file:
+            file.write(b'[[1.0,"A')
+        assert list(log.read()) == [[(1.0, "A1")]]
+
+
+def test_write_ahead_log_group_commit(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Tests that concurrent writers share syncs.
+
+    Args:
+        tmp_path: Pytest temporary directory.
+        monkeypatch: Pytest patch fixture.
+    """
+    fsync = os.fsync
+
+    def slow_fsync(file_descriptor: int) -> None:
+        time.sleep(0.01)
+        fsync(file_descriptor)
+
+    monkeypatch.setattr("os.fsync", slow_fsync)
+    with WriteAheadLog(tmp_path / "accounts.log") as log:
+        threads = [
+            threading.Thread(target=log.append, args=([(1.0, f"A{i}")],))
+            for i in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(list(log.read())) == 20
+        assert log.syncs < 20
+
+
+def test_write_ahead_log_failed_sync(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Tests that a failed sync is retried by the next writer.
+
+    Args:
+        tmp_path: Pytest temporary directory.
+        monkeypatch: Pytest patch fixture.
+    """
+    fsync = os.fsync
+
+    def failing_fsync(_file_descriptor: int) -> None:
+        raise OSError()
+
+    with WriteAheadLog(tmp_path / "accounts.log") as log:
+        monkeypatch.setattr("os.fsync", failing_fsync)
+        with pytest.raises(OSError):
+            log.append([(1.0, "A1")])
+        monkeypatch.setattr("os.fsync", fsync)
+        log.append([(1.0, "A2")])
+        assert log.syncs == 1
+
+
+def test_persistent_accounts(tmp_path: Path) -> None:
+    """Tests restoring the accounts from the log."""
+    path = tmp_path / "accounts.log"
+    with WriteAheadLog(path) as log:
+        accounts = AccountsController(log=log)
+        accounts.deposit(10, "A1")
+        accounts.transfer("A1", 2, "A2")
+        with accounts.transaction():
+            accounts.transfer("A1", 1, "A2")
+            with accounts.transaction():
+                accounts.transfer("A2", 3, "A3")
+        with pytest.raises(ForbiddenDebit):
+            with accounts.transaction():
+                accounts.transfer("A1", 1, "A2")
+                accounts.transfer("A1", 10, "A2")
+        with accounts.transaction():
+            pass
+
+    with WriteAheadLog(path) as log:
+        assert len(list(log.read())) == 3
+        for restored in [AccountsController(log=log), CompactAccountsController(log)]:
+            assert restored.get_balance("A1") == 7
+            assert restored.get_balance("A2") == 0
+            assert restored.get_balance("A3") == 3
+
+
+def test_write_ahead_log_rotate(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Tests continuing the log in another file while a record is being synced.
+
+    Args:
+        tmp_path: Pytest temporary directory.
+        monkeypatch: Pytest patch fixture.
+    """
+    fsync = os.fsync
+    syncing = threading.Event()
+    release = threading.Event()
+
+    def blocking_fsync(file_descriptor: int) -> None:
+        syncing.set()
+        release.wait()
+        fsync(file_descriptor)
+
+    with WriteAheadLog(tmp_path / "first.log") as log:
+        monkeypatch.setattr("os.fsync", blocking_fsync)
+        writer = threading.Thread(target=log.append, args=([(1.0, "A1")],))
+        writer.start()
+        syncing.wait()
+        rotator = threading.Thread(target=log.rotate, args=(tmp_path / "second.log",))
+        rotator.start()
+        # Let the rotation wait for the sync.
+        time.sleep(0.05)
+        release.set()
+        writer.join()
+        rotator.join()
+        log.append([(2.0, "A2")])
+
+    assert log.path == tmp_path / "second.log"
+    assert list(read_log(tmp_path / "first.log")) == [[(1.0, "A1")]]
+    assert list(log.read()) == [[(2.0, "A2")]]